@@ -1,13 +1,20 @@
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from typing import Callable, Union
 
 import services as service
 from api.setup import Agents, Markets
+from common.latency import order_latency
 from common.variables import Variables as var
 
 from .variables import Variables
 
+# Maximum number of simultaneous single requests of one batch of orders. The
+# requests share the market's rate limits, so more threads would only wait.
+
+PARALLEL_REQUESTS = 4
+
 
 class WS(Variables):
     def connect_market(self: Markets) -> str:
@@ -363,8 +370,8 @@ class WS(Variables):
         )
 
         WS._put_message(self, message=message, info=False)
-
-        return Agents[self.name].value.place_order(
+        order_latency.sent(clOrdID=clOrdID, market=self.name)
+        res = Agents[self.name].value.place_order(
             self,
             quantity=quantity,
             price=price,
@@ -372,6 +379,9 @@ class WS(Variables):
             symbol=symbol,
             ordType=ordType,
         )
+        WS._stamp_response(self, clOrdID=clOrdID, result=res)
+
+        return res
 
     def replace_limit(
         self: Markets,
@@ -466,6 +476,158 @@ class WS(Variables):
 
         return Agents[self.name].value.remove_order(self, order=order)
 
+    def place_many(self: Markets, orders: list) -> list:
+        """
+        Places several orders with as few requests as the exchange allows.
+        If the exchange does not support batch orders, single requests are
+        sent in parallel.
+
+        Parameters
+        ----------
+        self: Markets
+            Markets class instances such as Bitmex, Bybit, Deribit.
+        orders: list
+            Each element is a dict with the place_order() parameters:
+            "quantity", "price", "clOrdID", "symbol", "ordType".
+
+        Returns
+        -------
+        list
+            Results in the same order as the orders: a response from the
+            exchange server (dict) for each placed order, otherwise the error
+            type (str).
+        """
+        agent = Agents[self.name].value
+        if not hasattr(agent, "place_many"):
+            return WS._in_parallel(self, method=WS.place_order, parameters=orders)
+        for order in orders:
+            message = (
+                self.name
+                + " - Sending a new order (batch) - "
+                + "symbol="
+                + order["symbol"][0]
+                + ", clOrdID="
+                + order["clOrdID"]
+                + ", price="
+                + str(order["price"])
+                + ", qty="
+                + str(order["quantity"])
+            )
+            WS._put_message(self, message=message, info=False)
+            order_latency.sent(clOrdID=order["clOrdID"], market=self.name)
+        results = agent.place_many(self, orders=orders)
+        for order, res in zip(orders, results):
+            WS._stamp_response(self, clOrdID=order["clOrdID"], result=res)
+
+        return results
+
+    def replace_many(self: Markets, orders: list) -> list:
+        """
+        Moves several limit orders with as few requests as the exchange
+        allows. If the exchange does not support batch orders, single
+        requests are sent in parallel.
+
+        Parameters
+        ----------
+        self: Markets
+            Markets class instances such as Bitmex, Bybit, Deribit.
+        orders: list
+            Each element is a dict with the replace_limit() parameters:
+            "leavesQty", "price", "orderID", "symbol", "orderQty", "clOrdID".
+
+        Returns
+        -------
+        list
+            Results in the same order as the orders: a response from the
+            exchange server (dict) for each moved order, otherwise the error
+            type (str).
+        """
+        agent = Agents[self.name].value
+        if not hasattr(agent, "replace_many"):
+            return WS._in_parallel(self, method=WS.replace_limit, parameters=orders)
+        for order in orders:
+            message = (
+                self.name
+                + " - Replace order (batch) - "
+                + "symbol="
+                + order["symbol"][0]
+                + ", orderID="
+                + order["orderID"]
+                + ", clOrdID="
+                + order["clOrdID"]
+                + ", price="
+                + str(order["price"])
+                + ", qty="
+                + str(order["leavesQty"])
+            )
+            WS._put_message(self, message=message, info=False)
+
+        return agent.replace_many(self, orders=orders)
+
+    def remove_many(self: Markets, orders: list) -> list:
+        """
+        Deletes several orders with as few requests as the exchange allows.
+        If the exchange does not support batch cancellation, single requests
+        are sent in parallel.
+
+        Parameters
+        ----------
+        self: Markets
+            Markets class instances such as Bitmex, Bybit, Deribit.
+        orders: list
+            Orders from var.orders.
+
+        Returns
+        -------
+        list
+            Results in the same order as the orders: a response from the
+            exchange server (dict) for each deleted order, otherwise the error
+            type (str).
+        """
+        agent = Agents[self.name].value
+        if not hasattr(agent, "remove_many"):
+            parameters = [{"order": order} for order in orders]
+            return WS._in_parallel(self, method=WS.remove_order, parameters=parameters)
+        for order in orders:
+            message = (
+                self.name
+                + " - Cancel order (batch) - "
+                + "symbol="
+                + order["symbol"][0]
+                + ", orderID="
+                + order["orderID"]
+                + ", clOrdID="
+                + order["clOrdID"]
+                + ", price="
+                + str(order["price"])
+                + ", qty="
+                + str(order["orderQty"])
+            )
+            WS._put_message(self, message=message, info=False)
+
+        return agent.remove_many(self, orders=orders)
+
+    def _in_parallel(self: Markets, method: Callable, parameters: list) -> list:
+        """
+        Calls the method with each set of parameters on a pool of at most
+        PARALLEL_REQUESTS threads and returns the results in the same order.
+        """
+        if not parameters:
+            return []
+        workers = min(PARALLEL_REQUESTS, len(parameters))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(lambda kwargs: method(self, **kwargs), parameters))
+
+    def _stamp_response(self: Markets, clOrdID: str, result: Union[dict, str]) -> None:
+        """
+        Stamps the REST response to a new order for the order latency, or
+        forgets the order if it was not placed.
+        """
+        if isinstance(result, dict):
+            order_latency.stamp(clOrdID=clOrdID, stage="response")
+        else:
+            order_latency.discard(clOrdID=clOrdID)
+
     def get_wallet_balance(self: Markets) -> str:
         """
         Obtain wallet balance, query asset information of each currency, and
@@ -468,7 +468,9 @@ class Agent(Bitmex):
         if ordType == "Limit":
             postData["price"] = price
 
-        return Send.request(self, path=path, postData=postData, verb="POST")
+        return Send.request(
+            self, path=path, postData=postData, verb="POST", session=self.order_session
+        )
 
     def replace_limit(
         self,
@@ -492,7 +494,9 @@ class Agent(Bitmex):
             "ordType": "Limit",
         }
 
-        return Send.request(self, path=path, postData=postData, verb="PUT")
+        return Send.request(
+            self, path=path, postData=postData, verb="PUT", session=self.order_session
+        )
 
     def remove_order(self, order: dict) -> Union[dict, str]:
         """
@@ -501,7 +505,34 @@ class Agent(Bitmex):
         path = Listing.ORDER_ACTIONS
         postData = {"orderID": order["orderID"]}
 
-        return Send.request(self, path=path, postData=postData, verb="DELETE")
+        return Send.request(
+            self,
+            path=path,
+            postData=postData,
+            verb="DELETE",
+            session=self.order_session,
+        )
+
+    def remove_many(self, orders: list) -> list:
+        """
+        Deletes orders with one request, see WS.remove_many(). Placing and
+        moving several orders are sent as single requests, since Bitmex no
+        longer supports the bulk order endpoints.
+        """
+        path = Listing.ORDER_ACTIONS
+        postData = {"orderID": [order["orderID"] for order in orders]}
+        res = Send.request(
+            self,
+            path=path,
+            postData=postData,
+            verb="DELETE",
+            session=self.order_session,
+        )
+        if not isinstance(res, list):
+            return [res] * len(orders)
+        canceled = {value["orderID"]: value for value in res}
+
+        return [canceled.get(order["orderID"], "IGNORE") for order in orders]
 
     def get_wallet_balance(self):
         """
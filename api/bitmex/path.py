@@ -18,6 +18,7 @@ class Listing(str, Enum):
     GET_POSITION_INFO = "/position"
     OPEN_ORDERS = "/order?filter=%7B%22open%22%3A%20true%7D&reverse=false"
     CANCEL_ALL_BY_INSTRUMENT = "/order/all?symbol={SYMBOL}"
+    KEEP_ALIVE = "/instrument?count=1&columns=symbol"
 
     def __str__(self) -> str:
         return self.value
@@ -14,11 +14,13 @@ from api.errors import Error
 from api.init import Setup
 from api.variables import Variables
 from common.data import MetaAccount, MetaInstrument, MetaResult
+from common.ratelimit import RateLimiter, TokenBucket
 from common.variables import Variables as var
 from services import display_exception
 
 from .api_auth import API_auth
 from .error import ErrorStatus
+from .path import Listing
 
 
 class Bitmex(Variables):
@@ -40,6 +42,9 @@ class Bitmex(Variables):
         self.session.headers.update({"user-agent": "Tmatic"})
         self.session.headers.update({"content-type": "application/json"})
         self.session.headers.update({"accept": "application/json"})
+        # Session for orders if FAST_ORDER_ENTRY is set, see setup_session().
+        self.order_session = None
+        self.keep_alive = 20
         self.currency_divisor = {
             "XBt": 100000000,
             "USDt": 1000000,
@@ -48,6 +53,19 @@ class Bitmex(Variables):
             "BBx": 1000000,
         }  # MATIc, BBx are probably incorrect
         self.timefrs = OrderedDict([(1, "1m"), (5, "5m"), (60, "1h")])
+        # Bitmex allows 120 requests per minute, half of them are left for
+        # trading.
+        self.kline_rate_limit = TokenBucket(rate=1, capacity=5)
+        # All requests: 120 per minute. Order placement, amendment and
+        # cancellation: additionally 10 per second.
+        self.rate_limiter = RateLimiter(
+            limits={"default": (2, 120), "order": (10, 10)},
+            routes=((("POST", "PUT", "DELETE"), "/order", ("default", "order")),),
+            headers={
+                "x-ratelimit-remaining": "default",
+                "x-ratelimit-remaining-1s": "order",
+            },
+        )
         self.logger = var.logger
         self.klines = dict()
         self.setup_orders = list()
@@ -61,9 +79,32 @@ class Bitmex(Variables):
 
     def setup_session(self):
         """
-        Not used in Bitmex.
+        Creates a separate session for orders if FAST_ORDER_ENTRY is set.
+        Its connection is kept open with a light request every keep_alive
+        seconds, so that an order does not wait for a new TCP and TLS
+        handshake after a quiet period or behind a long download on the
+        default session.
         """
-        pass
+        self.order_session = None
+        if var.env["FAST_ORDER_ENTRY"] == "YES":
+            session = requests.Session()
+            session.headers.update(self.session.headers)
+            self.order_session = session
+            t = threading.Thread(target=self.__keep_alive, args=(session,))
+            t.daemon = True
+            t.start()
+
+    def __keep_alive(self, session: requests.Session) -> None:
+        url = self.http_url + Listing.KEEP_ALIVE
+        while True:
+            sleep(self.keep_alive)
+            if self.order_session is not session:
+                break
+            self.rate_limiter.acquire(path=Listing.KEEP_ALIVE, verb="GET")
+            try:
+                session.get(url, timeout=7)
+            except Exception as exception:
+                self.logger.warning("Order session keep-alive - " + str(exception))
 
     def start_ws(self) -> str:
         if var.order_book_depth != "quote":
@@ -1,6 +1,6 @@
 import threading
 from datetime import datetime, timedelta, timezone
-from typing import Union
+from typing import Callable, Union
 
 import services as service
 from api.bybit.erruni import Unify
@@ -470,9 +470,11 @@ class Agent(Bybit):
             "orderLinkId": clOrdID,
         }
         if ordType == "Limit":
-            params["price"] = price
+            params["price"] = str(price)
         try:
-            return self.session.place_order(**params)
+            return Agent._order_request(
+                self, op="order.create", method=self.session.place_order, params=params
+            )
         except Exception as exception:
             error = Unify.error_handler(
                 self, exception=exception, verb="POST", path="place_order"
@@ -489,13 +491,16 @@ class Agent(Bybit):
         orderQty: float,
     ) -> Union[dict, str]:
         instrument = self.Instrument[symbol]
+        params = {
+            "category": instrument.category,
+            "symbol": instrument.ticker,
+            "orderId": orderID,
+            "qty": str(leavesQty),
+            "price": str(price),
+        }
         try:
-            return self.session.amend_order(
-                category=instrument.category,
-                symbol=instrument.ticker,
-                orderId=orderID,
-                qty=str(leavesQty),
-                price=str(price),
+            return Agent._order_request(
+                self, op="order.amend", method=self.session.amend_order, params=params
             )
         except Exception as exception:
             error = Unify.error_handler(
@@ -505,11 +510,14 @@ class Agent(Bybit):
             return error
 
     def remove_order(self, order: dict) -> Union[dict, str]:
+        params = {
+            "category": self.Instrument[order["symbol"]].category,
+            "symbol": order["symbol"][0],
+            "orderId": order["orderID"],
+        }
         try:
-            return self.session.cancel_order(
-                category=self.Instrument[order["symbol"]].category,
-                symbol=order["symbol"][0],
-                orderId=order["orderID"],
+            return Agent._order_request(
+                self, op="order.cancel", method=self.session.cancel_order, params=params
             )
         except Exception as exception:
             error = Unify.error_handler(
@@ -518,6 +526,175 @@ class Agent(Bybit):
 
             return error
 
+    def _order_request(self, op: str, method: Callable, params: dict) -> dict:
+        """
+        Sends the order request over the websocket trade channel if it is
+        connected, otherwise with the REST session.
+
+        Parameters
+        ----------
+        op: str
+            Operation of the trade channel, e.g. "order.create".
+        method: Callable
+            pybit method of the same operation.
+        params: dict
+            Request parameters.
+        """
+        if self.trade_ws and self.trade_ws.connected:
+            return self.trade_ws.request(op=op, params=params)
+
+        return method(**params)
+
+    def place_many(self, orders: list) -> list:
+        """
+        Places orders with batch requests, see WS.place_many().
+        """
+        requests = list()
+        for order in orders:
+            instrument = self.Instrument[order["symbol"]]
+            request = {
+                "symbol": instrument.ticker,
+                "side": "Buy" if order["quantity"] > 0 else "Sell",
+                "orderType": order["ordType"],
+                "qty": str(abs(order["quantity"])),
+                "orderLinkId": order["clOrdID"],
+            }
+            if order["ordType"] == "Limit":
+                request["price"] = str(order["price"])
+            requests.append((instrument.category, request))
+
+        return Agent._batch(
+            self,
+            method=self.session.place_batch_order,
+            requests=requests,
+            path="place_batch_order",
+        )
+
+    def replace_many(self, orders: list) -> list:
+        """
+        Moves orders with batch requests, see WS.replace_many().
+        """
+        requests = list()
+        for order in orders:
+            instrument = self.Instrument[order["symbol"]]
+            request = {
+                "symbol": instrument.ticker,
+                "orderId": order["orderID"],
+                "qty": str(order["leavesQty"]),
+                "price": str(order["price"]),
+            }
+            requests.append((instrument.category, request))
+
+        return Agent._batch(
+            self,
+            method=self.session.amend_batch_order,
+            requests=requests,
+            path="amend_batch_order",
+        )
+
+    def remove_many(self, orders: list) -> list:
+        """
+        Deletes orders with batch requests, see WS.remove_many().
+        """
+        requests = list()
+        for order in orders:
+            category = self.Instrument[order["symbol"]].category
+            request = {"symbol": order["symbol"][0], "orderId": order["orderID"]}
+            requests.append((category, request))
+
+        return Agent._batch(
+            self,
+            method=self.session.cancel_batch_order,
+            requests=requests,
+            path="cancel_batch_order",
+        )
+
+    def _batch(self, method: Callable, requests: list, path: str) -> list:
+        """
+        Sends batch requests grouped by category, up to the maximum number
+        of orders per request for the category.
+
+        Parameters
+        ----------
+        method: Callable
+            pybit batch method.
+        requests: list
+            Elements are (category, request parameters of one order).
+        path: str
+            Method name for error messages.
+
+        Returns
+        -------
+        list
+            Results in the same order as the requests: the result of the
+            order (dict) if successful, otherwise the error type (str).
+        """
+
+        def warning(message: str) -> None:
+            self.logger.warning(message)
+            var.queue_info.put(
+                {
+                    "market": self.name,
+                    "message": message,
+                    "time": datetime.now(tz=timezone.utc),
+                    "warning": "warning",
+                }
+            )
+
+        results = [None] * len(requests)
+        categories = dict()
+        for num, (category, _) in enumerate(requests):
+            categories.setdefault(category, list()).append(num)
+        for category, nums in categories.items():
+            size = self.batch_size[category] if category in self.batch_size else 20
+            for start in range(0, len(nums), size):
+                chunk = nums[start : start + size]
+                try:
+                    res = method(
+                        category=category, request=[requests[num][1] for num in chunk]
+                    )
+                except Exception as exception:
+                    error = Unify.error_handler(
+                        self, exception=exception, verb="POST", path=path
+                    )
+                    for num in chunk:
+                        results[num] = error
+                    continue
+                items = res["result"]["list"]
+                codes = res["retExtInfo"]["list"]
+                for num, item, code in zip(chunk, items, codes):
+                    if code["code"] == 0:
+                        results[num] = item
+                    else:
+                        warning(
+                            "On request POST "
+                            + path
+                            + " - error - "
+                            + str(code["code"])
+                            + " "
+                            + code["msg"]
+                        )
+                        results[num] = "IGNORE"
+
+                # The orders without a result in the response are considered
+                # not completed.
+
+                received = min(len(items), len(codes))
+                if received < len(chunk):
+                    warning(
+                        "On request POST "
+                        + path
+                        + " - "
+                        + str(len(chunk))
+                        + " orders sent, "
+                        + str(received)
+                        + " results received"
+                    )
+                    for num in chunk[received:]:
+                        results[num] = "IGNORE"
+
+        return results
+
     def get_wallet_balance(self) -> str:
         """
         Requests wallet balance usually for two types of accounts: UNIFIED,
@@ -76,6 +76,7 @@ class _V5HTTPManager:
     referral_id: bool = field(default=None)
     record_request_time: bool = field(default=False)
     return_response_headers: bool = field(default=False)
+    rate_limiter: object = field(default=None)
 
     def __post_init__(self):
         subdomain = SUBDOMAIN_TESTNET if self.testnet else SUBDOMAIN_MAINNET
@@ -259,9 +260,18 @@ class _V5HTTPManager:
                     requests.Request(method, path, data=req_params, headers=headers)
                 )
 
+            # Wait for the rate limit of the endpoint, if set.
+            if self.rate_limiter:
+                limit_path = path[len(self.endpoint) :]
+                classes = self.rate_limiter.acquire(path=limit_path, verb=method)
+
             # Attempt the request.
             try:
                 s = self.client.send(r, timeout=self.timeout)
+                if self.rate_limiter:
+                    self.rate_limiter.learn(
+                        classes=classes, headers=s.headers, path=limit_path
+                    )
 
             # If requests fires an error, retry.
             except (
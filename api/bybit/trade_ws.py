@@ -0,0 +1,207 @@
+import hashlib
+import hmac
+import itertools
+import json
+import threading
+import time
+from datetime import datetime as dt
+from logging import Logger
+
+import websocket
+
+from common.ratelimit import RateLimiter
+
+from .pybit.exceptions import InvalidRequestError
+
+TRADE_WS_URL = "wss://stream.bybit.com/v5/trade"
+TRADE_WS_TESTNET_URL = "wss://stream-testnet.bybit.com/v5/trade"
+
+
+class TradeWebSocket:
+    """
+    Bybit v5 websocket trade channel. Orders are sent over one authorized
+    connection that stays open, so they do not pay for TLS handshakes and
+    HTTP headers as REST requests do. Responses are matched to requests by
+    reqId, and the waiting thread is woken by an event. If the connection
+    is lost, it is reopened after ``reconnect`` seconds.
+
+    Parameters
+    ----------
+    api_key: str
+        API key.
+    api_secret: str
+        API secret.
+    testnet: bool
+        Connects to the testnet if True.
+    rate_limiter: RateLimiter
+        Rate limits of the Bybit REST endpoints, which also apply to the
+        same operations of the trade channel.
+    logger: Logger
+        Application logger.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        api_secret: str,
+        testnet: bool,
+        rate_limiter: RateLimiter,
+        logger: Logger,
+    ) -> None:
+        self.url = TRADE_WS_TESTNET_URL if testnet else TRADE_WS_URL
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.rate_limiter = rate_limiter
+        self.logger = logger
+        self.timeout = 5
+        self.reconnect = 3
+        self.recv_window = 5000
+        self.ws = None
+        self.active = False
+        self.authorized = threading.Event()
+        self.response = dict()
+        self.sequence = itertools.count()
+
+    @property
+    def connected(self) -> bool:
+        return self.authorized.is_set()
+
+    def connect(self) -> bool:
+        """
+        Opens the connection and waits for the authorization. Returns False
+        if the channel is not authorized within the timeout.
+        """
+        self.active = True
+        self._open()
+        if not self.authorized.wait(self.timeout):
+            self.logger.error(
+                "Bybit trade websocket is not connected. Orders are sent via REST."
+            )
+            return False
+        self.logger.info("Bybit trade websocket connected.")
+
+        return True
+
+    def close(self) -> None:
+        self.active = False
+        self.authorized.clear()
+        if self.ws:
+            try:
+                self.ws.close()
+            except Exception:
+                pass
+
+    def _open(self) -> None:
+        self.ws = websocket.WebSocketApp(
+            self.url,
+            on_open=self._on_open,
+            on_message=self._on_message,
+            on_error=self._on_error,
+            on_close=self._on_close,
+        )
+        t = threading.Thread(
+            target=lambda: self.ws.run_forever(ping_interval=20, ping_timeout=10)
+        )
+        t.daemon = True
+        t.start()
+
+    def _on_open(self, ws) -> None:
+        expires = int((time.time() + 10) * 1000)
+        signature = hmac.new(
+            bytes(self.api_secret, "utf-8"),
+            bytes(f"GET/realtime{expires}", "utf-8"),
+            hashlib.sha256,
+        ).hexdigest()
+        ws.send(json.dumps({"op": "auth", "args": [self.api_key, expires, signature]}))
+
+    def _on_message(self, ws, message) -> None:
+        message = json.loads(message)
+        if message.get("op") == "auth":
+            if message.get("retCode") == 0:
+                self.authorized.set()
+            else:
+                self.logger.error(
+                    "Bybit trade websocket authorization failed: "
+                    + str(message.get("retMsg"))
+                )
+        elif "reqId" in message:
+            request = self.response.get(message["reqId"])
+            if request:
+                request["result"] = message
+                request["event"].set()
+
+    def _on_error(self, ws, error) -> None:
+        self.logger.error("Bybit trade websocket error: " + str(error))
+
+    def _on_close(self, *args) -> None:
+        self.authorized.clear()
+        for request in list(self.response.values()):
+            request["event"].set()
+        if self.active:
+            self.logger.info("Bybit trade websocket closed. Reconnecting.")
+            threading.Timer(self.reconnect, self._reopen).start()
+
+    def _reopen(self) -> None:
+        if self.active:
+            self._open()
+
+    def request(self, op: str, params: dict) -> dict:
+        """
+        Sends an order operation such as "order.create", "order.amend",
+        "order.cancel" and waits for the response.
+
+        Returns
+        -------
+        dict
+            The response in the same form as the pybit REST response, with
+            "retCode", "retMsg", "result".
+
+        Raises
+        ------
+        InvalidRequestError
+            If Bybit rejects the request, as pybit does, so that the error
+            is handled in the same way.
+        WebSocketTimeoutException
+            If there is no response within the timeout.
+        """
+        path = "/v5/" + op.replace(".", "/")
+        classes = self.rate_limiter.acquire(path=path, verb="POST")
+        req_id = str(next(self.sequence))
+        request = {"event": threading.Event(), "result": None}
+        self.response[req_id] = request
+        msg = {
+            "reqId": req_id,
+            "header": {
+                "X-BAPI-TIMESTAMP": str(int(time.time() * 1000)),
+                "X-BAPI-RECV-WINDOW": str(self.recv_window),
+            },
+            "op": op,
+            "args": [params],
+        }
+        try:
+            self.ws.send(json.dumps(msg))
+            request["event"].wait(self.timeout)
+        finally:
+            self.response.pop(req_id, None)
+        res = request["result"]
+        if res is None:
+            raise websocket.WebSocketTimeoutException(
+                f"No response from the trade websocket. Request → {op}: {params}."
+            )
+        if "header" in res:
+            self.rate_limiter.learn(classes=classes, headers=res["header"], path=path)
+        if res["retCode"]:
+            raise InvalidRequestError(
+                request=f"{op}: {params}",
+                message=res["retMsg"],
+                status_code=res["retCode"],
+                time=dt.utcnow().strftime("%H:%M:%S"),
+                resp_headers=res.get("header"),
+            )
+
+        return {
+            "retCode": res["retCode"],
+            "retMsg": res["retMsg"],
+            "result": res.get("data", {}),
+            "retExtInfo": res.get("retExtInfo", {}),
+        }
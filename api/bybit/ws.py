@@ -9,12 +9,15 @@ from api.bybit.erruni import Unify
 from api.init import Setup
 from api.variables import Variables
 from common.data import MetaAccount, MetaInstrument, MetaResult
+from common.orderbook import OrderBook
+from common.ratelimit import RateLimiter, TokenBucket
 from common.variables import Variables as var
 from display.messages import ErrorMessage, Message
 
 from .error import ErrorStatus
 from .pybit._websocket_stream import _V5WebSocketManager
 from .pybit.unified_trading import HTTP, WebSocket
+from .trade_ws import TradeWebSocket
 
 
 class Bybit(Variables):
@@ -58,6 +61,18 @@ class Bybit(Variables):
                 (1440, "D"),
             ]
         )
+        # Bybit allows 600 requests per 5 seconds per IP.
+        self.kline_rate_limit = TokenBucket(rate=10, capacity=20)
+        # Bybit limits each endpoint separately and reports the remaining
+        # quota of the endpoint in X-Bapi-Limit-Status. Orders: 10 requests
+        # per second, other endpoints: at least 20.
+        self.rate_limiter = RateLimiter(
+            limits={"default": (20, 50), "order": (10, 10)},
+            routes=((("POST",), "/v5/order/", ("order",)),),
+            headers={"X-Bapi-Limit-Status": None},
+        )
+        # Maximum number of orders in a batch request. 20 for other categories.
+        self.batch_size = {"spot": 10}
         self.orderbook_depth = {
             "quote": {"spot": 1, "inverse": 1, "option": 25, "linear": 1},
             "orderBook": {"spot": 50, "inverse": 50, "option": 25, "linear": 50},
@@ -66,6 +81,9 @@ class Bybit(Variables):
         self.settleCoin_list = list()
         self.logger = var.logger
         self.klines = dict()
+        self.orderbooks = dict()
+        # Websocket trade channel for orders if FAST_ORDER_ENTRY is set.
+        self.trade_ws: TradeWebSocket = None
         self.setup_orders = list()
         self.account_disp = ""
         WebSocket._on_message = Bybit._on_message
@@ -80,7 +98,19 @@ class Bybit(Variables):
             api_key=self.api_key,
             api_secret=self.api_secret,
             testnet=self.testnet,
+            rate_limiter=self.rate_limiter,
         )
+        if self.trade_ws:
+            self.trade_ws.close()
+            self.trade_ws = None
+        if var.env["FAST_ORDER_ENTRY"] == "YES":
+            self.trade_ws = TradeWebSocket(
+                api_key=self.api_key,
+                api_secret=self.api_secret,
+                testnet=self.testnet,
+                rate_limiter=self.rate_limiter,
+                logger=self.logger,
+            )
 
     def start_ws(self):
         """
@@ -99,6 +129,8 @@ class Bybit(Variables):
                 self.Result[(instrument.quoteCoin, self.name)]
 
         self.__connect()
+        if self.trade_ws and not self.trade_ws.connected:
+            self.trade_ws.connect()
 
     def __connect(self) -> None:
         """
@@ -193,15 +225,23 @@ class Bybit(Variables):
                 path="Private execution_stream",
             )
 
-    def __update_orderbook(self, values: dict, category: str) -> None:
+    def __update_orderbook(self, values: dict, category: str, snapshot: bool) -> None:
+        """
+        Receives the order book snapshot or delta as sent by the exchange
+        and updates the local book incrementally. Only the changed levels
+        are converted, and the top 10 levels are copied to the instrument
+        only if they have changed.
+        """
         symbol = (self.ticker[(values["s"], category)], self.name)
         instrument = self.Instrument[symbol]
-        asks = list(map(lambda x: [float(x[0]), float(x[1])], values["a"]))
-        bids = list(map(lambda x: [float(x[0]), float(x[1])], values["b"]))
-        asks.sort(key=lambda x: x[0])
-        bids.sort(key=lambda x: x[0], reverse=True)
-        instrument.asks = asks[:10]
-        instrument.bids = bids[:10]
+        if symbol not in self.orderbooks:
+            self.orderbooks[symbol] = OrderBook(depth=10)
+        book = self.orderbooks[symbol]
+        asks, bids = book.update(asks=values["a"], bids=values["b"], snapshot=snapshot)
+        if asks:
+            instrument.asks = book.asks.top(book.depth)
+        if bids:
+            instrument.bids = book.bids.top(book.depth)
         if symbol in self.klines:
             self.kline_hi_lo_values(symbol=symbol, instrument=instrument)
 
@@ -304,14 +344,8 @@ class Bybit(Variables):
                 orderStatus = "Canceled"
             elif value["orderStatus"] == "New":
                 if value["orderLinkId"]:
-                    for orders in var.orders.values():
-                        for clOrdID in orders:
-                            if clOrdID == value["orderLinkId"]:
-                                orderStatus = "Replaced"
-                                break
-                        else:
-                            continue
-                        break
+                    if var.orders.find(index="clOrdID", value=value["orderLinkId"]):
+                        orderStatus = "Replaced"
                     else:
                         orderStatus = "New"
                 else:
@@ -407,6 +441,8 @@ class Bybit(Variables):
             self.ws_private.exit()
         except Exception:
             pass
+        if self.trade_ws:
+            self.trade_ws.close()
         self.api_is_active = False
         self.logger.info("Websocket closed.")
 
@@ -499,7 +535,9 @@ class Bybit(Variables):
                     depth=self.orderbook_depth[var.order_book_depth][category],
                     symbol=ticker,
                     callback=lambda x: self.__update_orderbook(
-                        values=x["data"], category="linear"
+                        values=x["data"],
+                        category="linear",
+                        snapshot=x["type"] == "snapshot",
                     ),
                 )
             except Exception as exception:
@@ -540,7 +578,9 @@ class Bybit(Variables):
                     depth=self.orderbook_depth[var.order_book_depth][category],
                     symbol=ticker,
                     callback=lambda x: self.__update_orderbook(
-                        values=x["data"], category="inverse"
+                        values=x["data"],
+                        category="inverse",
+                        snapshot=x["type"] == "snapshot",
                     ),
                 )
             except Exception as exception:
@@ -581,7 +621,9 @@ class Bybit(Variables):
                     depth=self.orderbook_depth[var.order_book_depth][category],
                     symbol=ticker,
                     callback=lambda x: self.__update_orderbook(
-                        values=x["data"], category="spot"
+                        values=x["data"],
+                        category="spot",
+                        snapshot=x["type"] == "snapshot",
                     ),
                 )
             except Exception as exception:
@@ -630,7 +672,9 @@ class Bybit(Variables):
                     depth=self.orderbook_depth[var.order_book_depth][category],
                     symbol=ticker,
                     callback=lambda x: self.__update_orderbook(
-                        values=x["data"], category="option"
+                        values=x["data"],
+                        category="option",
+                        snapshot=x["type"] == "snapshot",
                     ),
                 )
             except Exception as exception:
@@ -801,6 +845,10 @@ class Bybit(Variables):
                 self._process_subscription_message(message)
         elif message.get("op") == "unsubscribe":
             Bybit._process_unsubscription_message(message)
+        elif message.get("topic", "").startswith("orderbook"):
+            # The snapshot or delta is passed on as is, the book is merged
+            # in Bybit.__update_orderbook().
+            self._get_callback(message["topic"])(message)
         else:
             self._process_normal_message(message)
 
@@ -8,6 +8,7 @@ from typing import Union
 import services as service
 from api.errors import Error
 from api.http import Send
+from common.latency import request_latency
 from common.variables import Variables as var
 from display.messages import ErrorMessage, Message
 
@@ -832,42 +833,21 @@ class Agent(Deribit):
             limits = lim["trading"]["total"]
             if "spot" in lim:
                 limits = lim["spot"]
-            maximum_quotes = lim["maximum_quotes"]
-            cancel_all = lim["cancel_all"]
-            scheme = self.scheme["matching_engine"]
+            endpoint_class = "matching_engine"
+        elif path == "private/get_transaction_log":
+            limits = limit[path]
+            endpoint_class = path
         else:
-            if path == "private/get_transaction_log":
-                limits = limit[path]
-                scheme = self.scheme[path]
-            else:
-                limits = limit["non_matching_engine"]
-                scheme = self.scheme["non_matching_engine"]
-        count = 0
-        scheme["lock"].acquire(True)
-        for num in range(len(scheme["time"]) - 1, -1, -1):
-            tm = time.time()
-            if tm - scheme["time"][num] < 1:
-                count += 1
-            if tm - scheme["time"][num] > 5:  # Considering 5
-                # seconds withot a single request to return the burst scheme.
-                scheme["time"].pop(num)
-        if scheme["scheme"] == "burst" and len(scheme["time"]) >= limits["burst"]:
-            scheme["scheme"] = "rate"
-        elif not len(scheme["time"]):
-            scheme["scheme"] = "burst"
-        if scheme["scheme"] == "rate":
-            number = min(limits["rate"], count)
-            slp = 1 - (time.time() - scheme["time"][-number])
-            if slp < 0:
-                slp = 0
-            time.sleep(slp)  # Wait if the number of requests per second is exceeded.
-        scheme["lock"].release()
+            limits = limit["non_matching_engine"]
+            endpoint_class = "default"
+        self.rate_limiter.configure(
+            endpoint_class, rate=limits["rate"], capacity=limits["burst"]
+        )
         while True:
-            self.response[id] = {
-                "request_time": time.time() + self.ws_request_delay,
-                "result": None,
-            }
-            scheme["time"].append(time.time())
+            self.rate_limiter.acquire(path=path, verb="ws")
+            request = {"event": threading.Event(), "result": None}
+            self.response[id] = request
+            sent = time.perf_counter()
             msg = {"method": path, "params": params, "jsonrpc": "2.0", "id": id}
             try:
                 self.ws.send(json.dumps(msg))
@@ -884,27 +864,26 @@ class Agent(Deribit):
                         "warning": "error",
                     }
                 )
-            while time.time() < self.response[id]["request_time"]:
-                res = self.response[id]["result"]
-                if res is not None:
-                    if isinstance(res, dict) and "error" in res:
-                        error = Error.handler(
-                            self,
-                            exception=DeribitWsRequestError(response=res),
-                            response=res,
-                            verb="request via ws",
-                            path=path,
-                        )
-                        if error == "RETRY":
-                            time.sleep(0.5)
-                            break
-                        else:
-                            del self.response[id]
-                            return error
+            if request["event"].wait(self.ws_request_delay):
+                request_latency.record((self.name, path), time.perf_counter() - sent)
+                res = request["result"]
+                if isinstance(res, dict) and "error" in res:
+                    error = Error.handler(
+                        self,
+                        exception=DeribitWsRequestError(response=res),
+                        response=res,
+                        verb="request via ws",
+                        path=path,
+                    )
+                    if error == "RETRY":
+                        time.sleep(0.5)
+                        continue
                     else:
-                        del self.response[id]
-                        return res
-                time.sleep(0.05)
+                        self.response.pop(id, None)
+                        return error
+                else:
+                    self.response.pop(id, None)
+                    return res
             else:
                 message = (
                     "No response to websocket "
@@ -924,7 +903,7 @@ class Agent(Deribit):
                         "warning": "error",
                     }
                 )
-                self.response[id]
+                self.response.pop(id, None)
 
                 return service.unexpected_error(self)
 
@@ -967,16 +946,11 @@ class Agent(Deribit):
                         his_data = history["data"]
                         if isinstance(his_data, list):
                             for row in his_data:
-                                data = service.select_database(  # read_database
-                                    "select EXECID from %s where EXECID='%s' and account=%s and market='%s'"
-                                    % (
-                                        var.database_table,
-                                        row["execID"],
-                                        self.user_id,
-                                        self.name,
-                                    ),
-                                )
-                                if not data:
+                                if not service.execution_exists(
+                                    market=self.name,
+                                    account=self.user_id,
+                                    execID=row["execID"],
+                                ):
                                     self.transaction(row=row)
                         else:
                             message = "Failed request for funding and delivery information that arrived at 8:00 AM"
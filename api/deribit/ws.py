@@ -3,7 +3,7 @@ import threading
 import time
 from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
-from typing import Callable
+from typing import Callable, Union
 
 import requests
 import websocket
@@ -14,12 +14,14 @@ from api.errors import Error
 from api.init import Setup
 from api.variables import Variables
 from common.data import MetaAccount, MetaInstrument, MetaResult
+from common.ratelimit import RateLimiter, TokenBucket
 from common.variables import Variables as var
 from display.messages import Message
 from services import display_exception
 
 from .api_auth import API_auth
 from .error import DeribitWsRequestError
+from .path import Matching_engine
 
 
 class Deribit(Variables):
@@ -65,6 +67,9 @@ class Deribit(Variables):
                 (1440, "1D"),
             ]
         )
+        # Deribit allows 20 non-matching engine requests per second with a
+        # burst of 100, half of them are left for other requests.
+        self.kline_rate_limit = TokenBucket(rate=10, capacity=20)
         self.ws = websocket
         self.logger = var.logger
         self.klines = dict()
@@ -74,26 +79,30 @@ class Deribit(Variables):
         self.pinging = datetime.now(tz=timezone.utc)
         self.heartbeat_interval = 10
         self.callback_directory = dict()
+        # Pending ws_request() by request id: {"event": Event, "result": ...}
         self.response = dict()
         self.settleCoin_list = ["BTC", "ETH", "USDC", "USDT", "EURR"]
         self.ws_request_delay = 5
-        self.scheme = {
-            "matching_engine": {
-                "lock": threading.Lock(),
-                "scheme": "burst",
-                "time": [],
+        # Credit-based limits of https://www.deribit.com/kb/deribit-rate-limits
+        # as (rate, burst). The "default" class is the non-matching engine.
+        # The values are replaced by the account limits when they are known.
+        self.rate_limiter = RateLimiter(
+            limits={
+                "default": (20, 100),
+                "matching_engine": (5, 20),
+                "private/get_transaction_log": (2, 10),
             },
-            "non_matching_engine": {
-                "lock": threading.Lock(),
-                "scheme": "burst",
-                "time": [],
-            },
-            "private/get_transaction_log": {
-                "lock": threading.Lock(),
-                "scheme": "burst",
-                "time": [],
-            },
-        }
+            routes=tuple(
+                (None, path, ("matching_engine",)) for path in Matching_engine.PATHS
+            )
+            + (
+                (
+                    None,
+                    "private/get_transaction_log",
+                    ("private/get_transaction_log",),
+                ),
+            ),
+        )
         self.ticker = dict()
         self.funding_thread_active = True
         self.instrument_index = OrderedDict()
@@ -273,6 +282,16 @@ class Deribit(Variables):
             callback=self.__update_ticker,
         )
 
+    def __complete_request(self, id: str, result: Union[dict, list]) -> None:
+        """
+        Passes the result to the pending ws_request() with this id and wakes
+        it up.
+        """
+        request = self.response.get(id)
+        if request is not None:
+            request["result"] = result
+            request["event"].set()
+
     def __on_message(self, ws, message):
         try:
             message = json.loads(message)
@@ -289,8 +308,7 @@ class Deribit(Variables):
                     if message["result"] == "ok":
                         self.logger.info("Heartbeat established.")
                 else:
-                    if id in self.response:
-                        self.response[id]["result"] = message["result"]
+                    self.__complete_request(id=id, result=message["result"])
             elif "params" in message:
                 if message["method"] == "subscription":
                     self.callback_directory[message["params"]["channel"]](
@@ -303,7 +321,7 @@ class Deribit(Variables):
                 res = {"error": message["error"]}
                 if "id" in message:
                     if message["id"] in self.response:
-                        self.response[message["id"]]["result"] = res
+                        self.__complete_request(id=message["id"], result=res)
                     else:
                         Error.handler(
                             self,
@@ -506,8 +524,7 @@ class Deribit(Variables):
                 if order_state == "New" and value["replaced"]:
                     order_state = "Replaced"
                     response_id = "private/edit_" + value["order_id"]
-                if response_id in self.response:
-                    self.response[response_id]["result"] = value
+                self.__complete_request(id=response_id, result=value)
                 if order_state:
                     """
                     '
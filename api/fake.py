@@ -2,6 +2,7 @@ from collections import OrderedDict
 
 from api.variables import Variables
 from common.data import MetaAccount, MetaInstrument, MetaResult
+from common.ratelimit import TokenBucket
 
 
 class Fake(Variables):
@@ -19,6 +20,7 @@ class Fake(Variables):
         self.symbol_list = ["BTCUSDT"]
         self.instrument_index = OrderedDict()
         self.klines = dict()
+        self.kline_rate_limit = TokenBucket(rate=1, capacity=1)
 
     def exit(self):
         pass
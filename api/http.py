@@ -25,9 +25,11 @@ class Send(Variables):
         verb: str = None,
         postData: dict = None,
         timeout=7,
+        session: requests.Session = None,
     ) -> Union[dict, str]:
         """
-        Sends a request to the exchange.
+        Sends a request to the exchange. The request waits if the rate limit
+        of its endpoint class is reached (see RateLimiter).
 
         Parameters
         ----------
@@ -41,6 +43,9 @@ class Send(Variables):
             Payload body of a HTTP request.
         timeout:
             Request timeout.
+        session: requests.Session
+            Session to send the request with, if not the market's default
+            session.
 
         Returns
         -------
@@ -49,10 +54,13 @@ class Send(Variables):
             type.
         """
         url = self.http_url + path
+        if session is None:
+            session = self.session
 
         cur_retries = 1
         while True:
             response = None
+            classes = self.rate_limiter.acquire(path=path, verb=verb)
             try:
                 req = requests.Request(verb, url, json=postData, params=None)
                 headers = self.api_auth.generate_headers(
@@ -64,8 +72,11 @@ class Send(Variables):
                     data=postData,
                 )
                 req.headers = headers
-                prepped = self.session.prepare_request(req)
-                response = self.session.send(prepped, timeout=timeout)
+                prepped = session.prepare_request(req)
+                response = session.send(prepped, timeout=timeout)
+                self.rate_limiter.learn(
+                    classes=classes, headers=response.headers, path=path
+                )
                 # Make non-200s throw
                 response.raise_for_status()
             except Exception as exception:
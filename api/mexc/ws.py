@@ -12,6 +12,7 @@ from api.errors import Error
 from api.init import Setup
 from api.variables import Variables
 from common.data import MetaAccount, MetaInstrument, MetaResult
+from common.ratelimit import RateLimiter, TokenBucket
 from common.variables import Variables as var
 from display.messages import Message
 from services import display_exception
@@ -37,6 +38,10 @@ class Mexc(Variables):
         self.session = requests.Session()  # Https requests.
         self.timefrs: OrderedDict  # Define the default time frames
         # set by the exchange.
+        self.kline_rate_limit = TokenBucket(rate=5, capacity=10)  # Limits
+        # kline data requests according to the exchange's published limits.
+        self.rate_limiter = RateLimiter(limits={"default": (10, 20)})  # Limits
+        # all other requests.
         self.ws = websocket  # Websocket object.
         self.logger = var.logger  # Writes to logfile.log.
         self.klines = dict()  # Kline (candlestick) data.
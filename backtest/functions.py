@@ -1,5 +1,4 @@
 import os
-from collections import OrderedDict
 from typing import Callable, Union
 
 import functions
@@ -7,6 +6,7 @@ import services as service
 from api.api import WS
 from api.setup import Markets
 from common.data import BotData, Instrument
+from common.kline import read_kline_file
 from common.variables import Variables as var
 from display.messages import ErrorMessage
 from functions import Function
@@ -62,6 +62,15 @@ def load_backtest_data(bot: BotData):
         filename = (
             os.getcwd() + f"/backtest/data/{symbol[1]}/{symbol[0]}/{bot.timefr}.csv"
         )
+        kline_file = Function.kline_data_filename(
+            Markets[symbol[1]], symbol=symbol, timefr=bot.timefr
+        )
+        if not os.path.exists(filename) and os.path.exists(kline_file):
+            # Candles recorded by Tmatic, e.g. sub-minute timeframes for
+            # which exchanges do not provide history.
+            print("Loading backtest data from", kline_file)
+            b_data += read_kline_file(kline_file)
+            continue
         print("Loading backtest data from", filename)
         with open(filename, "r") as file:
             headers = next(file).strip("\n").split(";")
@@ -126,7 +135,7 @@ def _trade(
         price=price,
     )
     if clOrdID:
-        del var.orders[bot.name][clOrdID]
+        var.orders.remove(emi=bot.name, clOrdID=clOrdID)
     else:
         clOrdID = service.set_clOrdID(emi=bot.name)
     Backtest.trades += 1
@@ -136,9 +145,7 @@ def _trade(
 
 
 def _check_trades(bot: BotData):
-    orders: OrderedDict = var.orders[bot.name]
-    orders_copy = orders.copy()
-    for clOrdID, order in orders_copy.items():
+    for order in var.orders.select(emi=bot.name):
         data = bot.backtest_data[order["symbol"]][bot.iter]
         if (order["side"] == "Sell" and data["hi"] > order["price"]) or (
             order["side"] == "Buy" and data["lo"] < order["price"]
@@ -153,7 +160,7 @@ def _check_trades(bot: BotData):
                 qty=order["leavesQty"],
                 price=order["price"],
                 ttime=ttime,
-                clOrdID=clOrdID,
+                clOrdID=order["clOrdID"],
             )
 
 
@@ -0,0 +1,215 @@
+"""
+Compares building klines of larger timeframes from a base series: the
+baseline path, merge_klines() over the downloaded rows and the conversion
+of each candle into a dict with "date" and "time" as load_klines() did, and
+KlineBuffer.resample() over the columns.
+
+Run from the repository root:
+
+    python -m benchmarks.kline_resample [rows] [repeat]
+
+By default, 500 candles each of 1h, 2h, 4h and 1D are built from 12000
+hourly rows, continuous and with gaps, the best of 20 runs is printed in
+milliseconds, and the candles of both paths are checked to be identical.
+"""
+
+import random
+import sys
+import timeit
+from datetime import datetime, timedelta, timezone
+
+from common.kline import KlineBuffer
+
+CAPACITY = 500
+TIMEFRAMES = (60, 120, 240, 1440)  # minutes
+KEYS = ("date", "time", "open_bid", "open_ask", "hi", "lo", "datetime")
+
+
+def make_rows(count: int, gaps: bool) -> list:
+    """
+    Hourly rows as they are returned by download_kline_data(). With gaps,
+    about 5% of the rows are missing, some of them several hours in a row.
+    """
+    random.seed(1)
+    start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    rows = list()
+    price = 100.0
+    skip = 0
+    for num in range(count):
+        price += random.uniform(-1, 1)
+        if gaps:
+            if skip:
+                skip -= 1
+                continue
+            if random.random() < 0.02:
+                skip = random.randint(0, 4)
+                continue
+        rows.append(
+            {
+                "timestamp": start + timedelta(hours=num),
+                "symbol": "XBTUSD",
+                "open": price,
+                "high": price + random.uniform(0, 1),
+                "low": price - random.uniform(0, 1),
+                "close": price,
+            }
+        )
+
+    return rows
+
+
+def merge_klines(data: list, timefr_minutes: int, prev: int):
+    """
+    merge_klines() of the baseline functions.py.
+    """
+    op = 0
+    hi = 0
+    lo = 0
+    cl = 0
+    timestamp, symbol = None, ""
+    res = list()
+    prev, fl = None, "append"
+    for num, el in enumerate(data, 1):
+        m = el["timestamp"]
+        delta = timedelta(
+            minutes=timefr_minutes
+            - m.minute % timefr_minutes
+            - (m.hour * 60) % timefr_minutes
+        )
+        next_t = el["timestamp"] + delta
+        if prev != next_t:
+            if op != 0:
+                res.append(
+                    {
+                        "timestamp": timestamp,
+                        "symbol": symbol,
+                        "open": op,
+                        "high": hi,
+                        "low": lo,
+                        "close": cl,
+                    }
+                )
+            timestamp = el["timestamp"]
+            op = el["open"]
+            hi = el["high"]
+            lo = el["low"]
+            cl = el["close"]
+            symbol = el["symbol"]
+            fl = "append"
+        else:
+            if el["high"] > hi:
+                hi = el["high"]
+            if el["low"] < lo:
+                lo = el["low"]
+            cl = el["close"]
+            fl = ""
+        prev = next_t
+    if fl == "" or num == len(data):
+        res.append(
+            {
+                "timestamp": timestamp,
+                "symbol": symbol,
+                "open": op,
+                "high": hi,
+                "low": lo,
+                "close": cl,
+            }
+        )
+
+    return res
+
+
+def baseline(rows: list) -> list:
+    """
+    The candles as the baseline load_klines() built them.
+    """
+    result = list()
+    for timefr_minutes in TIMEFRAMES:
+        res = merge_klines(data=rows, timefr_minutes=timefr_minutes, prev=60)
+        data = list()
+        for row in res[-CAPACITY:]:
+            tm = row["timestamp"]
+            data.append(
+                {
+                    "date": (tm.year - 2000) * 10000 + tm.month * 100 + tm.day,
+                    "time": tm.hour * 100 + tm.minute,
+                    "open_bid": float(row["open"]),
+                    "open_ask": float(row["open"]),
+                    "hi": float(row["high"]),
+                    "lo": float(row["low"]),
+                    "datetime": tm,
+                }
+            )
+        result.append(data)
+
+    return result
+
+
+def to_buffer(rows: list) -> KlineBuffer:
+    """
+    The downloaded rows converted into columns once, as load_base_klines()
+    does.
+    """
+    opens = [float(row["open"]) for row in rows]
+    base = KlineBuffer(capacity=len(rows))
+    base.extend(
+        timestamp=[int(row["timestamp"].timestamp()) for row in rows],
+        open_bid=opens,
+        open_ask=opens,
+        hi=[float(row["high"]) for row in rows],
+        lo=[float(row["low"]) for row in rows],
+        funding=[0.0] * len(rows),
+    )
+
+    return base
+
+
+def columnar(base: KlineBuffer) -> list:
+    result = list()
+    for timefr_minutes in TIMEFRAMES:
+        data = KlineBuffer(capacity=CAPACITY)
+        candles = base.resample(timefr_minutes=timefr_minutes, capacity=CAPACITY)
+        data.extend(**candles.columns())
+        result.append(data)
+
+    return result
+
+
+def check(rows: list) -> None:
+    for timefr_minutes, old, new in zip(
+        TIMEFRAMES, baseline(rows), columnar(to_buffer(rows))
+    ):
+        new = [{key: row[key] for key in KEYS} for row in new]
+        assert old == new, f"The {timefr_minutes} min candles differ."
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 12000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    for gaps in (False, True):
+        rows = make_rows(count, gaps=gaps)
+        check(rows)
+        base = to_buffer(rows)
+        times = {
+            "baseline merge_klines + dicts": timeit.repeat(
+                lambda: baseline(rows), number=1, repeat=repeat
+            ),
+            "columnar resample + extend": timeit.repeat(
+                lambda: columnar(base), number=1, repeat=repeat
+            ),
+            "columnar, including conversion": timeit.repeat(
+                lambda: columnar(to_buffer(rows)), number=1, repeat=repeat
+            ),
+        }
+        print(
+            f"{len(rows)} hourly rows{' with gaps' if gaps else ''} -> "
+            + f"{CAPACITY} candles of "
+            + ", ".join(f"{tf} min" for tf in TIMEFRAMES)
+            + f", best of {repeat}, candles identical:"
+        )
+        for name, values in times.items():
+            print(f"  {name:<40} {min(values) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,4 @@
 import threading
-from collections import OrderedDict
 from datetime import datetime, timezone
 
 import functions
@@ -56,13 +55,14 @@ def add_subscription(subscriptions: set) -> None:
                 + str(ws.user_id)
                 + ";"
             )
-            data = service.select_database(qwr)
+            data = service.select_database(qwr, flush=True)
             instrument = ws.Instrument[symbol]
             instrument.volume = round(data[0]["SUM_QTY"], instrument.precision)
             instrument.sumreal = data[0]["SUM_SUMREAL"]
 
 
 def load_bot_parameters():
+    robo.bots_loaded = False
     qwr = "select * from robots order by DAT;"
 
     data = service.select_database(qwr)
@@ -70,8 +70,6 @@ def load_bot_parameters():
         bd["DAT_datetime"] = service.combine_formats(bd["DAT"])
     data.sort(key=lambda x: x["DAT_datetime"])
     for value in data:
-        if value["EMI"] not in var.orders:
-            var.orders[value["EMI"]] = OrderedDict()
         bot = Bots[value["EMI"]]
         service.init_bot(
             bot=bot,
@@ -110,7 +108,7 @@ def load_bots() -> None:
         union = " union ALL "
     sql += ";"
     var.lock.acquire(True)
-    data = service.select_database(sql)
+    data = service.select_database(sql, flush=True)
     for value in data:
         ws = Markets[value["MARKET"]]
         symbol = (value["SYMBOL"], value["MARKET"])
@@ -131,7 +129,7 @@ def load_bots() -> None:
     while update:
         update = False
         qwr = functions.SelectDatabase.QWR.format(DATABASE_TABLE=var.database_table)
-        data = service.select_database(qwr)
+        data = service.select_database(qwr, flush=True)
         subscriptions = set()
         update_symbol = dict()
         for value in data:
@@ -155,7 +153,7 @@ def load_bots() -> None:
                                 "select ID, EMI, SYMBOL from %s where side <> 'Fund' and EMI = '%s'"
                                 % (var.database_table, name)
                             )
-                            data = service.select_database(qwr)
+                            data = service.select_database(qwr, flush=True)
                             for row in data:
                                 qwr = "update %s set EMI = '%s' where ID = %s;" % (
                                     var.database_table,
@@ -211,54 +209,33 @@ def load_bots() -> None:
 
     add_subscription(subscriptions=subscriptions)
 
-    # Loading trades and summing up the results for each bot.
+    # Loading trades and summing up the results for each bot. The totals of
+    # all bots and the trades of their open positions are selected at once
+    # and then distributed by bot.
 
+    totals, checkpoints, trades = load_bot_totals()
     for name in Bots.keys():
         # Open Positions
 
-        qwr = (
-            "select * from (select SYMBOL, CATEGORY, MARKET, TICKER, "
-            + "ifnull(sum(SUMREAL), 0) SUMREAL, ifnull(sum(case when SIDE = "
-            + "'Fund' then 0 else QTY end), 0) POS, ifnull(sum(case when SIDE "
-            + "= 'Fund' then 0 else abs(QTY) end), 0) VOL, ifnull(sum(COMMISS)"
-            + ", 0) COMMISS, ifnull(max(TTIME), '1900-01-01 01:01:01.000000') "
-            + "LTIME from "
-            + var.database_table
-            + " where EMI = '"
-            + name
-            + "' group by SYMBOL) T where POS <> 0;"
-        )
         var.lock.acquire(True)
-        data = service.select_database(qwr)
         bot = Bots[name]
-        for value in data:
-            symbol = (value["SYMBOL"], value["MARKET"])
+        for symbol, value in totals.get(name, dict()).items():
+            if round(value["POS"], 12) == 0:
+                continue
             if value["MARKET"] in var.market_list:
                 ws = Markets[value["MARKET"]]
                 instrument = ws.Instrument[symbol]
                 precision = instrument.precision
                 bot_pos = round(float(value["POS"]), precision)
                 if bot_pos != 0:
-                    # Loading transaction history for the position
-
-                    qwr = (
-                        "select EMI, MARKET, SYMBOL, QTY, PRICE, TRADE_PRICE, TTIME "
-                        + "from "
-                        + var.database_table
-                        + " where EMI = '"
-                        + name
-                        + "' and SYMBOL = '"
-                        + value["SYMBOL"]
-                        + "' and MARKET = '"
-                        + value["MARKET"]
-                        + "' order by TTIME"
-                    )
-                    data = service.select_database(qwr)
-                    (
-                        bot_position_entry,
-                        bot_position_sumreal,
-                    ) = functions.calculate_average_price(
-                        symbol=symbol, trades=data, bot_position_entry=None
+                    # Transaction history of the position
+
+                    bot_position_entry, bot_position_sumreal = load_entry(
+                        name=name,
+                        symbol=symbol,
+                        value=value,
+                        checkpoint=checkpoints.get((name, symbol)),
+                        trades=trades.get((name, symbol), list()),
                     )
                     service.fill_bot_position(
                         bot_name=name,
@@ -272,6 +249,7 @@ def load_bots() -> None:
                         ltime=service.time_converter(time=value["LTIME"], usec=True),
                         bot_position_entry=bot_position_entry,
                         entry_sumreal=bot_position_sumreal,
+                        totals=value["ACCOUNT"].get(ws.user_id, dict()),
                     )
             elif value["POS"] != 0:
                 message = (
@@ -290,22 +268,9 @@ def load_bots() -> None:
 
         # Results by currency for closed positions
 
-        qwr = (
-            "select SYMBOL, MARKET, CURRENCY, ifnull(sum(SUMREAL), 0) "
-            + "SUMREAL, ifnull(sum(COMMISS), 0) COMMISS, ifnull(sum(case when SIDE = "
-            + "'Fund' then 0 else QTY end), 0) POS, ifnull(max(TTIME), "
-            + "'1900-01-01 01:01:01.000000') LTIME from "
-            + var.database_table
-            + " where EMI = '"
-            + name
-            + "' group by MARKET, SYMBOL"
-        )
-
-        data = service.select_database(qwr)
         bot.bot_pnl = {}
-        for value in data:
+        for symbol, value in totals.get(name, dict()).items():
             if value["MARKET"] in var.market_list:
-                symbol = (value["SYMBOL"], value["MARKET"])
                 ws = Markets[value["MARKET"]]
                 instrument = ws.Instrument[symbol]
                 precision = instrument.precision
@@ -331,7 +296,20 @@ def load_bots() -> None:
                     BOT_NAME=name, MARKET=value["MARKET"]
                 )
                 _put_message(market="", message=message, warning="warning")
+
+        # Entry checkpoints are written only for the positions that match
+        # the database, not for those built from the trading history loaded
+        # before the bot.
+
+        for symbol, position in bot.bot_positions.items():
+            value = totals.get(name, dict()).get(symbol)
+            loaded = 0
+            if value:
+                precision = Markets[symbol[1]].Instrument[symbol].precision
+                loaded = round(float(value["POS"]), precision)
+            position["checkpoint"] = position["position"] == loaded
         var.lock.release()
+    robo.bots_loaded = True
 
     # Removing from every market's symbol_list subsribed single option strikes (if any)
 
@@ -353,6 +331,176 @@ def load_bots() -> None:
         import_bot_module(bot_name=bot_name)
 
 
+def load_bot_totals() -> tuple:
+    """
+    Selects the trade totals of all bots in one query, their entry price
+    checkpoints and the trades of their open positions after the checkpoints.
+
+    Returns
+    -------
+    tuple
+        totals: dict
+            By bot name and symbol: "MARKET", "CURRENCY", "SUMREAL",
+            "COMMISS", "POS" and "VOL" with funding excluded from "POS" and
+            "VOL", "QTY" of all rows, "LTIME" and "ACCOUNT", the totals
+            without funding by account: "SUM_QTY", "SUM_SUMREAL",
+            "SUM_COMMISS".
+        checkpoints: dict
+            By (bot name, symbol): the entry checkpoint of the market's
+            account.
+        trades: dict
+            By (bot name, symbol): the trades ordered by TTIME, as used by
+            calculate_average_price().
+    """
+    totals = dict()
+    checkpoints = dict()
+    trades = dict()
+    if not Bots.keys() or not var.market_list:
+        return totals, checkpoints, trades
+    names = ", ".join("'" + name + "'" for name in Bots.keys())
+    qwr = (
+        "select EMI, MARKET, SYMBOL, ACCOUNT, CURRENCY, ifnull(sum(QTY), 0) QTY, "
+        + "ifnull(sum(SUMREAL), 0) SUMREAL, ifnull(sum(COMMISS), 0) COMMISS, "
+        + "ifnull(sum(case when SIDE = 'Fund' then 0 else QTY end), 0) POS, "
+        + "ifnull(sum(case when SIDE = 'Fund' then 0 else abs(QTY) end), 0) VOL, "
+        + "sum(case when SIDE = 'Fund' then 0 else SUMREAL end) SUM_SUMREAL, "
+        + "sum(case when SIDE = 'Fund' then 0 else COMMISS end) SUM_COMMISS, "
+        + "ifnull(max(TTIME), '1900-01-01 01:01:01.000000') LTIME from "
+        + var.database_table
+        + " where EMI in ("
+        + names
+        + ") group by EMI, MARKET, SYMBOL, ACCOUNT"
+    )
+    for row in service.select_database(qwr, flush=True):
+        symbol = (row["SYMBOL"], row["MARKET"])
+        value = totals.setdefault(row["EMI"], dict()).get(symbol)
+        if value is None:
+            value = {
+                "MARKET": row["MARKET"],
+                "CURRENCY": row["CURRENCY"],
+                "SUMREAL": 0,
+                "COMMISS": 0,
+                "POS": 0,
+                "VOL": 0,
+                "QTY": 0,
+                "LTIME": row["LTIME"],
+                "ACCOUNT": dict(),
+            }
+            totals[row["EMI"]][symbol] = value
+        for key in ("SUMREAL", "COMMISS", "POS", "VOL", "QTY"):
+            value[key] += row[key]
+        value["LTIME"] = max(value["LTIME"], row["LTIME"])
+        if row["MARKET"] in var.market_list:
+            user_id = Markets[row["MARKET"]].user_id
+            if str(row["ACCOUNT"]) == str(user_id):
+                value["ACCOUNT"][user_id] = {
+                    "SUM_QTY": row["VOL"],
+                    "SUM_SUMREAL": row["SUM_SUMREAL"],
+                    "SUM_COMMISS": row["SUM_COMMISS"],
+                }
+
+    # Checkpoints of the accounts currently used by the markets.
+
+    accounts = " ".join(
+        "when '" + market + "' then " + str(Markets[market].user_id or 0)
+        for market in var.market_list
+    )
+    qwr = (
+        "select * from "
+        + var.database_table
+        + "_entry where EMI in ("
+        + names
+        + ") and ACCOUNT = case MARKET "
+        + accounts
+        + " else 0 end"
+    )
+    for row in service.select_database(qwr, flush=True):
+        checkpoints[(row["EMI"], (row["SYMBOL"], row["MARKET"]))] = row
+
+    # Only the trades of open positions after the checkpoints are needed for
+    # the entry price.
+
+    qwr = (
+        "select ID, EMI, MARKET, SYMBOL, QTY, PRICE, TRADE_PRICE, TTIME from "
+        + var.database_table
+        + " T where EMI in ("
+        + names
+        + ") and (EMI, MARKET, SYMBOL) in (select EMI, MARKET, SYMBOL from "
+        + var.database_table
+        + "_positions group by EMI, MARKET, SYMBOL having round(sum(POS), 12) "
+        + "<> 0) and ID > ifnull((select LAST_ID from "
+        + var.database_table
+        + "_entry E where E.EMI = T.EMI and E.MARKET = T.MARKET and E.SYMBOL = "
+        + "T.SYMBOL and E.ACCOUNT = case T.MARKET "
+        + accounts
+        + " else 0 end), 0) order by TTIME"
+    )
+    for row in service.select_database(qwr, flush=True):
+        key = (row["EMI"], (row["SYMBOL"], row["MARKET"]))
+        trades.setdefault(key, list()).append(row)
+
+    return totals, checkpoints, trades
+
+
+def load_entry(
+    name: str, symbol: tuple, value: dict, checkpoint: dict, trades: list
+) -> tuple:
+    """
+    Calculates the entry price of the bot's open position by replaying the
+    trades after the checkpoint. If the checkpoint position plus the
+    replayed trades does not match the total of all trades, the whole
+    history is replayed. The result is saved as the new checkpoint.
+
+    Returns
+    -------
+    tuple
+        Entry price and entry sumreal, as calculate_average_price().
+    """
+    ws = Markets[symbol[1]]
+    precision = ws.Instrument[symbol].precision
+    init_pos = 0
+    entry = None
+    if checkpoint:
+        init_pos = checkpoint["POS"]
+        entry = checkpoint["ENTRY"]
+        position = init_pos + sum(row["QTY"] for row in trades)
+        if round(position - value["QTY"], precision) != 0:
+            var.logger.warning(
+                name
+                + " - entry checkpoint of "
+                + str(symbol)
+                + " does not match the trades. The whole history is replayed."
+            )
+            init_pos = 0
+            entry = None
+            qwr = (
+                "select ID, EMI, MARKET, SYMBOL, QTY, PRICE, TRADE_PRICE, TTIME "
+                + "from "
+                + var.database_table
+                + " where EMI = '"
+                + name
+                + "' and SYMBOL = '"
+                + symbol[0]
+                + "' and MARKET = '"
+                + symbol[1]
+                + "' order by TTIME"
+            )
+            trades = service.select_database(qwr, flush=True)
+    entry, entry_sumreal = functions.calculate_average_price(
+        symbol=symbol, trades=trades, bot_position_entry=entry, init_pos=init_pos
+    )
+    if trades or not checkpoint:
+        service.save_entry(
+            emi=name,
+            symbol=symbol,
+            account=ws.user_id,
+            position=round(value["QTY"], precision),
+            entry=entry,
+        )
+
+    return entry, entry_sumreal
+
+
 def _put_message(market: str, message: str, warning=None) -> None:
     """
     Places an information message into the queue and the logger.
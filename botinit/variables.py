@@ -6,3 +6,17 @@ class Variables:
     update_bot = dict()
     activate_bot = dict()
     CANDLESTICK_NUMBER = 500
+    # Timeframes of a symbol are built from one base series only if the
+    # series has at most this many times CANDLESTICK_NUMBER rows. This covers
+    # the usual pairs of bot timeframes, such as 1min and 5min, 5min and 1h
+    # or 1h and 1D. The base series is downloaded in full only once, later
+    # startups download the tail missing from the saved file.
+    BASE_KLINES_RATIO = 60
+    # Number of the last saved kline periods that are downloaded again at
+    # startup and compared with the exchange data, and the allowed relative
+    # difference of their prices.
+    KLINE_OVERLAP = 20
+    KLINE_TOLERANCE = 0.005
+    # True once load_bots() has loaded the bots' positions from the database.
+    # Until then, bot entry price checkpoints are not written.
+    bots_loaded = False
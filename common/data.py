@@ -2,6 +2,7 @@ from collections import OrderedDict
 from datetime import datetime
 from typing import Any, Iterable, Union
 
+from common.scheduler import SerialExecutor
 from common.variables import Variables as var
 
 
@@ -226,9 +227,8 @@ class BotData:
     time: datetime
 
     # Technical. Ensures the order in which transactions are executed. See
-    # tools.py wait().
-    block: list = []
-    count: int = 0
+    # tools.py Bot.execute().
+    executor: SerialExecutor = None
 
     def __iter__(self):
         return Ret.iter(self)
@@ -329,7 +329,9 @@ class MetaBot(type):
         return MetaBot.all.keys()
 
     def remove(self, item):
-        del self.all[item]
+        bot = self.all.pop(item)
+        if bot.executor:
+            bot.executor.shutdown()
 
 
 class Bots(metaclass=MetaBot):
@@ -0,0 +1,106 @@
+import queue
+import sqlite3
+import threading
+import time
+
+from common.latency import LatencyRegistry
+from common.variables import Variables as var
+
+# Time spent waiting for SQLite: "read" for a free connection of the read
+# pool, "write" for var.sql_lock of the writer connection, "flush" for the
+# database writer to commit the queued rows.
+
+lock_wait = LatencyRegistry()
+
+
+class ReadPool:
+    """
+    Connections for select queries, separate from the writer connection
+    var.connect_sqlite. In WAL mode readers see the last committed data and
+    do not wait for the writer, so the display and bot queries are not held
+    up by inserts of trades. Each connection is used by one thread at a
+    time and is opened with query_only, so that it cannot write.
+
+    Parameters
+    ----------
+    size: int
+        Number of connections.
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.free = queue.Queue()
+        self.connections = list()
+        self.lock = threading.Lock()
+
+    def open(self, database: str) -> None:
+        """
+        Opens the connections to the database. Connections to the previous
+        database are closed when released.
+        """
+        with self.lock:
+            self._close_free()
+            self.connections = list()
+            for _ in range(self.size):
+                connection = sqlite3.connect(database, check_same_thread=False)
+                connection.row_factory = sqlite3.Row
+                connection.execute("PRAGMA query_only=ON")
+                self.connections.append(connection)
+                self.free.put(connection)
+
+    def acquire(self) -> sqlite3.Connection:
+        start = time.perf_counter()
+        connection = self.free.get()
+        lock_wait.record("read", time.perf_counter() - start)
+
+        return connection
+
+    def release(self, connection: sqlite3.Connection) -> None:
+        with self.lock:
+            if connection in self.connections:
+                self.free.put(connection)
+                return
+        connection.close()
+
+    def _close_free(self) -> None:
+        while True:
+            try:
+                self.free.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def lock_sqlite() -> None:
+    """
+    Acquires var.sql_lock of the writer connection and records the wait.
+    """
+    start = time.perf_counter()
+    var.sql_lock.acquire(True)
+    lock_wait.record("write", time.perf_counter() - start)
+
+
+def lock_wait_report() -> str:
+    """
+    Returns the summary of the SQLite lock waits in milliseconds.
+    """
+    lines = list()
+    for name, histogram in sorted(lock_wait.items()):
+        summary = histogram.summary()
+        lines.append(
+            name
+            + ": count="
+            + str(summary["count"])
+            + " p50="
+            + str(round(summary["p50"] * 1000, 3))
+            + " p99="
+            + str(round(summary["p99"] * 1000, 3))
+            + " max="
+            + str(round(summary["max"] * 1000, 3))
+        )
+
+    return "SQLite lock wait, ms - " + ("; ".join(lines) or "no data")
+
+
+# Read connections of var.db_sqlite.
+
+read_pool = ReadPool(size=4)
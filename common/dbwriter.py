@@ -0,0 +1,124 @@
+import queue
+import threading
+import time
+from itertools import groupby
+
+from common.dbpool import lock_sqlite, lock_wait
+from common.variables import Variables as var
+
+
+class DatabaseWriter:
+    """
+    Writes rows to SQLite on a dedicated thread, so that the threads
+    processing executions do not wait for the disk. Queued rows are inserted
+    with executemany() and committed in batches: when ``batch`` rows are
+    collected or ``interval`` seconds have passed since the first row of
+    the batch, whichever comes first. The thread is started on the first
+    row.
+
+    Reads that must see the rows already queued, e.g. position checks, and
+    other writes call flush(), which returns at once if nothing is pending.
+    Display reads do not flush, so they never wait for the writer.
+
+    Parameters
+    ----------
+    batch: int
+        Maximum number of rows per commit.
+    interval: float
+        Maximum time in seconds a row waits for the commit.
+    """
+
+    def __init__(self, batch: int, interval: float) -> None:
+        self.batch = batch
+        self.interval = interval
+        self.queue = queue.Queue()
+        self.pending = 0
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def put(self, query: str, values: list) -> None:
+        """
+        Queues a row to be inserted with the query.
+        """
+        with self.lock:
+            self.pending += 1
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._work, daemon=True)
+                self.thread.start()
+        self.queue.put((query, values))
+
+    def flush(self) -> None:
+        """
+        Waits until all rows queued so far are committed.
+        """
+        if not self.pending:
+            return
+        start = time.perf_counter()
+        done = threading.Event()
+        self.queue.put(done)
+        done.wait()
+        lock_wait.record("flush", time.perf_counter() - start)
+
+    def _work(self) -> None:
+        while True:
+            rows = list()
+            events = list()
+            item = self.queue.get()
+            deadline = time.monotonic() + self.interval
+            while True:
+                if isinstance(item, threading.Event):
+                    events.append(item)
+                    # Everything before the flush request is written now.
+                    break
+                rows.append(item)
+                if len(rows) >= self.batch:
+                    break
+                try:
+                    item = self.queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if rows:
+                self._write(rows)
+                with self.lock:
+                    self.pending -= len(rows)
+            for event in events:
+                event.set()
+
+    def _write(self, rows: list) -> None:
+        err_locked = 0
+        while True:
+            lock_sqlite()
+            try:
+                for query, group in groupby(rows, key=lambda row: row[0]):
+                    var.cursor_sqlite.executemany(query, [row[1] for row in group])
+                var.connect_sqlite.commit()
+                var.sql_lock.release()
+                return
+            except Exception as ex:  # var.error_sqlite
+                var.connect_sqlite.rollback()
+                var.sql_lock.release()
+                if "database is locked" not in str(ex):
+                    var.logger.error(f"Sqlite Error: {str(ex)}")
+                    break
+                err_locked += 1
+                var.logger.error(
+                    "Sqlite Error: Database is locked (attempt: "
+                    + str(err_locked)
+                    + ")"
+                )
+        # One of the rows failed, the others are written one by one so as
+        # not to lose them.
+        for query, values in rows:
+            lock_sqlite()
+            try:
+                var.cursor_sqlite.execute(query, values)
+                var.connect_sqlite.commit()
+            except Exception as ex:  # var.error_sqlite
+                var.connect_sqlite.rollback()
+                var.logger.error(f"Sqlite Error: {str(ex)} for: {values[0]}")
+            var.sql_lock.release()
+
+
+# Inserts of trades and funding.
+
+db_writer = DatabaseWriter(batch=500, interval=0.1)
@@ -0,0 +1,58 @@
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Hashable, Iterable
+
+
+class ExecIdIndex:
+    """
+    In-memory index of the execIDs stored in the trades table, used to skip
+    executions that are already in the database without querying it.
+
+    The execIDs of each key, e.g. (table, market, account), are loaded once
+    and kept as 64-bit hashes: a sorted array for the loaded ones, searched
+    with bisect, and a set for the ones added later. A hash match may be a
+    collision, so a match must be confirmed by the database, while a miss
+    is certain.
+    """
+
+    def __init__(self) -> None:
+        self.loaded = dict()
+        self.added = dict()
+        self.lock = threading.RLock()
+
+    def is_loaded(self, key: Hashable) -> bool:
+        return key in self.loaded
+
+    def load(self, key: Hashable, execIDs: Iterable[str]) -> None:
+        with self.lock:
+            self.loaded[key] = array("q", sorted({hash(x) for x in execIDs}))
+            self.added[key] = set()
+
+    def add(self, key: Hashable, execID: str) -> None:
+        """
+        Adds the execID of a new row. Ignored if the key is not loaded yet,
+        since the row will then be loaded from the database.
+        """
+        with self.lock:
+            if key in self.added:
+                self.added[key].add(hash(execID))
+
+    def may_contain(self, key: Hashable, execID: str) -> bool:
+        value = hash(execID)
+        if value in self.added[key]:
+            return True
+        hashes = self.loaded[key]
+        pos = bisect_left(hashes, value)
+
+        return pos < len(hashes) and hashes[pos] == value
+
+    def clear(self) -> None:
+        with self.lock:
+            self.loaded.clear()
+            self.added.clear()
+
+
+# execIDs of the trades table by (table, market, account).
+
+exec_ids = ExecIdIndex()
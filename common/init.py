@@ -1,15 +1,20 @@
 import os
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
 from sqlite3 import Error
 
-from dotenv import dotenv_values, set_key
+from dotenv import dotenv_values
 
 import services as service
 from api.api import WS
 from api.init import Variables
 from api.setup import Markets
+from common.dbpool import read_pool
+from common.dbwriter import db_writer
+from common.execids import exec_ids
+from common.positions import create_positions
 from common.variables import Variables as var
 from display.functions import info_display
 from display.variables import TreeTable
@@ -30,11 +35,13 @@ class Init(WS, Variables):
         methods in files called agent.py. Each exchange has its own API
         features, so the methods differ significantly from each other.
 
-        Trade_history() reads data in 500-line chunks, starting from the date
-        specified in the history.ini file. If trade_history() returned less
-        than 500 rows, then this is a signal that the entire trading history
-        has been received and this function ends its work. The history.ini
-        file records the time of the last transaction.
+        Trade_history() reads data in 500-line chunks, starting from the time
+        of the last transaction recorded in the history table of the
+        database, or in the .env.History file if the table has no record for
+        the market yet. If trade_history() returned less than 500 rows, then
+        this is a signal that the entire trading history has been received
+        and this function ends its work. The next chunk is requested while
+        the current one is processed.
 
         If the row with execID already exists in the database, then it is
         skipped, otherwise it is processed in the transaction() in
@@ -61,64 +68,24 @@ class Init(WS, Variables):
         "execFee": float            Executed trading fee
         """
         tm = datetime.now(tz=timezone.utc)
-        if var.env["TESTNET"] == "YES":
-            his = ".env.History.testnet"
-        else:
-            his = ".env.History"
-        his_file = Path(his)
         _time = "2000-01-01 00:00:00"
-        dotenv_data = dotenv_values(his_file)
-        tm = datetime.now(tz=timezone.utc)
-        if not dotenv_data:
-            var.logger.warning(
-                "The " + his + " not found. The " + his + " file has been created."
-            )
-            his_file.touch(mode=0o600)
-        if self.name not in dotenv_data:
-            var.logger.warning(
-                "No time found for "
-                + self.name
-                + " from "
-                + his
-                + ". Assigned time: "
-                + _time
-            )
-            set_key(
-                dotenv_path=his_file,
-                key_to_set=self.name,
-                value_to_set=_time,
-            )
-            dotenv_data = dotenv_values(his_file)
-        try:
-            last_history_time = service.combine_formats(dotenv_data[self.name])
-        except ValueError:
-            var.logger.warning(
-                "Time format for "
-                + self.name
-                + " from the "
-                + his
-                + " is incorrect. Assigned time: "
-                + _time
-            )
-            last_history_time = service.combine_formats(_time)
-            set_key(
-                dotenv_path=his_file,
-                key_to_set=self.name,
-                value_to_set=_time,
-            )
+        data = service.select_database(
+            "select TTIME from history where TRADES = '%s' and MARKET = '%s'"
+            % (var.database_table, self.name),
+            flush=True,
+        )
+        if data:
+            last_history_time = service.combine_formats(data[0]["TTIME"])
+        else:
+            last_history_time = Init.load_history_file(self, _time=_time)
         last_history_time = last_history_time.replace(tzinfo=timezone.utc)
         if last_history_time > tm:
             var.logger.warning(
-                "The time in the "
-                + his
-                + " file is greater than the current time. Assigned time: "
+                "The time of the trading history of "
+                + self.name
+                + " is greater than the current time. Assigned time: "
                 + _time
             )
-            set_key(
-                dotenv_path=his_file,
-                key_to_set=self.name,
-                value_to_set=_time,
-            )
             last_history_time = service.combine_formats(_time)
             last_history_time = last_history_time.replace(tzinfo=timezone.utc)
 
@@ -131,34 +98,39 @@ class Init(WS, Variables):
         his_data = history["data"]
         if isinstance(his_data, list):
             if his_data:
-                while his_data:
-                    for row in his_data:
-                        data = service.select_database(  # read_database
-                            "select EXECID from %s where EXECID='%s' and account=%s and market='%s'"
-                            % (
-                                var.database_table,
-                                row["execID"],
-                                self.user_id,
-                                self.name,
-                            ),
-                        )
-                        if not data:
-                            Function.transaction(self, row=row, info="History")
-                    last_history_time = his_data[-1]["transactTime"]
-                    if not self.logNumFatal:
-                        set_key(
-                            dotenv_path=his,
-                            key_to_set=self.name,
-                            value_to_set=str(last_history_time)[:19],
-                        )
-                    if history["length"] < count_val:
-                        return "success"
-                    history = WS.trading_history(
-                        self, histCount=count_val, start_time=last_history_time
-                    )
-                    his_data = history["data"]
-                    if not isinstance(his_data, list):
-                        return service.unexpected_error(self)
+                # The next page is requested while the current one is being
+                # processed. The rows of a page are written by the database
+                # writer in batches, followed by the time of the last row.
+                with ThreadPoolExecutor(max_workers=1) as prefetch:
+                    while his_data:
+                        last_history_time = his_data[-1]["transactTime"]
+                        next_page = None
+                        if history["length"] >= count_val:
+                            next_page = prefetch.submit(
+                                WS.trading_history,
+                                self,
+                                histCount=count_val,
+                                start_time=last_history_time,
+                            )
+                        for row in his_data:
+                            if not service.execution_exists(
+                                market=self.name,
+                                account=self.user_id,
+                                execID=row["execID"],
+                            ):
+                                Function.transaction(self, row=row, info="History")
+                        if not self.logNumFatal:
+                            service.save_history_time(
+                                market=self.name, ttime=last_history_time
+                            )
+                        if next_page is None:
+                            return "success"
+                        history = next_page.result()
+                        if isinstance(history, str):
+                            return "Error"
+                        his_data = history["data"]
+                        if not isinstance(his_data, list):
+                            return service.unexpected_error(self)
         else:
             return service.unexpected_error(self)
         message = self.name + ": Empty trading history."
@@ -174,6 +146,40 @@ class Init(WS, Variables):
 
         return "empty"
 
+    def load_history_file(self: Markets, _time: str) -> datetime:
+        """
+        Returns the time of the last loaded history row of the market from
+        the .env.History file, used before the time was kept in the history
+        table of the database.
+        """
+        if var.env["TESTNET"] == "YES":
+            his = ".env.History.testnet"
+        else:
+            his = ".env.History"
+        dotenv_data = dotenv_values(Path(his))
+        if self.name not in dotenv_data:
+            var.logger.warning(
+                "No time found for "
+                + self.name
+                + " from "
+                + his
+                + ". Assigned time: "
+                + _time
+            )
+            return service.combine_formats(_time)
+        try:
+            return service.combine_formats(dotenv_data[self.name])
+        except ValueError:
+            var.logger.warning(
+                "Time format for "
+                + self.name
+                + " from the "
+                + his
+                + " is incorrect. Assigned time: "
+                + _time
+            )
+            return service.combine_formats(_time)
+
     def account_balances(self: Markets) -> None:
         """
         Calculates the final trading results for all currencies that were
@@ -185,9 +191,9 @@ class Init(WS, Variables):
             "select SYMBOL, TICKER, CATEGORY from "
             + "%s where ACCOUNT=%s and MARKET='%s' group by SYMBOL, CATEGORY"
             % (var.database_table, self.user_id, self.name),
+            flush=True,
         )
         if isinstance(data, list):
-            symbols = list(map(lambda x: (x["SYMBOL"], self.name), data))
             for row in data:
                 Function.add_symbol(
                     self,
@@ -195,63 +201,35 @@ class Init(WS, Variables):
                     ticker=row["TICKER"],
                     category=row["CATEGORY"],
                 )
-            if not symbols:
-                symbols = [("MUST_NOT_BE_EMPTY", "MUST_NOT_BE_EMPTY")]
+            # Totals by currency and instrument in one pass over the market's
+            # trades. Only the rows of the instrument's category are counted.
             sql = (
-                "select DISTINCT(CURRENCY) from "
+                "select CURRENCY, SYMBOL, CATEGORY, "
+                + "sum(case when SIDE <> 'Fund' then COMMISS else 0 end) commiss, "
+                + "sum(case when SIDE <> 'Fund' then SUMREAL else 0 end) sumreal, "
+                + "sum(case when SIDE = 'Fund' then COMMISS else 0 end) funding "
+                + "from "
                 + var.database_table
                 + " where MARKET = '"
                 + self.name
                 + "' AND ACCOUNT = "
                 + str(self.user_id)
+                + " group by CURRENCY, SYMBOL, CATEGORY"
             )
-            data = service.select_database(sql)
-            for cur in data:
-                currency = cur["CURRENCY"]
-                union = ""
-                sql = (
-                    "select sum(commiss) commiss, sum(sumreal) sumreal, "
-                    + "sum(funding) funding from ("
-                )
-                for symbol in symbols:
-                    instrument = self.Instrument[symbol]
-                    sql += (
-                        union
-                        + "select IFNULL(sum(COMMISS),0.0) commiss, "
-                        + "IFNULL(sum(SUMREAL),0.0) sumreal, IFNULL((select "
-                        + "sum(COMMISS) from "
-                        + var.database_table
-                        + " where SIDE = 'Fund' and ACCOUNT = "
-                        + str(self.user_id)
-                        + " and MARKET = '"
-                        + self.name
-                        + "' and CURRENCY = '"
-                        + currency
-                        + "' and SYMBOL = '"
-                        + symbol[0]
-                        + "' and CATEGORY = '"
-                        + instrument.category
-                        + "'),0.0) funding from "
-                        + var.database_table
-                        + " where SIDE <> 'Fund' and ACCOUNT = "
-                        + str(self.user_id)
-                        + " and MARKET = '"
-                        + self.name
-                        + "' and CURRENCY = '"
-                        + currency
-                        + "' and SYMBOL = '"
-                        + symbol[0]
-                        + "' and CATEGORY = '"
-                        + instrument.category
-                        + "'"
-                    )
-                    union = "union "
-                sql += ") T"
-                data = service.select_database(sql)
+            data = service.select_database(sql, flush=True)
+            totals = dict()
+            for row in data:
+                total = totals.setdefault(row["CURRENCY"], [0.0, 0.0, 0.0])
+                symbol = (row["SYMBOL"], self.name)
+                if row["CATEGORY"] == self.Instrument[symbol].category:
+                    total[0] += row["commiss"] or 0.0
+                    total[1] += row["sumreal"] or 0.0
+                    total[2] += row["funding"] or 0.0
+            for currency, total in totals.items():
                 settlCurrency = (currency, self.name)
-                self.Result[settlCurrency].commission = float(data[0]["commiss"])
-                self.Result[settlCurrency].funding = float(data[0]["funding"])
-                self.Result[settlCurrency].sumreal = float(data[0]["sumreal"])
+                self.Result[settlCurrency].commission = float(total[0])
+                self.Result[settlCurrency].funding = float(total[2])
+                self.Result[settlCurrency].sumreal = float(total[1])
                 self.Result[settlCurrency].result = 0
         else:
             var.logger.error("SQL error in account_balances() function")
@@ -259,15 +237,10 @@ class Init(WS, Variables):
 
     def clear_orders_by_market(self: Markets):
         """
-        Clears the var.orders dictionary of entries for a specific market
-        when the market is restarted.
+        Removes the orders of a specific market from var.orders when the
+        market is restarted.
         """
-        orders_copy = var.orders.copy()
-        for emi, orders in orders_copy.items():
-            emi_orders_copy = orders.copy()
-            for clOrdID, order in emi_orders_copy.items():
-                if order["market"] == self.name:
-                    del var.orders[emi][clOrdID]
+        var.orders.remove_market(market=self.name)
 
     def load_orders(self: Markets, myOrders: list) -> None:
         """
@@ -313,7 +286,10 @@ class Init(WS, Variables):
                 + "order by TTIME desc limit "
                 + str(disp.table_limit)
             )
-            data = service.select_database(sql)
+            # The history rows are not shown as they arrive, so the rows
+            # still queued in the database writer must be read as well.
+
+            data = service.select_database(sql, flush=True)
             rows = list()
             for val in data:
                 val["SYMBOL"] = (val["SYMBOL"], self.name)
@@ -364,11 +340,17 @@ class Init(WS, Variables):
 
 
 def setup_database_connecion() -> None:
+    db_writer.flush()  # Rows queued before the reboot go to the old database.
+    exec_ids.clear()
     try:
         var.connect_sqlite = sqlite3.connect(var.db_sqlite, check_same_thread=False)
         var.connect_sqlite.row_factory = sqlite3.Row
         var.cursor_sqlite = var.connect_sqlite.cursor()
         var.error_sqlite = Error
+        # Readers do not block the writer, and commits do not wait for
+        # fsync of the database file.
+        var.cursor_sqlite.execute("PRAGMA journal_mode=WAL")
+        var.cursor_sqlite.execute("PRAGMA synchronous=NORMAL")
 
         sql_create_robots = """
         CREATE TABLE IF NOT EXISTS robots (
@@ -379,6 +361,13 @@ def setup_database_connecion() -> None:
         STATE varchar(10) DEFAULT 'Suspended',
         UPDATED timestamp NULL DEFAULT CURRENT_TIMESTAMP)"""
 
+        sql_create_history = """
+        CREATE TABLE IF NOT EXISTS history (
+        TRADES varchar(20) NOT NULL,
+        MARKET varchar(20) NOT NULL,
+        TTIME datetime DEFAULT NULL,
+        PRIMARY KEY (TRADES, MARKET))"""
+
         sql_create = """
         CREATE TABLE IF NOT EXISTS %s (
         ID INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -406,6 +395,7 @@ def setup_database_connecion() -> None:
         sql_create_backtest = sql_create % "backtest"
 
         var.cursor_sqlite.execute(sql_create_robots)
+        var.cursor_sqlite.execute(sql_create_history)
         var.cursor_sqlite.execute(sql_create_expired)
         var.cursor_sqlite.execute(sql_create_backtest)
         create_table_for_trades(var.database_real)
@@ -419,6 +409,7 @@ def setup_database_connecion() -> None:
             % (var.backtest_table, var.backtest_table)
         )
         var.connect_sqlite.commit()
+        read_pool.open(var.db_sqlite)
 
     except Exception as error:
         var.logger.error(error)
@@ -477,6 +468,7 @@ def create_table_for_trades(table_name):
             )
             % (table_name, table_name)
         )
+        create_positions(cursor=var.cursor_sqlite, table=table_name)
     except Exception as error:
         var.logger.error(error)
         raise
@@ -0,0 +1,385 @@
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timezone
+from itertools import islice, starmap
+from typing import Iterator, Sequence, Union
+
+# Kline data file format. The file begins with a 32-byte header followed by
+# fixed-size little-endian records, one per finished period:
+#
+#   header: magic b"TMKL", version uint16, record size uint16, timeframe in
+#           seconds uint32, 20 reserved bytes.
+#   record: timestamp int64 (unix seconds, beginning of the period),
+#           open_bid, open_ask, hi, lo, funding float64.
+#
+# The records can be mapped without parsing, for example:
+#   numpy.memmap(filename, mode="r", offset=32, dtype=[("timestamp", "<i8"),
+#   ("open_bid", "<f8"), ("open_ask", "<f8"), ("hi", "<f8"), ("lo", "<f8"),
+#   ("funding", "<f8")])
+
+KLINE_MAGIC = b"TMKL"
+KLINE_VERSION = 2
+KLINE_HEADER = struct.Struct("<4sHHI20x")
+KLINE_RECORD = struct.Struct("<qddddd")
+KLINE_COLUMNS = ("timestamp", "open_bid", "open_ask", "hi", "lo", "funding")
+
+
+class KlineBuffer:
+    """
+    Fixed-capacity storage of kline (candlestick) data for one symbol and
+    one timeframe.
+
+    Candles are kept in parallel ``array.array`` columns used as a ring
+    buffer, so the memory per candle is constant and the buffer never grows
+    beyond ``capacity``. When the buffer is full, appending a new candle
+    overwrites the oldest one.
+
+    Reading a candle returns a newly created dictionary with the same keys
+    as before: "date", "time", "open_bid", "open_ask", "hi", "lo", "funding",
+    "datetime". Index -1 refers to the most recent candle.
+
+    Parameters
+    ----------
+    capacity: int
+        Maximum number of candles to be stored.
+    seconds: bool
+        If True, "time" is hhmmss instead of hhmm, so that the candles of a
+        sub-minute timeframe within one minute can be told apart.
+    """
+
+    def __init__(self, capacity: int, seconds: bool = False) -> None:
+        self.capacity = max(1, int(capacity))
+        self.seconds = seconds
+        self.timestamp = array("q", bytes(8 * self.capacity))
+        self.open_bid = array("d", bytes(8 * self.capacity))
+        self.open_ask = array("d", bytes(8 * self.capacity))
+        self.hi = array("d", bytes(8 * self.capacity))
+        self.lo = array("d", bytes(8 * self.capacity))
+        self.funding = array("d", bytes(8 * self.capacity))
+        self.start = 0
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self) -> Iterator[dict]:
+        for num in range(self.size):
+            yield self._row((self.start + num) % self.capacity)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[dict, list]:
+        if isinstance(index, slice):
+            return [self._row(self._position(num)) for num in range(self.size)[index]]
+
+        return self._row(self._position(index))
+
+    def _position(self, index: int) -> int:
+        """
+        Converts a sequence index into the position in the columns.
+        """
+        if index < 0:
+            index += self.size
+        if index < 0 or index >= self.size:
+            raise IndexError("kline index out of range")
+
+        return (self.start + index) % self.capacity
+
+    def _row(self, pos: int) -> dict:
+        tm = datetime.fromtimestamp(self.timestamp[pos], tz=timezone.utc)
+        time = tm.hour * 100 + tm.minute
+        if self.seconds:
+            time = time * 100 + tm.second
+
+        return {
+            "date": (tm.year - 2000) * 10000 + tm.month * 100 + tm.day,
+            "time": time,
+            "open_bid": self.open_bid[pos],
+            "open_ask": self.open_ask[pos],
+            "hi": self.hi[pos],
+            "lo": self.lo[pos],
+            "funding": self.funding[pos],
+            "datetime": tm,
+        }
+
+    def append(
+        self,
+        tm: datetime,
+        open_bid: float,
+        open_ask: float,
+        hi: float,
+        lo: float,
+        funding: float = 0,
+    ) -> None:
+        """
+        Adds a new candle. If the buffer is full, the oldest candle is
+        overwritten.
+
+        Parameters
+        ----------
+        tm: datetime
+            Beginning of the period (utc).
+        open_bid: float
+            First bid price at the beginning of the period.
+        open_ask: float
+            First ask price at the beginning of the period.
+        hi: float
+            Highest price of the period.
+        lo: float
+            Lowest price of the period.
+        funding: float
+            Funding rate. Non-numeric values such as "-" for spot
+            instruments are stored as 0.
+        """
+        if self.size < self.capacity:
+            pos = (self.start + self.size) % self.capacity
+            self.size += 1
+        else:
+            pos = self.start
+            self.start = (self.start + 1) % self.capacity
+        if not isinstance(funding, (int, float)):
+            funding = 0
+        self.timestamp[pos] = int(tm.timestamp())
+        self.open_bid[pos] = open_bid
+        self.open_ask[pos] = open_ask
+        self.hi[pos] = hi
+        self.lo[pos] = lo
+        self.funding[pos] = funding
+
+    def update_hi_lo(self, ask: float, bid: float) -> None:
+        """
+        Updates the high and low values of the latest candle.
+        """
+        if self.size:
+            pos = (self.start + self.size - 1) % self.capacity
+            if ask > self.hi[pos]:
+                self.hi[pos] = ask
+            if bid < self.lo[pos]:
+                self.lo[pos] = bid
+
+    def column(self, name: str) -> list:
+        """
+        Returns the values of one column ("timestamp", "open_bid",
+        "open_ask", "hi", "lo", "funding") in chronological order.
+        """
+        return self._chronological(name).tolist()
+
+    def columns(self) -> dict:
+        """
+        Returns all columns as arrays in chronological order.
+        """
+        return {name: self._chronological(name) for name in KLINE_COLUMNS}
+
+    def _chronological(self, name: str) -> array:
+        values: array = getattr(self, name)
+        end = self.start + self.size
+        if end <= self.capacity:
+            return values[self.start : end]
+
+        return values[self.start :] + values[: end - self.capacity]
+
+    def extend(
+        self,
+        timestamp: Sequence[int],
+        open_bid: Sequence[float],
+        open_ask: Sequence[float],
+        hi: Sequence[float],
+        lo: Sequence[float],
+        funding: Sequence[float],
+    ) -> None:
+        """
+        Adds several candles given as columns of equal length in
+        chronological order. The timestamps are unix seconds. If there are
+        more candles than the buffer can hold, the oldest are dropped.
+        """
+        new = {
+            "timestamp": timestamp,
+            "open_bid": open_bid,
+            "open_ask": open_ask,
+            "hi": hi,
+            "lo": lo,
+            "funding": funding,
+        }
+        for name, values in new.items():
+            column = self._chronological(name)
+            column.extend(values)
+            column = column[-self.capacity :]
+            size = len(column)
+            column.frombytes(bytes(column.itemsize * (self.capacity - size)))
+            setattr(self, name, column)
+        self.start = 0
+        self.size = size
+
+    def resample(self, timefr_minutes: int, capacity: int) -> "KlineBuffer":
+        """
+        Builds the candles of a larger timeframe, the same as the former
+        merge_klines() did. The periods are aligned to the beginning of the
+        day (utc), and each candle has the timestamp of its first row, which
+        is the beginning of the period unless the data has a gap there.
+        Periods without rows are skipped. The first rows of each period are
+        found by bisecting the timestamp column at the period boundaries,
+        and high and low values are taken over the column slices, so the
+        work done in Python is proportional to the number of candles built
+        rather than to the number of rows.
+
+        Parameters
+        ----------
+        timefr_minutes: int
+            Timeframe of the candles to be built.
+        capacity: int
+            Capacity of the returned buffer. Only the latest candles that
+            fit into it are built.
+
+        Returns
+        -------
+        KlineBuffer
+            New buffer with the candles.
+        """
+        res = KlineBuffer(capacity=capacity)
+        period = timefr_minutes * 60
+        data = self.columns()
+        timestamp = data["timestamp"]
+
+        # Row ranges of the periods, from the latest one backwards.
+
+        ranges = list()
+        end = len(timestamp)
+        while end and len(ranges) < res.capacity:
+            bucket = timestamp[end - 1] // period
+            begin = bisect_left(timestamp, bucket * period, 0, end)
+            ranges.append((begin, end))
+            end = begin
+        new = {name: array(data[name].typecode) for name in KLINE_COLUMNS}
+        for begin, end in reversed(ranges):
+            new["timestamp"].append(timestamp[begin])
+            new["open_bid"].append(data["open_bid"][begin])
+            new["open_ask"].append(data["open_ask"][begin])
+            new["hi"].append(max(data["hi"][begin:end]))
+            new["lo"].append(min(data["lo"][begin:end]))
+            new["funding"].append(data["funding"][end - 1])
+        res.extend(**new)
+
+        return res
+
+    def pack(self, stop: Union[int, None] = None) -> bytes:
+        """
+        Returns the candles [:stop] as records of the kline data file.
+        """
+        count = len(range(self.size)[:stop])
+        rows = zip(*(self._chronological(name) for name in KLINE_COLUMNS))
+
+        return b"".join(starmap(KLINE_RECORD.pack, islice(rows, count)))
+
+    def clear(self) -> None:
+        self.start = 0
+        self.size = 0
+
+
+def _pack_row(row: dict) -> bytes:
+    funding = row["funding"]
+    if not isinstance(funding, (int, float)):
+        funding = 0
+
+    return KLINE_RECORD.pack(
+        int(row["datetime"].timestamp()),
+        row["open_bid"],
+        row["open_ask"],
+        row["hi"],
+        row["lo"],
+        funding,
+    )
+
+
+def _kline_header(timefr_seconds: int) -> bytes:
+    return KLINE_HEADER.pack(
+        KLINE_MAGIC, KLINE_VERSION, KLINE_RECORD.size, timefr_seconds
+    )
+
+
+def _check_header(header: bytes) -> bool:
+    if len(header) != KLINE_HEADER.size:
+        return False
+    magic, version, size, _ = KLINE_HEADER.unpack(header)
+
+    return (
+        magic == KLINE_MAGIC and version == KLINE_VERSION and size == KLINE_RECORD.size
+    )
+
+
+def write_kline_file(
+    filename: str,
+    data: KlineBuffer,
+    timefr_seconds: int,
+    stop: Union[int, None] = None,
+) -> None:
+    """
+    Overwrites the kline data file with the candles data[:stop] in a single
+    write. The data is written to a temporary file first, so an
+    interrupted write does not destroy the previously saved data.
+
+    Parameters
+    ----------
+    filename: str
+        Kline data file.
+    data: KlineBuffer
+        Kline data.
+    timefr_seconds: int
+        Timeframe in seconds, stored in the header.
+    stop: int | None
+        The candles are written up to, but not including, this index.
+    """
+    with open(filename + ".tmp", "wb") as f:
+        f.write(_kline_header(timefr_seconds) + data.pack(stop))
+    os.replace(filename + ".tmp", filename)
+
+
+def append_kline_file(filename: str, row: dict, timefr_seconds: int) -> None:
+    """
+    Appends one finished period to the kline data file. If the file does not
+    exist or its header is not valid, the file is created anew.
+    """
+    try:
+        with open(filename, "rb") as f:
+            valid = _check_header(f.read(KLINE_HEADER.size))
+    except OSError:
+        valid = False
+    if not valid:
+        with open(filename + ".tmp", "wb") as f:
+            f.write(_kline_header(timefr_seconds) + _pack_row(row))
+        os.replace(filename + ".tmp", filename)
+        return
+    with open(filename, "ab") as f:
+        # Drops a partially written record left after a crash, if any.
+        tail = (f.tell() - KLINE_HEADER.size) % KLINE_RECORD.size
+        if tail:
+            f.truncate(f.tell() - tail)
+            f.seek(0, os.SEEK_END)
+        f.write(_pack_row(row))
+
+
+def read_kline_file(filename: str) -> KlineBuffer:
+    """
+    Reads the kline data file.
+
+    Returns
+    -------
+    KlineBuffer
+        Candles in the order they were written. The buffer is empty if the
+        file is missing or its header is not valid. An incomplete last
+        record is ignored. The "time" of sub-minute candles is hhmmss.
+    """
+    try:
+        with open(filename, "rb") as f:
+            data = f.read()
+    except OSError:
+        data = b""
+    if not _check_header(data[: KLINE_HEADER.size]):
+        return KlineBuffer(capacity=1)
+    timefr_seconds = KLINE_HEADER.unpack(data[: KLINE_HEADER.size])[3]
+    end = len(data) - (len(data) - KLINE_HEADER.size) % KLINE_RECORD.size
+    records = list(KLINE_RECORD.iter_unpack(data[KLINE_HEADER.size : end]))
+    res = KlineBuffer(capacity=len(records), seconds=timefr_seconds < 60)
+    if records:
+        res.extend(*zip(*records))
+
+    return res
@@ -0,0 +1,225 @@
+import bisect
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Hashable, Iterable, Union
+
+# Upper bounds of the histogram buckets in seconds: from 0.1 ms to about
+# 105 seconds, each bucket is sqrt(2) times wider than the previous one.
+
+LATENCY_BOUNDS = tuple(0.0001 * 2 ** (num / 2) for num in range(41))
+
+
+class LatencyHistogram:
+    """
+    Distribution of latencies in fixed logarithmic buckets. Recording a
+    value takes constant memory, and percentiles are estimated as the
+    upper bound of the bucket containing them, i.e. with an error of at
+    most 41%, but not above the maximum recorded value.
+    """
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(LATENCY_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+        self.lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self.lock:
+            self.counts[bisect.bisect_left(LATENCY_BOUNDS, seconds)] += 1
+            self.count += 1
+            self.total += seconds
+            self.last = seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def percentile(self, percent: float) -> float:
+        """
+        Returns the estimated latency in seconds below which the given
+        percent of the values fall.
+        """
+        with self.lock:
+            if not self.count:
+                return 0.0
+            rank = self.count * percent / 100
+            cumulative = 0
+            for num, count in enumerate(self.counts):
+                cumulative += count
+                if cumulative >= rank:
+                    break
+
+            if num < len(LATENCY_BOUNDS):
+                return min(LATENCY_BOUNDS[num], self.max)
+
+            return self.max
+
+    def summary(self) -> dict:
+        """
+        Returns "count", "mean", "p50", "p99", "max" and "last" in seconds.
+        """
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+            "max": self.max,
+            "last": self.last,
+        }
+
+
+class LatencyRegistry:
+    """
+    Latency histograms by key, e.g. ("Deribit", "private/buy").
+    """
+
+    def __init__(self) -> None:
+        self.histograms = dict()
+        self.lock = threading.Lock()
+
+    def record(self, key: Hashable, seconds: float) -> None:
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(key, LatencyHistogram())
+        histogram.record(seconds)
+
+    def get(self, key: Hashable) -> Union[LatencyHistogram, None]:
+        return self.histograms.get(key)
+
+    def items(self) -> Iterable[tuple]:
+        with self.lock:
+            return list(self.histograms.items())
+
+
+# Latency of requests to exchanges by (market, request path).
+
+request_latency = LatencyRegistry()
+
+
+# Stages of the order lifecycle, measured from the moment the order is sent:
+# the REST response, the websocket acknowledgement (execType "New") and the
+# first fill (execType "Trade").
+
+ORDER_STAGES = ("response", "ack", "fill")
+
+
+class OrderLatency:
+    """
+    Lifecycle timestamps of the orders placed by Tmatic by clOrdID. The
+    time from sending to each stage is recorded into the latency histograms
+    of the market and of the bot, keyed by (market or bot name, stage). An
+    order is forgotten when all stages are stamped, when it is canceled or
+    when more than ``capacity`` orders are pending, the oldest first.
+
+    The summaries are appended to the metrics file as JSON lines at most
+    once per ``interval`` seconds, when new values are recorded.
+
+    Parameters
+    ----------
+    filename: str
+        Metrics file.
+    interval: float
+        Minimum time in seconds between writes to the metrics file.
+    capacity: int
+        Maximum number of pending orders.
+    """
+
+    def __init__(self, filename: str, interval: float, capacity: int) -> None:
+        self.filename = filename
+        self.interval = interval
+        self.capacity = capacity
+        self.pending = OrderedDict()
+        self.markets = LatencyRegistry()
+        self.bots = LatencyRegistry()
+        self.lock = threading.Lock()
+        self.written = time.monotonic()
+        self.changed = False
+
+    def sent(self, clOrdID: str, market: str) -> None:
+        """
+        Stamps the time the order is sent. The bot name is taken from the
+        clOrdID, which is a number and the bot name separated by a dot.
+        Orders without the bot name are counted for the market only.
+        """
+        _, _, emi = clOrdID.partition(".")
+        if "." in emi:
+            emi = ""
+        with self.lock:
+            self.pending[clOrdID] = {
+                "market": market,
+                "emi": emi,
+                "sent": time.perf_counter(),
+            }
+            if len(self.pending) > self.capacity:
+                self.pending.popitem(last=False)
+
+    def stamp(self, clOrdID: str, stage: str) -> None:
+        """
+        Stamps the first time the order reaches the stage and records its
+        latency. Later stamps of the same stage are ignored.
+        """
+        now = time.perf_counter()
+        with self.lock:
+            order = self.pending.get(clOrdID)
+            if order is None or stage in order:
+                return
+            order[stage] = now
+            if all(name in order for name in ORDER_STAGES):
+                del self.pending[clOrdID]
+            self.changed = True
+        seconds = now - order["sent"]
+        self.markets.record((order["market"], stage), seconds)
+        if order["emi"]:
+            self.bots.record((order["emi"], stage), seconds)
+        if time.monotonic() - self.written > self.interval:
+            self.write()
+
+    def discard(self, clOrdID: str) -> None:
+        with self.lock:
+            self.pending.pop(clOrdID, None)
+
+    def percentiles(self, emi: str, stage: str) -> Union[tuple, None]:
+        """
+        Returns p50 and p99 of the bot's latency at the stage in seconds, or
+        None if nothing has been recorded.
+        """
+        histogram = self.bots.get((emi, stage))
+        if histogram is None:
+            return None
+
+        return histogram.percentile(50), histogram.percentile(99)
+
+    def write(self) -> None:
+        """
+        Appends the summaries of all markets and bots to the metrics file,
+        if there are new values. Latencies are in milliseconds.
+        """
+        with self.lock:
+            if not self.changed:
+                return
+            self.changed = False
+            self.written = time.monotonic()
+        tm = datetime.now(tz=timezone.utc).isoformat(timespec="seconds")
+        lines = list()
+        for kind, registry in (("market", self.markets), ("bot", self.bots)):
+            for (name, stage), histogram in registry.items():
+                summary = histogram.summary()
+                line = {"time": tm, kind: name, "stage": stage}
+                line["count"] = summary.pop("count")
+                for key, value in summary.items():
+                    line[key + "_ms"] = round(value * 1000, 3)
+                lines.append(json.dumps(line) + "\n")
+        try:
+            with open(self.filename, "a") as f:
+                f.writelines(lines)
+        except OSError:
+            pass
+
+
+# Order lifecycle latency of all markets and bots.
+
+order_latency = OrderLatency(filename="latency.log", interval=60, capacity=10000)
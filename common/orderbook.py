@@ -0,0 +1,103 @@
+from bisect import bisect_left, insort
+from typing import Iterable
+
+
+class BookSide:
+    """
+    One side of a level 2 order book, maintained incrementally.
+
+    Prices are kept in a sorted list so that the best price comes first:
+    asks are stored as is, bids are stored negated. Quantities are kept in
+    a dictionary by the same keys. A price level is inserted or removed
+    with bisect, so an update costs O(log n) for the search plus the list
+    shift, instead of sorting the whole side.
+
+    Parameters
+    ----------
+    descending: bool
+        True for bids, which are sorted by price in descending order.
+    """
+
+    def __init__(self, descending: bool) -> None:
+        self.sign = -1 if descending else 1
+        self.keys = list()
+        self.qty = dict()
+
+    def clear(self) -> None:
+        self.keys.clear()
+        self.qty.clear()
+
+    def update(self, levels: Iterable) -> int:
+        """
+        Applies the changed levels. Each level is [price, qty] as strings,
+        and zero qty removes the level.
+
+        Returns
+        -------
+        int
+            Position of the best changed level, which shows whether the
+            top of the book has changed. If there are no changes, the length
+            of the side is returned.
+        """
+        keys = self.keys
+        best = len(keys)
+        for price, qty in levels:
+            key = float(price) * self.sign
+            qty = float(qty)
+            if qty:
+                if key not in self.qty:
+                    insort(keys, key)
+                self.qty[key] = qty
+                pos = bisect_left(keys, key)
+            elif key in self.qty:
+                del self.qty[key]
+                pos = bisect_left(keys, key)
+                keys.pop(pos)
+            else:
+                continue
+            if pos < best:
+                best = pos
+
+        return best
+
+    def top(self, depth: int) -> list:
+        """
+        Returns the best levels as [price, qty].
+        """
+        return [[key * self.sign, self.qty[key]] for key in self.keys[:depth]]
+
+
+class OrderBook:
+    """
+    Level 2 order book of an instrument built from a snapshot and the
+    following delta messages.
+
+    Parameters
+    ----------
+    depth: int
+        Number of the best levels published to Instrument.asks and
+        Instrument.bids.
+    """
+
+    def __init__(self, depth: int) -> None:
+        self.depth = depth
+        self.asks = BookSide(descending=False)
+        self.bids = BookSide(descending=True)
+
+    def update(self, asks: Iterable, bids: Iterable, snapshot: bool) -> tuple:
+        """
+        Applies a snapshot or a delta message.
+
+        Returns
+        -------
+        tuple
+            Flags showing whether the top asks and bids have changed.
+        """
+        if snapshot:
+            self.asks.clear()
+            self.bids.clear()
+
+        return (
+            self.asks.update(asks) < self.depth,
+            self.bids.update(bids) < self.depth,
+        )
@@ -0,0 +1,232 @@
+import threading
+from typing import Callable, Hashable, Iterable, Union
+
+# Secondary indexes of the order registry: name and the function that
+# returns the index key of an order.
+
+ORDER_INDEXES: dict[str, Callable[[dict], Hashable]] = {
+    "emi": lambda order: order["emi"],
+    "emi_side": lambda order: (order["emi"], order["side"]),
+    "emi_symbol": lambda order: (order["emi"], order["symbol"]),
+    "symbol": lambda order: order["symbol"],
+    "market": lambda order: order["market"],
+    "orderID": lambda order: order["orderID"],
+    "clOrdID": lambda order: order["clOrdID"],
+    "level": lambda order: (order["symbol"], order["price"]),
+}
+
+
+class OrderRegistry:
+    """
+    Open orders of all bots and markets.
+
+    Each order is a dictionary with the keys "emi", "clOrdID", "orderID",
+    "symbol", "market", "category", "side", "price", "leavesQty",
+    "orderQty", "transactTime", stored under the (emi, clOrdID) key.
+    Secondary indexes (see ORDER_INDEXES) map each index key to the orders
+    having it, so that the orders of a bot by side or symbol, the order
+    with a given orderID or the orders at a price level are found without
+    scanning all orders.
+
+    Within every index the orders are kept in the order of their last
+    update (see touch()), which follows the ``transactTime`` of the
+    exchange messages, so the ascending order by ``transactTime`` needs no
+    sorting.
+
+    All methods are thread-safe. The order dictionaries returned are the
+    stored objects and must only be changed with update(), otherwise the
+    indexes become inconsistent.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.RLock()
+        self.orders = dict()
+        self.indexes = {name: dict() for name in ORDER_INDEXES}
+
+    def __len__(self) -> int:
+        return len(self.orders)
+
+    def _index(self, key: tuple, order: dict, names: Iterable) -> None:
+        for name in names:
+            value = ORDER_INDEXES[name](order)
+            self.indexes[name].setdefault(value, dict())[key] = order
+
+    def _unindex(self, key: tuple, order: dict, names: Iterable) -> None:
+        for name in names:
+            index = self.indexes[name]
+            value = ORDER_INDEXES[name](order)
+            group = index.get(value)
+            if group is not None:
+                group.pop(key, None)
+                if not group:
+                    del index[value]
+
+    def add(self, order: dict) -> bool:
+        """
+        Adds a new order. Returns False if an order with the same emi and
+        clOrdID already exists.
+        """
+        key = (order["emi"], order["clOrdID"])
+        with self.lock:
+            if key in self.orders:
+                return False
+            self.orders[key] = order
+            self._index(key=key, order=order, names=ORDER_INDEXES)
+
+        return True
+
+    def get(self, emi: str, clOrdID: str) -> Union[dict, None]:
+        return self.orders.get((emi, clOrdID))
+
+    def exists(self, emi: str, clOrdID: str) -> bool:
+        return (emi, clOrdID) in self.orders
+
+    def remove(self, emi: str, clOrdID: str) -> Union[dict, None]:
+        """
+        Removes the order and returns it, or None if there is no such
+        order.
+        """
+        key = (emi, clOrdID)
+        with self.lock:
+            order = self.orders.pop(key, None)
+            if order is not None:
+                self._unindex(key=key, order=order, names=ORDER_INDEXES)
+
+        return order
+
+    def update(self, emi: str, clOrdID: str, **values) -> Union[dict, None]:
+        """
+        Changes the order values, reindexing the order if an indexed value
+        changes, e.g. update(emi, clOrdID, price=price). Returns the order,
+        or None if there is no such order.
+        """
+        key = (emi, clOrdID)
+        with self.lock:
+            order = self.orders.get(key)
+            if order is not None:
+                new = {**order, **values}
+                changed = [
+                    name
+                    for name, index_key in ORDER_INDEXES.items()
+                    if index_key(new) != index_key(order)
+                ]
+                self._unindex(key=key, order=order, names=changed)
+                order.update(values)
+                self._index(key=key, order=order, names=changed)
+
+        return order
+
+    def touch(self, emi: str, clOrdID: str) -> None:
+        """
+        Moves the order to the end of all indexes as the most recently
+        updated one.
+        """
+        key = (emi, clOrdID)
+        with self.lock:
+            order = self.orders.get(key)
+            if order is not None:
+                self._unindex(key=key, order=order, names=ORDER_INDEXES)
+                self._index(key=key, order=order, names=ORDER_INDEXES)
+
+    def find(self, index: str, value: Hashable) -> list:
+        """
+        Returns the orders having the value in the given index, e.g.
+        find("orderID", orderID) or find("level", (symbol, price)).
+        """
+        with self.lock:
+            group = self.indexes[index].get(value)
+
+            return list(group.values()) if group else list()
+
+    def select(
+        self,
+        emi: str = "",
+        side: str = "",
+        symbol: Union[tuple, None] = None,
+        descend: bool = False,
+    ) -> list:
+        """
+        Returns the orders filtered by emi, side and symbol. The smallest
+        suitable index is used, and only its orders are checked.
+
+        Parameters
+        ----------
+        emi: str
+            Bot name or emi. If omitted, orders of all bots are returned.
+        side: str
+            Buy or Sell. If omitted, both sides are returned.
+        symbol: tuple
+            Instrument symbol in (symbol, market name) format. If omitted,
+            orders of all instruments are returned.
+        descend: bool
+            If omitted, the orders are sorted in ascending order by the value
+            of ``transactTime``. If True, descending order is returned.
+
+        Returns
+        -------
+        list
+            Orders.
+        """
+        with self.lock:
+            if emi and symbol:
+                group = self.indexes["emi_symbol"].get((emi, symbol))
+            elif emi and side:
+                group = self.indexes["emi_side"].get((emi, side))
+            elif emi:
+                group = self.indexes["emi"].get(emi)
+            elif symbol:
+                group = self.indexes["symbol"].get(symbol)
+            else:
+                group = self.orders
+            if not group:
+                return list()
+            orders = [
+                order
+                for order in group.values()
+                if (not side or order["side"] == side)
+                and (not symbol or order["symbol"] == symbol)
+            ]
+        if descend:
+            orders.sort(key=lambda x: x["transactTime"], reverse=True)
+
+        return orders
+
+    def count(self, emi: str) -> int:
+        group = self.indexes["emi"].get(emi)
+
+        return len(group) if group else 0
+
+    def level_qty(self, symbol: tuple, price: float) -> float:
+        """
+        Returns the total leavesQty of own orders at the price level.
+        """
+        with self.lock:
+            group = self.indexes["level"].get((symbol, price), dict())
+
+            return sum(order["leavesQty"] for order in group.values())
+
+    def remove_bot(self, emi: str) -> list:
+        """
+        Removes all orders of the bot and returns them.
+        """
+        return self._remove_group(index="emi", value=emi)
+
+    def remove_market(self, market: str) -> list:
+        """
+        Removes all orders of the market and returns them.
+        """
+        return self._remove_group(index="market", value=market)
+
+    def _remove_group(self, index: str, value: Hashable) -> list:
+        with self.lock:
+            orders = self.find(index=index, value=value)
+            for order in orders:
+                self.remove(emi=order["emi"], clOrdID=order["clOrdID"])
+
+        return orders
+
+    def clear(self) -> None:
+        with self.lock:
+            self.orders.clear()
+            for index in self.indexes.values():
+                index.clear()
@@ -0,0 +1,164 @@
+import sqlite3
+import sys
+
+# Positions of the trades table by (ACCOUNT, MARKET, EMI, SYMBOL): the sum of
+# QTY and SUMREAL of all rows except funding. The table is maintained by
+# triggers on the trades table, so that reading the open positions does not
+# scan and group the whole trades history. Rows with zero position are kept.
+
+POSITIONS_TABLE = "{TABLE}_positions"
+
+SQL_CREATE = """
+CREATE TABLE IF NOT EXISTS {POSITIONS} (
+ACCOUNT int NOT NULL,
+MARKET varchar(20) NOT NULL,
+EMI varchar(20) NOT NULL,
+SYMBOL varchar(40) NOT NULL,
+TICKER varchar(40) DEFAULT NULL,
+CATEGORY varchar(20) DEFAULT NULL,
+POS decimal(20,8) DEFAULT 0,
+PNL decimal(30,12) DEFAULT 0,
+TTIME datetime DEFAULT NULL,
+PRIMARY KEY (ACCOUNT, MARKET, EMI, SYMBOL))"""
+
+# Adds the row to its position. Used for inserted rows and for the new
+# values of updated rows.
+
+SQL_ADD = """
+INSERT INTO {POSITIONS} (ACCOUNT, MARKET, EMI, SYMBOL, TICKER, CATEGORY, POS,
+PNL, TTIME) VALUES (ifnull(NEW.ACCOUNT, 0), ifnull(NEW.MARKET, ''),
+ifnull(NEW.EMI, ''), ifnull(NEW.SYMBOL, ''), NEW.TICKER, NEW.CATEGORY,
+ifnull(NEW.QTY, 0), ifnull(NEW.SUMREAL, 0), NEW.TTIME)
+ON CONFLICT (ACCOUNT, MARKET, EMI, SYMBOL) DO UPDATE SET
+TICKER = excluded.TICKER, CATEGORY = excluded.CATEGORY,
+POS = POS + excluded.POS, PNL = PNL + excluded.PNL,
+TTIME = max(ifnull(TTIME, ''), ifnull(excluded.TTIME, ''));"""
+
+# Subtracts the row from its position. Used for deleted rows and for the old
+# values of updated rows.
+
+SQL_SUBTRACT = """
+UPDATE {POSITIONS} SET POS = POS - ifnull(OLD.QTY, 0),
+PNL = PNL - ifnull(OLD.SUMREAL, 0)
+WHERE ACCOUNT = ifnull(OLD.ACCOUNT, 0) AND MARKET = ifnull(OLD.MARKET, '')
+AND EMI = ifnull(OLD.EMI, '') AND SYMBOL = ifnull(OLD.SYMBOL, '');"""
+
+SQL_TRIGGERS = (
+    """
+CREATE TRIGGER IF NOT EXISTS {POSITIONS}_insert AFTER INSERT ON {TABLE}
+WHEN ifnull(NEW.SIDE, '') <> 'Fund' BEGIN """
+    + SQL_ADD
+    + """ END""",
+    """
+CREATE TRIGGER IF NOT EXISTS {POSITIONS}_delete AFTER DELETE ON {TABLE}
+WHEN ifnull(OLD.SIDE, '') <> 'Fund' BEGIN """
+    + SQL_SUBTRACT
+    + """ END""",
+    """
+CREATE TRIGGER IF NOT EXISTS {POSITIONS}_update_old
+AFTER UPDATE OF ACCOUNT, MARKET, EMI, SYMBOL, SIDE, QTY, SUMREAL ON {TABLE}
+WHEN ifnull(OLD.SIDE, '') <> 'Fund' BEGIN """
+    + SQL_SUBTRACT
+    + """ END""",
+    """
+CREATE TRIGGER IF NOT EXISTS {POSITIONS}_update_new
+AFTER UPDATE OF ACCOUNT, MARKET, EMI, SYMBOL, SIDE, QTY, SUMREAL ON {TABLE}
+WHEN ifnull(NEW.SIDE, '') <> 'Fund' BEGIN """
+    + SQL_ADD
+    + """ END""",
+)
+
+# Checkpoints of the bots' entry prices by (EMI, MARKET, SYMBOL, ACCOUNT):
+# the position and entry price after the trade with ID LAST_ID, so that only
+# later trades are replayed at startup. Checkpoints of a bot are dropped when
+# its trades are reassigned or deleted.
+
+ENTRY_TABLE = "{TABLE}_entry"
+
+SQL_CREATE_ENTRY = """
+CREATE TABLE IF NOT EXISTS {ENTRY} (
+EMI varchar(20) NOT NULL,
+MARKET varchar(20) NOT NULL,
+SYMBOL varchar(40) NOT NULL,
+ACCOUNT int NOT NULL,
+POS decimal(20,8) DEFAULT 0,
+ENTRY decimal(20,8) DEFAULT 0,
+LAST_ID int DEFAULT 0,
+PRIMARY KEY (EMI, MARKET, SYMBOL, ACCOUNT))"""
+
+SQL_ENTRY_TRIGGERS = (
+    """
+CREATE TRIGGER IF NOT EXISTS {ENTRY}_update AFTER UPDATE OF EMI ON {TABLE}
+BEGIN DELETE FROM {ENTRY} WHERE EMI IN (OLD.EMI, NEW.EMI); END""",
+    """
+CREATE TRIGGER IF NOT EXISTS {ENTRY}_delete AFTER DELETE ON {TABLE}
+BEGIN DELETE FROM {ENTRY} WHERE EMI = OLD.EMI; END""",
+)
+
+# The checkpoint refers to the last row of the bot on the instrument, so it
+# is queued after the trade it includes.
+
+SQL_SAVE_ENTRY = """
+INSERT OR REPLACE INTO {ENTRY} (EMI, MARKET, SYMBOL, ACCOUNT, POS, ENTRY, LAST_ID)
+VALUES (?, ?, ?, ?, ?, ?, (SELECT ifnull(max(ID), 0) FROM {TABLE}
+WHERE EMI = ? AND MARKET = ? AND SYMBOL = ?))"""
+
+SQL_REBUILD = """
+INSERT INTO {POSITIONS} (ACCOUNT, MARKET, EMI, SYMBOL, TICKER, CATEGORY, POS,
+PNL, TTIME) SELECT ifnull(ACCOUNT, 0), ifnull(MARKET, ''), ifnull(EMI, ''),
+ifnull(SYMBOL, ''), TICKER, CATEGORY, sum(ifnull(QTY, 0)),
+sum(ifnull(SUMREAL, 0)), max(TTIME) FROM (SELECT * FROM {TABLE}
+WHERE ifnull(SIDE, '') <> 'Fund' ORDER BY ID) GROUP BY ifnull(ACCOUNT, 0),
+ifnull(MARKET, ''), ifnull(EMI, ''), ifnull(SYMBOL, '');"""
+
+
+def create_positions(cursor: sqlite3.Cursor, table: str) -> None:
+    """
+    Creates the positions and entry checkpoints tables of the trades table
+    and their triggers. A new positions table is filled from the existing
+    trades. The caller commits.
+    """
+    positions = POSITIONS_TABLE.format(TABLE=table)
+    cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?",
+        (positions,),
+    )
+    exists = cursor.fetchone()
+    cursor.execute(SQL_CREATE.format(POSITIONS=positions))
+    for sql in SQL_TRIGGERS:
+        cursor.execute(sql.format(POSITIONS=positions, TABLE=table))
+    entry = ENTRY_TABLE.format(TABLE=table)
+    cursor.execute(SQL_CREATE_ENTRY.format(ENTRY=entry))
+    for sql in SQL_ENTRY_TRIGGERS:
+        cursor.execute(sql.format(ENTRY=entry, TABLE=table))
+    if not exists:
+        rebuild_positions(cursor=cursor, table=table)
+
+
+def rebuild_positions(cursor: sqlite3.Cursor, table: str) -> None:
+    """
+    Recalculates the positions table from the whole trades table, e.g. if
+    the trades were changed while the triggers did not exist. The entry
+    checkpoints are dropped and recreated by the next startup. The caller
+    commits.
+    """
+    positions = POSITIONS_TABLE.format(TABLE=table)
+    cursor.execute(f"DELETE FROM {ENTRY_TABLE.format(TABLE=table)}")
+    cursor.execute(f"DELETE FROM {positions}")
+    cursor.execute(SQL_REBUILD.format(POSITIONS=positions, TABLE=table))
+
+
+if __name__ == "__main__":
+    # Rebuilds the positions tables: python -m common.positions <database>
+    # [table ...]. All trades tables are rebuilt if no table is given.
+    if len(sys.argv) < 2:
+        sys.exit("Usage: python -m common.positions <database> [table ...]")
+    connection = sqlite3.connect(sys.argv[1])
+    cursor = connection.cursor()
+    tables = sys.argv[2:] or ("real_trade", "test_trade")
+    for table in tables:
+        create_positions(cursor=cursor, table=table)
+        rebuild_positions(cursor=cursor, table=table)
+        print(f"{POSITIONS_TABLE.format(TABLE=table)} rebuilt.")
+    connection.commit()
+    connection.close()
@@ -0,0 +1,158 @@
+import threading
+import time
+from typing import Mapping
+
+
+class TokenBucket:
+    """
+    Limits the rate of requests. The bucket holds up to ``capacity`` tokens
+    and is refilled at ``rate`` tokens per second. Each request takes one
+    token, and if the bucket is empty, the request waits until the token
+    is available. The capacity allows a short burst of requests after a
+    quiet period.
+
+    Parameters
+    ----------
+    rate: float
+        Tokens added per second.
+    capacity: float
+        Maximum number of tokens.
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, tokens: float = 1) -> None:
+        """
+        Takes tokens from the bucket, waiting if there are not enough.
+        Waiting requests are served in the order they arrive.
+        """
+        with self.lock:
+            self._refill()
+            self.tokens -= tokens
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+    def update(self, remaining: float) -> None:
+        """
+        Takes into account the remaining quota reported by the exchange.
+        The bucket never holds more tokens than the exchange allows, so
+        requests slow down before the limit is hit instead of failing.
+        """
+        with self.lock:
+            self._refill()
+            if remaining < self.tokens:
+                self.tokens = remaining
+
+    def configure(self, rate: float, capacity: float) -> None:
+        """
+        Changes the rate and capacity, e.g. when the limits of the account
+        become known.
+        """
+        with self.lock:
+            if rate == self.rate and capacity == self.capacity:
+                return
+            self._refill()
+            self.rate = rate
+            self.capacity = capacity
+            self.tokens = min(self.tokens, capacity)
+
+
+class RateLimiter:
+    """
+    Request rate limits of one exchange. Endpoints are divided into classes,
+    such as order placement and everything else, and each class has its
+    own TokenBucket. A request takes a token from every bucket of its
+    classes before it is sent. If the exchange reports the remaining quota
+    in the response headers, the buckets are updated accordingly.
+
+    Parameters
+    ----------
+    limits: dict
+        Rate and capacity of each endpoint class: {class: (rate, capacity)}.
+    routes: tuple
+        Items (verbs, path prefix, classes) checked in order. The first one
+        whose verbs contain the request method (None matches any method) and
+        whose prefix begins the path gives the classes of the request.
+        Otherwise, the request belongs to the "default" class.
+    headers: dict
+        Response headers with the remaining quota: {header: class}. If the
+        class is None, the header refers to the endpoint itself. Its quota
+        is kept in a separate bucket of the request path, created with the
+        rate and capacity of the last, most specific class of the request,
+        so that one busy endpoint does not slow down the others.
+    """
+
+    def __init__(self, limits: dict, routes: tuple = (), headers: dict = None) -> None:
+        self.buckets = {
+            name: TokenBucket(rate=rate, capacity=capacity)
+            for name, (rate, capacity) in limits.items()
+        }
+        self.routes = routes
+        self.headers = headers if headers else dict()
+        self.endpoints = dict()
+
+    def classes(self, path: str, verb: str) -> tuple:
+        for verbs, prefix, classes in self.routes:
+            if (verbs is None or verb in verbs) and path.startswith(prefix):
+                return classes
+
+        return ("default",)
+
+    def acquire(self, path: str, verb: str) -> tuple:
+        """
+        Waits until the request is allowed. Returns the classes of the
+        request for learn().
+        """
+        classes = self.classes(path=path, verb=verb)
+        for name in classes:
+            self.buckets[name].acquire()
+        endpoint = self.endpoints.get(path.split("?")[0])
+        if endpoint:
+            endpoint.acquire()
+
+        return classes
+
+    def learn(self, classes: tuple, headers: Mapping, path: str = "") -> None:
+        """
+        Updates the buckets from the remaining quota in the response
+        headers. path is the request path, needed for the headers of the
+        endpoint itself.
+        """
+        for header, name in self.headers.items():
+            value = headers.get(header)
+            if value is None:
+                continue
+            if name is None:
+                if not path:
+                    continue
+                bucket = self.endpoints.get(path.split("?")[0])
+                if bucket is None:
+                    bucket = self.endpoints.setdefault(
+                        path.split("?")[0],
+                        TokenBucket(
+                            rate=self.buckets[classes[-1]].rate,
+                            capacity=self.buckets[classes[-1]].capacity,
+                        ),
+                    )
+            elif name in classes:
+                bucket = self.buckets[name]
+            else:
+                continue
+            try:
+                bucket.update(remaining=float(value))
+            except ValueError:
+                pass
+
+    def configure(self, name: str, rate: float, capacity: float) -> None:
+        self.buckets[name].configure(rate=rate, capacity=capacity)
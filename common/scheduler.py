@@ -0,0 +1,271 @@
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Hashable
+
+from common.variables import Variables as var
+
+
+class Job:
+    """
+    A task of the download scheduler.
+
+    Parameters
+    ----------
+    function: Callable
+        Called without arguments. A result that evaluates to False means
+        failure, and the job is then repeated.
+    priority: Any
+        Jobs with the lower priority value run first.
+    name: str
+        Used in log messages.
+    """
+
+    def __init__(self, function: Callable, priority: Any, name: str) -> None:
+        self.function = function
+        self.priority = priority
+        self.name = name
+        self.attempts = 0
+        self.result = None
+        self.done = threading.Event()
+
+
+class DownloadScheduler:
+    """
+    Runs download jobs on a bounded pool of worker threads, so that many
+    subscriptions do not produce hundreds of simultaneous requests. Ready
+    jobs are taken in order of priority. A failed job is repeated on its
+    own after an exponentially growing delay, without affecting other
+    jobs. Workers are started on the first job.
+
+    Parameters
+    ----------
+    workers: int
+        Maximum number of jobs running at the same time.
+    backoff: float
+        Delay in seconds before the first retry. Doubles with each
+        failed attempt.
+    max_backoff: float
+        Maximum delay in seconds between retries.
+    """
+
+    def __init__(self, workers: int, backoff: float, max_backoff: float) -> None:
+        self.workers = workers
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.ready = list()  # heap of (priority, sequence, job)
+        self.delayed = list()  # heap of (time to retry, sequence, job)
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+        self.threads = list()
+
+    def submit(self, function: Callable, priority: Any, name: str) -> Job:
+        job = Job(function=function, priority=priority, name=name)
+        with self.condition:
+            heapq.heappush(self.ready, (priority, next(self.sequence), job))
+            if len(self.threads) < self.workers:
+                t = threading.Thread(target=self._work, daemon=True)
+                self.threads.append(t)
+                t.start()
+            self.condition.notify()
+
+        return job
+
+    def wait(self, jobs: list) -> list:
+        """
+        Waits until all given jobs are completed and returns their results.
+        """
+        for job in jobs:
+            job.done.wait()
+
+        return [job.result for job in jobs]
+
+    def _next_job(self) -> Job:
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                while self.delayed and self.delayed[0][0] <= now:
+                    _, sequence, job = heapq.heappop(self.delayed)
+                    heapq.heappush(self.ready, (job.priority, sequence, job))
+                if self.ready:
+                    return heapq.heappop(self.ready)[2]
+                timeout = self.delayed[0][0] - now if self.delayed else None
+                self.condition.wait(timeout)
+
+    def _work(self) -> None:
+        while True:
+            job = self._next_job()
+            try:
+                job.result = job.function()
+            except Exception as exception:
+                var.logger.error(job.name + " - " + str(exception))
+                job.result = None
+            if job.result:
+                job.done.set()
+                continue
+            delay = min(self.backoff * 2**job.attempts, self.max_backoff)
+            job.attempts += 1
+            var.logger.warning(
+                job.name
+                + " failed, attempt "
+                + str(job.attempts)
+                + ". Retry in "
+                + str(delay)
+                + " sec."
+            )
+            with self.condition:
+                heapq.heappush(
+                    self.delayed,
+                    (time.monotonic() + delay, next(self.sequence), job),
+                )
+                self.condition.notify()
+
+
+class BoundaryTimer:
+    """
+    Keeps the time of the next period boundary of each key in a heap, so
+    that the waiting thread sleeps exactly until the nearest boundary
+    instead of polling. A key has at most one scheduled time. Scheduling
+    it again replaces the previous time, and the outdated heap entry is
+    skipped when it comes up.
+    """
+
+    def __init__(self) -> None:
+        self.heap = list()  # heap of (time, sequence, key)
+        self.scheduled = dict()
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+        self.woken = False
+
+    def schedule(self, key: Hashable, at: float) -> None:
+        """
+        Sets the time (unix seconds) when the key is due.
+        """
+        with self.condition:
+            if self.scheduled.get(key) == at:
+                return
+            self.scheduled[key] = at
+            heapq.heappush(self.heap, (at, next(self.sequence), key))
+            self.condition.notify()
+
+    def cancel(self, key: Hashable) -> None:
+        with self.condition:
+            self.scheduled.pop(key, None)
+
+    def wake(self) -> None:
+        """
+        Makes the waiting thread return, e.g. on shutdown.
+        """
+        with self.condition:
+            self.woken = True
+            self.condition.notify()
+
+    def due(self) -> list:
+        """
+        Waits for the nearest boundary and returns the keys that are due,
+        ordered by time. Each returned key is no longer scheduled. An empty
+        list is returned if the waiting was interrupted by wake().
+        """
+        with self.condition:
+            while True:
+                now = time.time()
+                keys = list()
+                while self.heap and self.heap[0][0] <= now:
+                    at, _, key = heapq.heappop(self.heap)
+                    if self.scheduled.get(key) == at:
+                        del self.scheduled[key]
+                        keys.append(key)
+                if keys:
+                    return keys
+                if self.woken:
+                    self.woken = False
+                    return keys
+                timeout = self.heap[0][0] - now if self.heap else None
+                self.condition.wait(timeout)
+
+
+class SerialExecutor:
+    """
+    Runs the trading operations of one bot one after another, in the order
+    they were submitted, on a single worker thread. The caller gets a
+    Future and may wait for its result or continue. Operations wait in
+    the queue without polling, and the time each operation spends in the
+    queue is measured.
+
+    Parameters
+    ----------
+    name: str
+        Bot name, used as the name of the worker thread.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+        self.worker = None
+        self.lock = threading.Lock()
+        self.count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_last = 0.0
+
+    def submit(self, function: Callable, *args, **kwargs) -> Future:
+        """
+        Queues the function. If called from the worker thread itself, that
+        is, from a queued operation, the function is run at once, since
+        otherwise it would wait for the operation that submitted it.
+        """
+        if threading.get_ident() == self.worker:
+            future = Future()
+            try:
+                future.set_result(function(*args, **kwargs))
+            except Exception as exception:
+                future.set_exception(exception)
+            return future
+        submitted = time.monotonic()
+
+        def run() -> Any:
+            self.worker = threading.get_ident()
+            self._measure(time.monotonic() - submitted)
+            return function(*args, **kwargs)
+
+        return self.pool.submit(run)
+
+    def _measure(self, wait: float) -> None:
+        with self.lock:
+            self.count += 1
+            self.wait_total += wait
+            self.wait_last = wait
+            if wait > self.wait_max:
+                self.wait_max = wait
+
+    def stats(self) -> dict:
+        """
+        Returns the queue wait time in seconds: "count" of operations,
+        "last", "average" and "max".
+        """
+        with self.lock:
+            return {
+                "count": self.count,
+                "last": self.wait_last,
+                "average": self.wait_total / self.count if self.count else 0,
+                "max": self.wait_max,
+            }
+
+    def shutdown(self) -> None:
+        """
+        Cancels the queued operations. The running one is completed.
+        """
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Kline data downloads of all exchanges. The rate of requests to each
+# exchange is limited separately by the exchange's kline_rate_limit.
+
+kline_scheduler = DownloadScheduler(workers=8, backoff=2, max_backoff=60)
+
+# Period boundaries of the klines ("kline", market, symbol, timefr) and of
+# the bots ("bot", bot_name).
+
+kline_timer = BoundaryTimer()
@@ -7,6 +7,8 @@ from collections import OrderedDict
 from datetime import datetime, timezone
 from typing import Callable
 
+from common.orders import OrderRegistry
+
 
 class ListenLogger(logging.Filter):
     def filter(self, record):
@@ -116,10 +118,16 @@ class Variables:
     sql_lock = threading.Lock()
     working_directory: str
     kline_update_active = True
-    orders = dict()
+    orders = OrderRegistry()
     timeframe_human_format = OrderedDict(
         [
             ("tick", 0),
+            # Sub-minute timeframes are built from order book updates only,
+            # since exchanges do not provide their history.
+            ("5s", 5 / 60),
+            ("10s", 10 / 60),
+            ("15s", 15 / 60),
+            ("30s", 30 / 60),
             ("1min", 1),
             ("2min", 2),
             ("3min", 3),
@@ -11,6 +11,9 @@ from api.api import WS
 from api.init import Setup
 from api.setup import Markets
 from common.data import Bots, MetaInstrument
+from common.dbwriter import db_writer
+from common.latency import order_latency
+from common.scheduler import kline_timer
 from common.variables import Variables as var
 from display.bot_menu import bot_manager, insert_bot_log
 from display.functions import info_display
@@ -201,10 +204,7 @@ def setup_market(ws: Markets, reload=False):
 
 
 def merge_orders():
-    orders_list = list()
-    for values in var.orders.values():
-        for value in values.values():
-            orders_list.append(value)
+    orders_list = var.orders.select()
     orders_list.sort(key=lambda x: x["transactTime"])
     for order in orders_list:
         var.queue_order.put({"action": "put", "order": order})
@@ -303,7 +303,7 @@ def refresh() -> None:
                 order = job["order"]
                 clOrdID = order["clOrdID"]
                 ws = Markets[order["market"]]
-                if clOrdID in var.orders[order["emi"]]:
+                if var.orders.exists(emi=order["emi"], clOrdID=clOrdID):
                     Function.orders_display(ws, val=order)
             elif job["action"] == "clear":
                 TreeTable.orders.clear_all(market=job["market"])
@@ -344,7 +344,7 @@ def refresh() -> None:
 
 def clear_params():
     var.market_list = []
-    var.orders = dict()
+    var.orders.clear()
     MetaInstrument.market = dict()
     var.rollup_symbol = "cancel"
 
@@ -374,6 +374,9 @@ def on_closing(root, refresh_var):
     root.destroy()
     service.close(Markets)
     var.kline_update_active = False
+    kline_timer.wake()
+    order_latency.write()
+    db_writer.flush()
 
 
 def init_fake():
@@ -5,7 +5,6 @@ import shutil
 import sys
 import tkinter as tk
 import traceback
-from collections import OrderedDict
 from datetime import datetime, timezone
 from tkinter import StringVar, font, ttk
 from typing import Union
@@ -155,7 +154,6 @@ class SettingsApp:
         Initializes bot variables when a new bot is created.
         """
         time_now = self.get_time()
-        var.orders[bot_name] = OrderedDict()
         bot = Bots[bot_name]
         service.init_bot(
             bot=bot,
@@ -467,6 +465,7 @@ class SettingsApp:
                 bot.timefr = timefr
                 bot.updated = self.get_time()
                 bot.timefr_sec = service.timeframe_seconds(timefr)
+                service.schedule_bot(bot)
                 update_bot_info(bot_name=bot_name)
                 res_label["text"] = (
                     "Timeframe value changed to "
@@ -930,7 +929,7 @@ class SettingsApp:
             if bot_name in robo.run_bot:
                 del robo.run_bot[bot_name]
             del self.modules[bot_name]
-            del var.orders[bot_name]
+            var.orders.remove_bot(emi=bot_name)
             functions.remove_bot_klines(bot_name)
             functions.check_klines_update(bot_name)
             functions.update_order_form()
@@ -943,26 +942,25 @@ class SettingsApp:
         return [err, message]
 
     def delete_warning(self, bot_name: str) -> bool:
-        if bot_name in var.orders:
-            num = len(var.orders[bot_name])
-            if num > 0:
-                if num > 1:
-                    s = "s"
-                else:
-                    s = ""
-                message = (
-                    "Bot `"
-                    + bot_name
-                    + "` has "
-                    + str(num)
-                    + " open "
-                    + "order"
-                    + s
-                    + ". Before deleting the bot, you "
-                    + "need to cancel the orders."
-                )
-                functions.warning_window(message=message)
-                return True
+        num = var.orders.count(emi=bot_name)
+        if num > 0:
+            if num > 1:
+                s = "s"
+            else:
+                s = ""
+            message = (
+                "Bot `"
+                + bot_name
+                + "` has "
+                + str(num)
+                + " open "
+                + "order"
+                + s
+                + ". Before deleting the bot, you "
+                + "need to cancel the orders."
+            )
+            functions.warning_window(message=message)
+            return True
 
         bot = Bots[bot_name]
         if bot.bot_positions:
@@ -1266,8 +1264,6 @@ def import_bot_module(bot_name: str, update=False) -> None:
         module = "algo." + bot_name + "." + bot_manager.strategy_file.split(".")[0]
         Bots[bot_name].error_message = {}
         Bots[bot_name].multitrade = False
-        Bots[bot_name].block = []
-        Bots[bot_name].count = 0
         try:
             if module in sys.modules:
                 del sys.modules[module]
@@ -76,6 +76,8 @@ class Header:
         "STATE",
         "ERRORS",
         "UPDATED",
+        "ACK P50 / P99 MS",
+        "FILL P50 / P99 MS",
     ]
     name_bot_menu = ["AVAILABLE BOTS"]
     name_bot = [
@@ -65,7 +65,8 @@
 # data = Bybit["BTCUSD"].add_kline()
 # data(-1)             data set for the latest period (dict)
 # data("date", -1)     date of the last period in yymmdd format (int)
-# data["time", -1)     time of the last period in hhmmss format (int)
+# data["time", -1)     time of the last period in hhmm format, hhmmss for
+#                      sub-minute timeframes (int)
 # data("open_bid", -1)      first bid price at the beginning of the period (float)
 # data("open_ask", -1)      first ask price at the beginning of the period (float)
 # data("hi", -1)       highest price of the period (float)
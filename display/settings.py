@@ -34,6 +34,7 @@ class SettingsApp:
         self.common_settings["ORDER_BOOK_DEPTH"] = "orderBook 7"
         self.common_settings["BOTTOM_FRAME"] = "Bots"
         self.common_settings["REFRESH_RATE"] = "5"
+        self.common_settings["FAST_ORDER_ENTRY"] = "NO"
         self.common_settings["TESTNET"] = "YES"
 
         for setting in self.common_settings.keys():
@@ -697,7 +698,7 @@ class SettingsApp:
                     )
                     values = ("1", "2", "3", "4", "5", "6", "7", "8", "9", "10")
                     self.entry_common[setting]["values"] = values
-                elif setting == "TESTNET":
+                elif setting in ["FAST_ORDER_ENTRY", "TESTNET"]:
                     self.entry_common[setting] = ttk.Combobox(
                         self.root_frame,
                         width=self.entry_width,
@@ -37,6 +37,14 @@ class Tips(Enum):
         + "or decrease the load on your computer to some extent, depending "
         + "on its performance."
     )
+    FAST_ORDER_ENTRY = (
+        "Select YES to send orders over a persistent connection: Bybit "
+        + "orders go through the websocket trade channel, Bitmex orders "
+        + "through a separate HTTP session that is kept open. If the "
+        + "connection is not available, orders are sent as usual. The "
+        + "changes will take effect after restarting <F3> or relaunching "
+        + "Tmatic."
+    )
     MARKET = (
         "Select or deselect the checkbox associated with the market to enable "
         + "or disable it. You can drag the row with the market up and down "
@@ -1,7 +1,9 @@
+import math
 import re
 import threading
 import time
 import tkinter as tk
+from bisect import bisect_left
 from datetime import datetime, timedelta, timezone
 from decimal import Decimal
 from enum import Enum
@@ -17,6 +19,15 @@ from api.setup import Markets
 from api.variables import Variables
 from botinit.variables import Variables as robo
 from common.data import BotData, Bots, Instrument
+from common.dbpool import lock_wait_report
+from common.kline import (
+    KlineBuffer,
+    append_kline_file,
+    read_kline_file,
+    write_kline_file,
+)
+from common.latency import order_latency
+from common.scheduler import Job, kline_scheduler, kline_timer
 from common.variables import Variables as var
 from display.functions import info_display
 from display.headers import Header
@@ -36,10 +47,9 @@ from display.variables import Variables as disp
 class SelectDatabase(str, Enum):
     QWR = (
         "select SYMBOL, TICKER, CATEGORY, EMI, POS, PNL, MARKET, TTIME from (select "
-        + "EMI, SYMBOL, TICKER, CATEGORY, sum(QTY) POS, sum(SUMREAL) PNL, MARKET, "
-        + "TTIME from {DATABASE_TABLE}"
-        + " where SIDE <> 'Fund' group by EMI, SYMBOL, "
-        + "MARKET) res where POS <> 0 order by SYMBOL desc;"
+        + "EMI, SYMBOL, TICKER, CATEGORY, sum(POS) POS, sum(PNL) PNL, MARKET, "
+        + "max(TTIME) TTIME from {DATABASE_TABLE}_positions group by EMI, SYMBOL, "
+        + "MARKET) res where round(POS, 12) <> 0 order by SYMBOL desc;"
     )
 
     def __str__(self) -> str:
@@ -144,29 +154,42 @@ class Function(WS, Variables):
                 service.set_symbol(instrument=instrument, data=data)
 
     def kline_data_filename(self: Markets, symbol: tuple, timefr: str) -> str:
-        return "data/" + symbol[0] + "_" + self.name + "_" + str(timefr) + ".txt"
+        """
+        Kline data of the testnet and the main network are kept in different
+        files, since they may differ. The file format is described in
+        common/kline.py.
+        """
+        market = self.name + "_testnet" if self.testnet else self.name
+        symb = symbol[0].replace("/", "-")
+
+        return "data/" + symb + "_" + market + "_" + str(timefr) + ".kline"
+
+    def save_kline_data(self: Markets, row: dict, symbol: tuple, timefr: str) -> None:
+        """
+        Appends the finished period to the kline data file as one
+        fixed-size binary record.
+        """
+        filename = Function.kline_data_filename(self, symbol=symbol, timefr=timefr)
+        append_kline_file(
+            filename=filename,
+            row=row,
+            timefr_seconds=service.timeframe_seconds(timefr),
+        )
 
-    def save_kline_data(self: Markets, row: dict, symbol: tuple, timefr: int) -> None:
+    def write_kline_data(
+        self: Markets, data: KlineBuffer, symbol: tuple, timefr: str
+    ) -> None:
+        """
+        Overwrites the kline data file in a single write with all finished
+        periods, i.e. all candles except the current one.
+        """
         filename = Function.kline_data_filename(self, symbol=symbol, timefr=timefr)
-        zero = (4 - len(str(row["time"]))) * "0"
-        data = (
-            str(row["date"])
-            + ";"
-            + str(zero)
-            + str(row["time"])
-            + ";"
-            + str(row["open_bid"])
-            + ";"
-            + str(row["open_ask"])
-            + ";"
-            + str(row["hi"])
-            + ";"
-            + str(row["lo"])
-            + ";"
-            + str(round(self.Instrument[symbol].fundingRate, 6))
+        write_kline_file(
+            filename=filename,
+            data=data,
+            timefr_seconds=service.timeframe_seconds(timefr),
+            stop=-1,
         )
-        with open(filename, "a") as f:
-            f.write(data + "\n")
 
     def noll(self: Markets, val: str, length: int) -> str:
         r = ""
@@ -236,6 +259,23 @@ class Function(WS, Variables):
                 self.user_id,
             ]
             service.insert_database(values=values, table=var.database_table)
+            if (
+                emi in Bots.keys()
+                and info != "History"
+                and "spot" not in instrument.category
+            ):
+                # The entry price calculated by process_position() above. The
+                # positions built during the history catch-up are not saved,
+                # load_bots() checkpoints them after replaying the trades.
+                position = Bots[emi].bot_positions[row["symbol"]]
+                if position["checkpoint"]:
+                    service.save_entry(
+                        emi=emi,
+                        symbol=row["symbol"],
+                        account=self.user_id,
+                        position=position["position"],
+                        entry=position["entry"],
+                    )
             message = {
                 "SYMBOL": row["symbol"],
                 "MARKET": row["market"],
@@ -285,11 +325,9 @@ class Function(WS, Variables):
                 refer = emi
                 if emi not in Bots.keys():
                     emi = ""
-                data = service.select_database(  # read_database
-                    "select EXECID from %s where EXECID='%s' and account=%s"
-                    % (var.database_table, row["execID"], self.user_id),
-                )
-                if not data:
+                if not service.execution_exists(
+                    market=self.name, account=self.user_id, execID=row["execID"]
+                ):
                     handle_trade_or_delivery(row, emi, refer, cl_id)
                 Function.orders_processing(self, row=row, info=info)
 
@@ -305,7 +343,7 @@ class Function(WS, Variables):
                 else:
                     lastQty = 0
                 qwr = SelectDatabase.QWR.format(DATABASE_TABLE=var.database_table)
-                unclosed_positions = service.select_database(qwr)
+                unclosed_positions = service.select_database(qwr, flush=True)
                 for position in unclosed_positions:
                     symbol = (position["SYMBOL"], position["MARKET"])
                     if row["symbol"] == symbol and position["POS"] != 0:
@@ -333,7 +371,7 @@ class Function(WS, Variables):
                         + " and side <> 'Fund'"
                         + ";"
                     )
-                    data = service.select_database(query=qwr)[0]
+                    data = service.select_database(query=qwr, flush=True)[0]
                     if data["sum"] != diff:
                         message = ErrorMessage.IMPOSSIBLE_DATABASE_POSITION.format(
                             SYMBOL=row["symbol"][0],
@@ -499,14 +537,10 @@ class Function(WS, Variables):
                 emi = service.set_emi(symbol=row["symbol"])
         else:  # Retrieved from /execution or /execution/tradeHistory. The order
             # was made outside Tmatic.
-            for emi, values in var.orders.items():
-                for clOrdID, value in values.items():
-                    if value["orderID"] == row["orderID"]:
-                        # emi and clOrdID were defined in var.orders
-                        break
-                else:
-                    continue
-                break
+            found = var.orders.find(index="orderID", value=row["orderID"])
+            if found:
+                # emi and clOrdID were defined in var.orders
+                emi, clOrdID = found[0]["emi"], found[0]["clOrdID"]
             else:
                 """There is no order with this orderID in the var.orders. The
                 order was not sent via Tmatic. Possibly retrieved from
@@ -525,16 +559,18 @@ class Function(WS, Variables):
             order_message = "Order canceled " + row["symbol"][0]
             info_p = price
             info_q = row["orderQty"] - row["cumQty"]
-            if emi in var.orders and clOrdID in var.orders[emi]:
+            if var.orders.exists(emi=emi, clOrdID=clOrdID):
                 var.queue_order.put(
                     {"action": "delete", "clOrdID": clOrdID, "market": self.name}
                 )
-                del var.orders[emi][clOrdID]
+                var.orders.remove(emi=emi, clOrdID=clOrdID)
             else:
                 order_not_found(clOrdID=clOrdID)
+            order_latency.discard(clOrdID=clOrdID)
         else:
             if row["execType"] == "New":
                 order_message = "New order " + row["symbol"][0]
+                order_latency.stamp(clOrdID=clOrdID, stage="ack")
                 if "clOrdID" in row and row["clOrdID"]:
                     info_q = service.fill_order(
                         emi=emi, clOrdID=clOrdID, category=row["category"], value=row
@@ -542,16 +578,17 @@ class Function(WS, Variables):
                 info_p = price
             elif row["execType"] == "Trade":
                 order_message = "Transaction " + row["symbol"][0]
+                if info != "History":
+                    order_latency.stamp(clOrdID=clOrdID, stage="fill")
                 info_p = row["lastPx"]
                 info_q = row["lastQty"]
-                if emi in var.orders and clOrdID in var.orders[emi]:
+                order = var.orders.get(emi=emi, clOrdID=clOrdID)
+                if order:
                     precision = self.Instrument[row["symbol"]].precision
-                    var.orders[emi][clOrdID]["leavesQty"] -= row["lastQty"]
-                    var.orders[emi][clOrdID]["leavesQty"] = round(
-                        var.orders[emi][clOrdID]["leavesQty"], precision
-                    )
-                    if var.orders[emi][clOrdID]["leavesQty"] == 0:
-                        del var.orders[emi][clOrdID]
+                    leavesQty = round(order["leavesQty"] - row["lastQty"], precision)
+                    var.orders.update(emi=emi, clOrdID=clOrdID, leavesQty=leavesQty)
+                    if leavesQty == 0:
+                        var.orders.remove(emi=emi, clOrdID=clOrdID)
                         if emi in Bots.keys():
                             if Bots[emi].multitrade:
                                 if Bots[emi].state != "Disconnected":
@@ -571,11 +608,14 @@ class Function(WS, Variables):
                         order_not_found(clOrdID=clOrdID)
             elif row["execType"] == "Replaced":
                 order_message = "Order replaced " + row["symbol"][0]
-                if emi in var.orders and clOrdID in var.orders[emi]:
-                    if price == var.orders[emi][clOrdID]["price"]:
+                order = var.orders.get(emi=emi, clOrdID=clOrdID)
+                if order:
+                    if price == order["price"]:
                         info_q = None
                     else:
-                        var.orders[emi][clOrdID]["orderID"] = row["orderID"]
+                        var.orders.update(
+                            emi=emi, clOrdID=clOrdID, orderID=row["orderID"]
+                        )
                         info_p = price
                         """
                         """
@@ -588,10 +628,12 @@ class Function(WS, Variables):
                         "Trade").
                         """
                         if not row["leavesQty"]:
-                            info_q = var.orders[emi][clOrdID]["leavesQty"]
+                            info_q = order["leavesQty"]
                         else:
                             info_q = row["leavesQty"]
-                            var.orders[emi][clOrdID]["leavesQty"] = row["leavesQty"]
+                            var.orders.update(
+                                emi=emi, clOrdID=clOrdID, leavesQty=row["leavesQty"]
+                            )
                         """
                         """
                         """
@@ -605,9 +647,12 @@ class Function(WS, Variables):
                         )
                 else:
                     order_not_found(clOrdID=clOrdID)
-            if emi in var.orders and clOrdID in var.orders[emi]:
-                var.orders[emi][clOrdID]["price"] = price
-                var.orders[emi][clOrdID]["transactTime"] = row["transactTime"]
+            var.orders.update(
+                emi=emi,
+                clOrdID=clOrdID,
+                price=price,
+                transactTime=row["transactTime"],
+            )
         """try:
             t = clOrdID.split(".")
             int(t[0])
@@ -655,9 +700,10 @@ class Function(WS, Variables):
                 str(info_p),
                 info_q,
             )
-        if emi in var.orders and clOrdID in var.orders[emi]:
-            var.queue_order.put({"action": "put", "order": var.orders[emi][clOrdID]})
-            var.orders[emi].move_to_end(clOrdID)
+        order = var.orders.get(emi=emi, clOrdID=clOrdID)
+        if order:
+            var.queue_order.put({"action": "put", "order": order})
+            var.orders.touch(emi=emi, clOrdID=clOrdID)
         disp.bot_orders_processing = True
 
     def trades_display(
@@ -817,69 +863,57 @@ class Function(WS, Variables):
                             bot_name=bot_name,
                         )
                 bot.time = service.align_time(utcnow, timefr_minutes)
+                service.schedule_bot(bot)
         service.run_bots(bot_list=bot_list)
 
-    def kline_update_market(self: Markets, utcnow: datetime) -> None:
+    def kline_rollover(
+        self: Markets, symbol: tuple, timefr: str, utcnow: datetime
+    ) -> None:
         """
-        Processing timeframes.
+        Closes the current period of the kline and opens a new one, then
+        schedules the next boundary.
         """
-        for symbol, kline in self.klines.items():
-            for timefr, values in kline.items():
-                if timefr != "tick":
-                    timefr_minutes = var.timeframe_human_format[timefr]
-                    if utcnow > values["time"] + timedelta(minutes=timefr_minutes):
-                        instrument = self.Instrument[symbol]
-                        Function.save_kline_data(
-                            self,
-                            row=values["data"][-1],
-                            symbol=symbol,
-                            timefr=timefr,
-                        )
-                        dt_now = service.align_time(utcnow, timefr_minutes)
-                        try:
-                            ask = instrument.asks[0][0]
-                        except IndexError:
-                            message = ErrorMessage.EMPTY_ORDERBOOK_DATA_KLINE.format(
-                                SIDE="ask",
-                                SYMBOL=symbol,
-                                PRICE=values["data"][-1]["open_ask"],
-                            )
-                            _put_message(
-                                market=instrument.market, message=message, warning=True
-                            )
-                            ask = values["data"][-1]["open_ask"]
-                        try:
-                            bid = instrument.bids[0][0]
-                        except IndexError:
-                            message = ErrorMessage.EMPTY_ORDERBOOK_DATA_KLINE.format(
-                                SIDE="bid",
-                                SYMBOL=symbol,
-                                PRICE=values["data"][-1]["open_bid"],
-                            )
-                            _put_message(
-                                market=instrument.market, message=message, warning=True
-                            )
-                            bid = values["data"][-1]["open_bid"]
-                        dt = (
-                            (dt_now.year - 2000) * 10000
-                            + dt_now.month * 100
-                            + dt_now.day
-                        )
-                        tm = dt_now.hour * 100 + dt_now.minute
-                        values["data"].append(
-                            {
-                                "date": dt,
-                                "time": tm,
-                                "open_bid": bid,
-                                "open_ask": ask,
-                                "hi": ask,
-                                "lo": bid,
-                                "funding": instrument.fundingRate,
-                                "datetime": dt_now,
-                            }
-                        )
-                        values["time"] = dt_now
-        Function.update_and_run_bots(self, utcnow=utcnow)
+        values = self.klines[symbol][timefr]
+        timefr_minutes = var.timeframe_human_format[timefr]
+        if utcnow > values["time"] + timedelta(minutes=timefr_minutes):
+            instrument = self.Instrument[symbol]
+            Function.save_kline_data(
+                self,
+                row=values["data"][-1],
+                symbol=symbol,
+                timefr=timefr,
+            )
+            dt_now = service.align_time(utcnow, timefr_minutes)
+            try:
+                ask = instrument.asks[0][0]
+            except IndexError:
+                message = ErrorMessage.EMPTY_ORDERBOOK_DATA_KLINE.format(
+                    SIDE="ask",
+                    SYMBOL=symbol,
+                    PRICE=values["data"][-1]["open_ask"],
+                )
+                _put_message(market=instrument.market, message=message, warning=True)
+                ask = values["data"][-1]["open_ask"]
+            try:
+                bid = instrument.bids[0][0]
+            except IndexError:
+                message = ErrorMessage.EMPTY_ORDERBOOK_DATA_KLINE.format(
+                    SIDE="bid",
+                    SYMBOL=symbol,
+                    PRICE=values["data"][-1]["open_bid"],
+                )
+                _put_message(market=instrument.market, message=message, warning=True)
+                bid = values["data"][-1]["open_bid"]
+            values["data"].append(
+                tm=dt_now,
+                open_bid=bid,
+                open_ask=ask,
+                hi=ask,
+                lo=bid,
+                funding=instrument.fundingRate,
+            )
+            values["time"] = dt_now
+        schedule_kline(self, symbol=symbol, timefr=timefr)
 
     def refresh_on_screen(self: Markets, utc: datetime) -> None:
         """
@@ -890,6 +924,7 @@ class Function(WS, Variables):
             service.select_database("select count(*) cou from robots")
             var.refresh_hour = utc.hour
             var.logger.info("Emboldening SQLite")
+            var.logger.info(lock_wait_report())
         current_time = time.gmtime()
         if current_time.tm_sec != disp.last_gmtime_sec:
             # We are here once a second
@@ -1166,6 +1201,8 @@ class Function(WS, Variables):
                 bot.state,
                 service.bot_error(bot=bot),
                 bot.updated,
+                Function.format_latency(self, emi=name, stage="ack"),
+                Function.format_latency(self, emi=name, stage="fill"),
             ]
             iid = name
             if iid in tree.children:
@@ -1178,6 +1215,17 @@ class Function(WS, Variables):
                 tree.insert(iid=iid, values=compare, position="end")
         # d print("___bots", datetime.now() - tm)
 
+    def format_latency(self: Markets, emi: str, stage: str) -> str:
+        """
+        Returns the bot's order latency at the stage as "p50 / p99" in
+        milliseconds.
+        """
+        values = order_latency.percentiles(emi=emi, stage=stage)
+        if values is None:
+            return var.DASH
+
+        return " / ".join(str(round(value * 1000)) for value in values)
+
     def display_options_desk(self):
         tree = TreeTable.calls
         for num, option in enumerate(options_desk.calls_list):
@@ -1265,8 +1313,6 @@ class Function(WS, Variables):
         current_notebook_tab = disp.notebook.tab(disp.notebook.select(), "text")
         instrument = self.Instrument[var.symbol]
 
-        # service.count_orders()
-
         # Refresh instrument table
 
         Function.display_instruments(self)
@@ -1722,11 +1768,9 @@ class Function(WS, Variables):
         """
         Replace orders
         """
-        price_str = Function.format_price(
-            self, number=price, symbol=var.orders[emi][clOrdID]["symbol"]
-        )
-        if price != var.orders[emi][clOrdID]["price"]:  # the price alters
-            order = var.orders[emi][clOrdID]
+        order = var.orders.get(emi=emi, clOrdID=clOrdID)
+        price_str = Function.format_price(self, number=price, symbol=order["symbol"])
+        if price != order["price"]:  # the price alters
             WS.replace_limit(
                 self,
                 leavesQty=qty,
@@ -1768,11 +1812,7 @@ class Function(WS, Variables):
         TreeTable.market.tree.update()
 
     def find_order(self: Markets, price: float, symbol: str) -> Union[float, str]:
-        qty = 0
-        for values in var.orders.values():
-            for value in values.values():
-                if value["price"] == price and value["symbol"] == symbol:
-                    qty += value["leavesQty"]
+        qty = var.orders.level_qty(symbol=symbol, price=price)
         if not qty:
             qty = ""
 
@@ -1889,10 +1929,7 @@ class Function(WS, Variables):
                         values["data"]["bid"] = bid
                         values["data"]["ask"] = ask
                     else:
-                        if ask > values["data"][-1]["hi"]:
-                            values["data"][-1]["hi"] = ask
-                        if bid < values["data"][-1]["lo"]:
-                            values["data"][-1]["lo"] = bid
+                        values["data"].update_hi_lo(ask=ask, bid=bid)
 
                 # Processing the BreakDown indicator
 
@@ -1954,9 +1991,7 @@ def handler_order(event) -> None:
                 """
 
         def cancel(order: dict, clOrdID: str) -> None:
-            try:
-                var.orders[emi][clOrdID]
-            except KeyError:
+            if not var.orders.exists(emi=emi, clOrdID=clOrdID):
                 message = "Order " + clOrdID + " does not exist!"
                 info_display(market=ws.name, message=message, warning="warning")
                 var.logger.info(message)
@@ -1972,9 +2007,8 @@ def handler_order(event) -> None:
             on_closing()
 
         def replace(clOrdID) -> None:
-            try:
-                var.orders[emi][clOrdID]
-            except KeyError:
+            order = var.orders.get(emi=emi, clOrdID=clOrdID)
+            if not order:
                 message = "Order " + clOrdID + " does not exist!"
                 info_display(ws.name, message)
                 var.logger.info(message)
@@ -1987,16 +2021,16 @@ def handler_order(event) -> None:
                 )
                 return
             if not ws.logNumFatal:
-                roundSide = var.orders[emi][clOrdID]["leavesQty"]
-                if var.orders[emi][clOrdID]["side"] == "Sell":
+                roundSide = order["leavesQty"]
+                if order["side"] == "Sell":
                     roundSide = -roundSide
                 price = Function.round_price(
                     ws,
-                    symbol=var.orders[emi][clOrdID]["symbol"],
+                    symbol=order["symbol"],
                     price=float(price_replace.get()),
                     rside=roundSide,
                 )
-                if price == var.orders[emi][clOrdID]["price"]:
+                if price == order["price"]:
                     info_display(
                         market=ws.name,
                         message="Price is the same but must be different!",
@@ -2008,7 +2042,7 @@ def handler_order(event) -> None:
                     emi=emi,
                     clOrdID=clOrdID,
                     price=price,
-                    qty=var.orders[emi][clOrdID]["leavesQty"],
+                    qty=order["leavesQty"],
                 )
             else:
                 info_display(
@@ -2029,7 +2063,7 @@ def handler_order(event) -> None:
                 on_closing()
 
         if disp.order_window_trigger == "off":
-            order = var.orders[emi][clOrdID]
+            order = var.orders.get(emi=emi, clOrdID=clOrdID)
             disp.order_window_trigger = "on"
             order_window = tk.Toplevel(disp.root, pady=10, padx=10)
             cx = disp.root.winfo_pointerx()
@@ -2043,8 +2077,8 @@ def handler_order(event) -> None:
             label1 = tk.Label(frame_up, justify="left")
             order_price = Function.format_price(
                 ws,
-                number=var.orders[emi][clOrdID]["price"],
-                symbol=var.orders[emi][clOrdID]["symbol"],
+                number=order["price"],
+                symbol=order["symbol"],
             )
             label1["text"] = (
                 "market\t"
@@ -2554,13 +2588,9 @@ def check_unsubscribe(ws: Markets, symbol: tuple) -> str:
                 return ErrorMessage.UNSUBSCRIPTION_WARNING_UNSETTLED.format(
                     SYMBOL=symbol, PIECE1=piece1, LIST=text, PIECE2=piece2
                 )
-    for orders in var.orders.values():
-        for value in orders.values():
-            for item in each_symbol:
-                if item == value["symbol"]:
-                    return ErrorMessage.UNSUBSCRIPTION_WARNING_ORDERS.format(
-                        SYMBOL=symbol
-                    )
+    for item in each_symbol:
+        if var.orders.select(symbol=item):
+            return ErrorMessage.UNSUBSCRIPTION_WARNING_ORDERS.format(SYMBOL=symbol)
     if len(ws.symbol_list) == 1:
         return ErrorMessage.UNSUBSCRIPTION_WARNING
 
@@ -2841,6 +2871,7 @@ def download_kline_data(
 ) -> Tuple[Union[list, None], Union[datetime, None]]:
     res = list()
     while target > start_time:
+        self.kline_rate_limit.acquire()
         data = WS.trade_bucketed(
             self, symbol=symbol, time=start_time, timeframe=timeframe
         )
@@ -2859,174 +2890,379 @@ def download_kline_data(
     return res
 
 
+def schedule_kline(self: Markets, symbol: tuple, timefr: str) -> None:
+    """
+    Schedules the end of the kline's current period.
+    """
+    boundary = self.klines[symbol][timefr]["time"] + timedelta(
+        minutes=var.timeframe_human_format[timefr]
+    )
+    kline_timer.schedule(("kline", self.name, symbol, timefr), boundary.timestamp())
+
+
 def kline_update():
+    """
+    Closes kline periods and runs bots at the timeframe boundaries. The
+    thread sleeps until the nearest boundary of any kline or bot, and then
+    processes only the klines and bots whose period is over. If an exchange
+    is not active at that moment, its klines are checked again in a
+    second.
+    """
     while var.kline_update_active:
+        keys = kline_timer.due()
         utcnow = datetime.now(tz=timezone.utc)
         var.lock_kline_update.acquire(True)
-        threads = []
-        for market in var.market_list:
+        bots = list()
+        for key in keys:
+            if key[0] == "bot":
+                bots.append(key[1])
+                continue
+            _, market, symbol, timefr = key
+            if market not in var.market_list:
+                continue
             ws = Markets[market]
+            if symbol not in ws.klines or timefr not in ws.klines[symbol]:
+                continue
             if ws.api_is_active:
-                t = threading.Thread(
-                    target=Function.kline_update_market,
-                    args=(
-                        ws,
-                        utcnow,
-                    ),
-                )
-                threads.append(t)
-                t.start()
-        [thread.join() for thread in threads]
+                Function.kline_rollover(ws, symbol=symbol, timefr=timefr, utcnow=utcnow)
+            else:
+                kline_timer.schedule(key, utcnow.timestamp() + 1)
         var.lock_kline_update.release()
-        rest = 1 - time.time() % 1
-        time.sleep(rest)
+        if bots:
+            for market in var.market_list:
+                ws = Markets[market]
+                if ws.api_is_active:
+                    Function.update_and_run_bots(ws, utcnow=utcnow)
+                    for bot_name in bots:
+                        if bot_name in Bots.keys():
+                            service.schedule_bot(Bots[bot_name])
+                    break
+            else:
+                for bot_name in bots:
+                    kline_timer.schedule(("bot", bot_name), utcnow.timestamp() + 1)
 
 
-def merge_klines(data: list, timefr_minutes: int, prev: int):
-    op = 0
-    hi = 0
-    lo = 0
-    cl = 0
-    timestamp, symbol = None, ""
-    res = list()
-    prev, fl = None, "append"
-    for num, el in enumerate(data, 1):
-        m = el["timestamp"]
-        delta = timedelta(
-            minutes=timefr_minutes
-            - m.minute % timefr_minutes
-            - (m.hour * 60) % timefr_minutes
-        )
-        next_t = el["timestamp"] + delta
-        if prev != next_t:
-            if op != 0:
-                res.append(
-                    {
-                        "timestamp": timestamp,
-                        "symbol": symbol,
-                        "open": op,
-                        "high": hi,
-                        "low": lo,
-                        "close": cl,
-                    }
-                )
-            timestamp = el["timestamp"]
-            op = el["open"]
-            hi = el["high"]
-            lo = el["low"]
-            cl = el["close"]
-            symbol = el["symbol"]
-            fl = "append"
+def read_kline_cache(
+    self: Markets, symbol: tuple, timefr: str, start_time: datetime, target: datetime
+) -> KlineBuffer:
+    """
+    Reads the kline data previously saved to the file and returns the rows
+    that can be reused: finished periods from start_time up to target
+    without gaps. If the file is missing, corrupted or does not cover the
+    beginning of the requested period, an empty buffer is returned.
+    """
+    filename = Function.kline_data_filename(self, symbol=symbol, timefr=timefr)
+    step = var.timeframe_human_format[timefr] * 60
+    start, end = int(start_time.timestamp()), int(target.timestamp())
+    saved = read_kline_file(filename)
+    timestamp = saved.column("timestamp")
+
+    # If a period was saved more than once, the latest record is taken.
+
+    index = dict(zip(timestamp, range(len(timestamp))))
+    order = sorted(tm for tm in index if start <= tm < end)
+    if not order or order[0] - start >= step:
+        return KlineBuffer(capacity=1)
+    for num in range(1, len(order)):
+        if order[num] - order[num - 1] > step:
+            # There is a gap, only the data before the gap can be used.
+            order = order[:num]
+            break
+    position = [index[tm] for tm in order]
+    columns = saved.columns()
+    cache = KlineBuffer(capacity=len(position))
+    cache.extend(
+        **{name: [values[pos] for pos in position] for name, values in columns.items()}
+    )
+
+    return cache
+
+
+def check_kline_overlap(
+    cached: KlineBuffer, downloaded: KlineBuffer
+) -> Union[int, None]:
+    """
+    Compares every cached period that falls within the downloaded data with
+    the downloaded period of the same time. Each of them must be present in
+    the downloaded data, and the open, high and low prices must match within
+    KLINE_TOLERANCE, since cached periods built from the order book may
+    differ slightly from the exchange's trade data. A missing or revised
+    period invalidates the cache.
+
+    Returns
+    -------
+    int | None
+        Number of cached rows preceding the downloaded data or None if the
+        cache is considered invalid.
+    """
+    timestamp = downloaded.column("timestamp")
+    cached_timestamp = cached.column("timestamp")
+    first = bisect_left(cached_timestamp, timestamp[0])
+    if first == len(cached_timestamp):
+        return None
+    cached_columns = cached.columns()
+    columns = downloaded.columns()
+    for num in range(first, len(cached_timestamp)):
+        pos = bisect_left(timestamp, cached_timestamp[num])
+        if pos == len(timestamp) or timestamp[pos] != cached_timestamp[num]:
+            return None
+        tolerance = robo.KLINE_TOLERANCE * columns["hi"][pos]
+        if (
+            abs(cached_columns["hi"][num] - columns["hi"][pos]) > tolerance
+            or abs(cached_columns["lo"][num] - columns["lo"][pos]) > tolerance
+            or columns["open_bid"][pos] < cached_columns["open_bid"][num] - tolerance
+            or columns["open_ask"][pos] > cached_columns["open_ask"][num] + tolerance
+        ):
+            return None
+
+    return first
+
+
+def base_timeframe(self: Markets, timefrs: list) -> str:
+    """
+    Returns the timeframe from which all the given timeframes of a symbol
+    can be built: the largest timeframe supported by the exchange that
+    divides each of them.
+    """
+    common = 0
+    for timefr in timefrs:
+        common = math.gcd(common, var.timeframe_human_format[timefr])
+    base = 1
+    for tf_min in reversed(self.timefrs.keys()):
+        if common % tf_min == 0:
+            base = tf_min
+            break
+    for timefr, tf_min in var.timeframe_human_format.items():
+        if tf_min == base:
+            return timefr
+
+
+def group_timeframes(self: Markets, timefrs: list) -> list:
+    """
+    Splits the timeframes of a symbol into groups, each built from its own
+    base series. A timeframe joins a group if the base series then has at
+    most BASE_KLINES_RATIO times CANDLESTICK_NUMBER rows, i.e. the longest
+    timeframe of the group is at most BASE_KLINES_RATIO times the base one.
+    Otherwise it starts a new group and may be downloaded on its own.
+    """
+    groups = list()
+    for timefr in sorted(timefrs, key=lambda x: var.timeframe_human_format[x]):
+        timefr_minutes = var.timeframe_human_format[timefr]
+        for group in groups:
+            base = base_timeframe(self, timefrs=group + [timefr])
+            ratio = timefr_minutes / var.timeframe_human_format[base]
+            if ratio <= robo.BASE_KLINES_RATIO:
+                group.append(timefr)
+                break
         else:
-            if el["high"] > hi:
-                hi = el["high"]
-            if el["low"] < lo:
-                lo = el["low"]
-            cl = el["close"]
-            fl = ""
-        prev = next_t
-    if fl == "" or num == len(data):
-        res.append(
-            {
-                "timestamp": timestamp,
-                "symbol": symbol,
-                "open": op,
-                "high": hi,
-                "low": lo,
-                "close": cl,
-            }
-        )
+            groups.append([timefr])
 
-    return res
+    return groups
 
 
-def load_klines(
+def load_base_klines(
     self: Markets,
     symbol: tuple,
     timefr: str,
-    klines: dict,
-) -> Union[dict, None]:
+    start_time: datetime,
+    target: datetime,
+) -> Union[KlineBuffer, None]:
     """
-    Loading kline data from the exchange server. Data is recorded
-    in files for each timeframe. Every time you reboot the files are
-    overwritten.
+    Loads the base timeframe data of a symbol. The data already saved in
+    the file is reused and only the missing periods are downloaded from
+    the exchange server, starting KLINE_OVERLAP periods before the end of
+    the saved data, so that the saved periods revised by the exchange are
+    detected. If the file contains a gap or a saved period does not match
+    the exchange data, the entire period is downloaded again. The file is
+    then rewritten in one pass.
+
+    Returns
+    -------
+    KlineBuffer | None
+        Rows from start_time up to and including the current period.
     """
-    filename = Function.kline_data_filename(self, symbol=symbol, timefr=timefr)
-    with open(filename, "w") as f:
-        f.write("date;time;open_bid;open_ask;hi;lo;fund" + "\n")
-    target = datetime.now(tz=timezone.utc)
-    target = target.replace(second=0, microsecond=0)
     timefr_minutes = var.timeframe_human_format[timefr]
-    if not timefr_minutes:  # Bot uses tick data
-        return timefr
-    original = timefr_minutes
-    prev = 1
-    for tf_min in reversed(self.timefrs.keys()):
-        if tf_min == timefr_minutes:
-            prev = tf_min
-            break
-        elif tf_min < timefr_minutes:
-            if timefr_minutes % tf_min == 0:
-                prev = tf_min
-                break
-    factor = int(timefr_minutes / prev)
-    timefr_minutes = prev
-    start_time = target - timedelta(
-        minutes=robo.CANDLESTICK_NUMBER * timefr_minutes * factor - timefr_minutes
-    )
-    delta = timedelta(
-        minutes=target.minute % timefr_minutes + (target.hour * 60) % timefr_minutes
-    )
-    target -= delta
 
-    # Loading timeframe data
+    def download(start_time: datetime) -> Union[KlineBuffer, None]:
+        res = download_kline_data(
+            self,
+            start_time=start_time,
+            target=target,
+            symbol=symbol,
+            timeframe=timefr_minutes,
+        )
+        if not res:
+            return None
+        # Bitmex bug fix. Bitmex can send data with the next period's
+        # timestamp typically for 5m and 60m.
+        shift = timefr_minutes * 60 if target < res[-1]["timestamp"] else 0
+
+        if res[0]["timestamp"] > res[-1]["timestamp"]:
+            res.reverse()
+        timestamp = [int(row["timestamp"].timestamp()) - shift for row in res]
+        opens = [float(row["open"]) for row in res]
+        data = KlineBuffer(capacity=len(res))
+        data.extend(
+            timestamp=timestamp,
+            open_bid=opens,
+            open_ask=opens,
+            hi=[float(row["high"]) for row in res],
+            lo=[float(row["low"]) for row in res],
+            funding=[0.0] * len(res),
+        )
+
+        return data
 
-    res = download_kline_data(
-        self,
-        start_time=start_time,
-        target=target,
-        symbol=symbol,
-        timeframe=timefr_minutes,
+    cache = read_kline_cache(
+        self, symbol=symbol, timefr=timefr, start_time=start_time, target=target
     )
+    res = None
+    if cache:
+        overlap = cache[max(0, len(cache) - robo.KLINE_OVERLAP)]
+        res = download(start_time=overlap["datetime"])
+        if res:
+            keep = check_kline_overlap(cached=cache, downloaded=res)
+        if res and keep is None:
+            message = (
+                str(symbol)
+                + " "
+                + str(timefr)
+                + " saved kline data does not match the exchange data and"
+                + " will be downloaded again."
+            )
+            var.logger.warning(message)
+            cache = None
+            res = None
+    if not cache:
+        res = download(start_time=start_time)
+        keep = 0
     if not res:
-        message = str(symbol) + " " + str(timefr) + " kline data was not loaded!"
+        return None
+
+    # The cached periods that were downloaded again are replaced with the
+    # exchange data. All finished periods are saved, the current period
+    # will be saved when it is over.
+
+    rows = KlineBuffer(capacity=keep + len(res))
+    if cache:
+        columns = cache.columns()
+        rows.extend(**{name: values[:keep] for name, values in columns.items()})
+    rows.extend(**res.columns())
+    Function.write_kline_data(self, data=rows, symbol=symbol, timefr=timefr)
+
+    return rows
+
+
+def start_local_kline(self: Markets, symbol: tuple, timefr: str) -> Union[str, None]:
+    """
+    Starts a kline that is built only from the order book updates, such as
+    a sub-minute timeframe. The first period opens with the current best
+    bid and ask, and the following periods are formed as usual in
+    kline_hi_lo_values() and kline_rollover().
+    """
+    instrument = self.Instrument[symbol]
+    try:
+        ask = instrument.asks[0][0]
+        bid = instrument.bids[0][0]
+    except IndexError:
+        message = (
+            str(symbol)
+            + " "
+            + timefr
+            + " kline is not started, the order book is empty."
+        )
         var.logger.error(message)
         return None
+    values = self.klines[symbol][timefr]
+    tm = service.align_time(
+        datetime.now(tz=timezone.utc), var.timeframe_human_format[timefr]
+    )
+    values["data"].clear()
+    values["data"].append(
+        tm=tm,
+        open_bid=bid,
+        open_ask=ask,
+        hi=ask,
+        lo=bid,
+        funding=instrument.fundingRate,
+    )
+    values["time"] = tm
+    schedule_kline(self, symbol=symbol, timefr=timefr)
+
+    return "success"
 
-    # Bitmex bug fix. Bitmex can send data with the next period's
-    # timestamp typically for 5m and 60m.
-    if target < res[-1]["timestamp"]:
-        delta = timedelta(minutes=timefr_minutes)
-        for r in res:
-            r["timestamp"] -= delta
+
+def load_klines(
+    self: Markets,
+    symbol: tuple,
+    timefrs: list,
+    klines: dict,
+) -> Union[dict, None]:
+    """
+    Loading kline data for the given timeframes of a symbol. The
+    timeframes are grouped so that one series is downloaded per group, the
+    base timeframe, from which the timeframes of the group are built
+    locally, including those that the exchange does not support. The data
+    is recorded in files for each timeframe.
+    """
+    # Tick data is not loaded. Sub-minute klines have no history on the
+    # exchanges and are started from the current order book.
+
+    for timefr in timefrs:
+        if 0 < var.timeframe_human_format[timefr] < 1:
+            if not start_local_kline(self, symbol=symbol, timefr=timefr):
+                return None
+    timefrs = [timefr for timefr in timefrs if var.timeframe_human_format[timefr] >= 1]
+    if not timefrs:
+        return klines
+    for group in group_timeframes(self, timefrs=timefrs):
+        if not load_kline_group(self, symbol=symbol, timefrs=group, klines=klines):
+            return None
+
+    return klines
+
+
+def load_kline_group(
+    self: Markets,
+    symbol: tuple,
+    timefrs: list,
+    klines: dict,
+) -> Union[dict, None]:
+    """
+    Downloads the base series of a group of timeframes and builds each
+    timeframe of the group from it.
+    """
+    base = base_timeframe(self, timefrs=timefrs)
+    longest = max(var.timeframe_human_format[timefr] for timefr in timefrs)
+    target = datetime.now(tz=timezone.utc)
+    target = service.align_time(target, var.timeframe_human_format[base])
+    start_time = service.align_time(target, longest) - timedelta(
+        minutes=(robo.CANDLESTICK_NUMBER - 1) * longest
+    )
+    rows = load_base_klines(
+        self, symbol=symbol, timefr=base, start_time=start_time, target=target
+    )
+    if not rows:
+        message = str(symbol) + " " + ", ".join(timefrs) + " kline data was not loaded!"
+        var.logger.error(message)
+        return None
 
     # The 'klines' array is filled with timeframe data.
-    if res[0]["timestamp"] > res[-1]["timestamp"]:
-        res.reverse()
-    if factor > 1:
-        res = merge_klines(data=res, timefr_minutes=original, prev=prev)
-    klines[symbol][timefr]["data"] = []
-    for num, row in enumerate(res):
-        tm = row["timestamp"]  # - timedelta(minutes=timefr_minutes)
-        klines[symbol][timefr]["data"].append(
-            {
-                "date": (tm.year - 2000) * 10000 + tm.month * 100 + tm.day,
-                "time": tm.hour * 100 + tm.minute,
-                "open_bid": float(row["open"]),
-                "open_ask": float(row["open"]),
-                "hi": float(row["high"]),
-                "lo": float(row["low"]),
-                "datetime": tm,
-            }
+
+    for timefr in timefrs:
+        data: KlineBuffer = klines[symbol][timefr]["data"]
+        candles = rows.resample(
+            timefr_minutes=var.timeframe_human_format[timefr],
+            capacity=data.capacity,
         )
-        if num < len(res) - 1:
-            Function.save_kline_data(
-                self,
-                row=klines[symbol][timefr]["data"][-1],
-                symbol=symbol,
-                timefr=timefr,
-            )
-    klines[symbol][timefr]["time"] = tm
+        data.clear()
+        data.extend(**candles.columns())
+        klines[symbol][timefr]["time"] = service.align_time(
+            data[-1]["datetime"], var.timeframe_human_format[timefr]
+        )
+        schedule_kline(self, symbol=symbol, timefr=timefr)
+        if timefr != base:
+            Function.write_kline_data(self, data=data, symbol=symbol, timefr=timefr)
 
     return klines
 
@@ -3039,6 +3275,9 @@ def add_new_kline(self: Markets, symbol: tuple, bot_name: str, timefr: str) -> N
     element. If the given symbol does not exist in the dictionary klines,
     then first adds the symbol to klines, then adds timefr to klines[symbol],
     and finally adds bot_name to the set "robots" in klines[symbol][timefr].
+
+    The candles are stored in a KlineBuffer of CANDLESTICK_NUMBER capacity,
+    so the oldest candle is dropped when a new one is added.
     """
     time = datetime.now(tz=timezone.utc)
 
@@ -3047,7 +3286,10 @@ def add_new_kline(self: Markets, symbol: tuple, bot_name: str, timefr: str) -> N
             "time": time,
             "robots": set(),
             "open": 0,
-            "data": [],
+            "data": KlineBuffer(
+                capacity=robo.CANDLESTICK_NUMBER,
+                seconds=var.timeframe_human_format[timefr] < 1,
+            ),
         }
         self.klines[symbol][timefr]["robots"].add(bot_name)
 
@@ -3065,43 +3307,62 @@ def add_new_kline(self: Markets, symbol: tuple, bot_name: str, timefr: str) -> N
         self.klines[symbol][timefr]["data"]["ask"] = None
 
 
-def init_market_klines(
-    self: Markets,
-) -> Union[dict, None]:
+def kline_priority(self: Markets, symbol: tuple, timefrs: list) -> tuple:
     """
-    Downloads kline data from the endpoint of the specific exchange.
+    Download priority of the symbol's timeframes. The data needed by active
+    bots is loaded first, starting with the bots that are due to run
+    soonest.
     """
+    utcnow = datetime.now(tz=timezone.utc)
+    priority = (1, utcnow.timestamp())
+    for timefr in timefrs:
+        for bot_name in self.klines[symbol][timefr]["robots"]:
+            if bot_name not in Bots.keys():
+                continue
+            bot = Bots[bot_name]
+            timefr_minutes = var.timeframe_human_format[bot.timefr]
+            activation = service.align_time(utcnow, timefr_minutes) + timedelta(
+                minutes=timefr_minutes
+            )
+            active = 0 if bot.state == "Active" else 1
+            priority = min(priority, (active, activation.timestamp()))
 
-    success = []
+    return priority
 
-    def get_in_thread(symbol: tuple, timefr: str, klines: dict, number: int):
-        nonlocal success
-        res = load_klines(
-            self,
-            symbol=symbol,
-            timefr=timefr,
-            klines=klines,
-        )
-        if not res:
-            return
 
-        success[number] = "success"
+def submit_klines(self: Markets, symbol: tuple, timefrs: list) -> Job:
+    """
+    Places the loading of the symbol's timeframes in the download queue.
+    If loading fails, the job is repeated by the scheduler. The job is
+    dropped if the exchange is no longer in use.
+    """
 
-    threads = []
+    def load() -> Union[str, None]:
+        if self.name not in var.market_list:
+            return "cancel"
+        if load_klines(self, symbol=symbol, timefrs=timefrs, klines=self.klines):
+            return "success"
 
-    for symbol, timeframes in self.klines.items():
-        for timefr in timeframes.keys():
-            success.append(None)
-            t = threading.Thread(
-                target=get_in_thread,
-                args=(symbol, timefr, self.klines, len(success) - 1),
-            )
+    return kline_scheduler.submit(
+        function=load,
+        priority=kline_priority(self, symbol=symbol, timefrs=timefrs),
+        name=self.name + " " + str(symbol) + " " + ", ".join(timefrs) + " kline",
+    )
 
-            threads.append(t)
-            t.start()
-    [thread.join() for thread in threads]
-    for s in success:
-        if not s:
+
+def init_market_klines(
+    self: Markets,
+) -> Union[dict, None]:
+    """
+    Downloads kline data from the endpoint of the specific exchange. The
+    timeframes of each symbol are loaded together from one base series.
+    """
+    jobs = [
+        submit_klines(self, symbol=symbol, timefrs=list(timeframes.keys()))
+        for symbol, timeframes in self.klines.items()
+    ]
+    for result in kline_scheduler.wait(jobs):
+        if result != "success":
             return
 
     return "success"
@@ -3112,74 +3373,19 @@ def init_bot_klines(bot_name: str) -> None:
     Downloads kline data from exchange endpoints for a given bot. This
     happens when a specific bot's strategy.py file is updated.
     """
-    success = []
-
-    def get_in_thread(
-        ws: Markets, symbol: tuple, timefr: str, klines: dict, number: int
-    ):
-        nonlocal success
-        res = load_klines(
-            ws,
-            symbol=symbol,
-            timefr=timefr,
-            klines=klines,
-        )
-        if not res:
-            return
-        success[number] = "success"
-
-    kline_to_download = list()
+    jobs = list()
     for market in var.market_list:
         ws = Markets[market]
         for symbol, timeframes in ws.klines.items():
+            timefrs = list()
             for timefr, value in timeframes.items():
                 if bot_name in value["robots"]:
                     if not value["data"]:
-                        itm = {
-                            "symbol": symbol,
-                            "bot_name": bot_name,
-                            "timefr": timefr,
-                            "market": market,
-                        }
-                        kline_to_download.append(itm)
-        """for item in ws.klin_set:
-            if item[1] == bot_name:
-                symbol = (item[0], market)
-                if not ws.klines[symbol][item[2]]["data"]:
-                    itm = {
-                        "symbol": item[0],
-                        "bot_name": item[1],
-                        "timefr": item[2],
-                        "market": market,
-                    }
-                    kline_to_download.append(itm)"""
-    while kline_to_download:
-        success = []
-        threads = []
-        for num, kline in enumerate(kline_to_download):
-            success.append(None)
-            ws = Markets[kline["market"]]
-            t = threading.Thread(
-                target=get_in_thread,
-                args=(ws, kline["symbol"], kline["timefr"], ws.klines, num),
-            )
-            threads.append(t)
-            t.start()
-        [thread.join() for thread in threads]
-        for num in range(len(success) - 1, -1, -1):
-            if success[num]:
-                kline_to_download.pop(num)
-            else:
-                message = (
-                    kline_to_download[num]["market"]
-                    + " "
-                    + kline_to_download[num]["symbol"]
-                    + " "
-                    + kline_to_download[num]["timefr"]
-                    + " kline is not loaded."
-                )
-                var.logger.error(message)
-                time.sleep(2)
+                        timefrs.append(timefr)
+            if timefrs:
+                jobs.append(submit_klines(ws, symbol=symbol, timefrs=timefrs))
+    kline_scheduler.wait(jobs)
+
 
 def check_klines_update(bot_name: str) -> None:
     """
@@ -3215,34 +3421,17 @@ def remove_bot_klines(bot_name: str) -> None:
 
 def setup_klines():
     """
-    Initializing kline data on boot or reboot <f3>
+    Initializing kline data on boot or reboot <f3>. The jobs of all
+    exchanges are placed in the download queue at once.
     """
-
-    def get_klines(ws: Markets, success):
-        if init_market_klines(ws):
-            success[ws.name] = "success"
-
-    market_list = var.market_list.copy()
-    while market_list:
-        threads = []
-        success = {market: None for market in market_list}
-        for market in market_list:
-            ws = Markets[market]
-            success[market] = None
-            t = threading.Thread(
-                target=get_klines,
-                args=(ws, success),
+    jobs = list()
+    for market in var.market_list:
+        ws = Markets[market]
+        for symbol, timeframes in ws.klines.items():
+            jobs.append(
+                submit_klines(ws, symbol=symbol, timefrs=list(timeframes.keys()))
             )
-            threads.append(t)
-            t.start()
-        [thread.join() for thread in threads]
-        for market, value in success.items():
-            if not value:
-                var.logger.error(market + ": Klines are not loaded.")
-                time.sleep(2)
-            else:
-                indx = market_list.index(market)
-                market_list.pop(indx)
+    kline_scheduler.wait(jobs)
 
 
 def _put_message(market: str, message: str, warning=None, logger=True) -> None:
@@ -12,6 +12,11 @@ from dotenv import dotenv_values, set_key
 
 from botinit.variables import Variables as robo
 from common.data import BotData, Bots, Instrument
+from common.dbpool import lock_sqlite, read_pool
+from common.dbwriter import db_writer
+from common.execids import exec_ids
+from common.positions import ENTRY_TABLE, SQL_SAVE_ENTRY
+from common.scheduler import SerialExecutor, kline_timer
 from common.variables import Variables as var
 from display.messages import ErrorMessage, Message
 
@@ -254,14 +259,20 @@ def display_exception(exception, display=True) -> str:
     return formated
 
 
-def select_database(query: str) -> list:
+def select_database(query: str, flush: bool = False) -> list:
+    """
+    Runs the select query on a connection of the read pool, so that it does
+    not wait for the writes. The rows still queued in the database writer
+    are not seen, unless flush is True, which commits them first. Used where
+    the result must include the latest trades.
+    """
+    if flush:
+        db_writer.flush()
     err_locked = 0
     while True:
+        connection = read_pool.acquire()
         try:
-            var.sql_lock.acquire(True)
-            var.cursor_sqlite.execute(query)
-            orig = var.cursor_sqlite.fetchall()
-            var.sql_lock.release()
+            orig = connection.execute(query).fetchall()
             data = []
             if orig:
                 data = list(map(lambda x: dict(zip(orig[0].keys(), x)), orig))
@@ -270,7 +281,6 @@ def select_database(query: str) -> list:
             if "database is locked" not in str(e):
                 print("_____query:", query)
                 var.logger.error("Sqlite Error: " + str(e) + ")")
-                var.sql_lock.release()
                 break
             else:
                 err_locked += 1
@@ -279,25 +289,35 @@ def select_database(query: str) -> list:
                     + str(err_locked)
                     + ")"
                 )
-                var.sql_lock.release()
+        finally:
+            read_pool.release(connection)
 
 
 def insert_database(values: list, table: str) -> None:
+    """
+    Inserts a row into the table. Trades and funding are queued to the
+    database writer thread and committed in batches, so the function does
+    not wait for the disk and returns None. For other tables, an error
+    message is returned on failure.
+    """
+    if table == var.database_table:
+        exec_ids.add(key=(table, values[7], values[18]), execID=values[0])
+        db_writer.put(
+            query="insert into "
+            + var.database_table
+            + " (EXECID,EMI,REFER,CURRENCY,SYMBOL,"
+            + "TICKER,CATEGORY,MARKET,SIDE,QTY,QTY_REST,PRICE,"
+            + "THEOR_PRICE,TRADE_PRICE,SUMREAL,COMMISS,CLORDID,TTIME,"
+            + "ACCOUNT) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+            values=values,
+        )
+        return None
+    db_writer.flush()
     err_locked = 0
     while True:
         try:
-            var.sql_lock.acquire(True)
-            if table == var.database_table:
-                var.cursor_sqlite.execute(
-                    "insert into "
-                    + var.database_table
-                    + " (EXECID,EMI,REFER,CURRENCY,SYMBOL,"
-                    + "TICKER,CATEGORY,MARKET,SIDE,QTY,QTY_REST,PRICE,"
-                    + "THEOR_PRICE,TRADE_PRICE,SUMREAL,COMMISS,CLORDID,TTIME,"
-                    + "ACCOUNT) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
-                    values,
-                )
-            elif table == "robots":
+            lock_sqlite()
+            if table == "robots":
                 var.cursor_sqlite.execute(
                     "insert into robots (EMI,STATE,TIMEFR) VALUES (?,?,?)",
                     values,
@@ -334,11 +354,44 @@ def insert_database(values: list, table: str) -> None:
                 var.sql_lock.release()
 
 
+def execution_exists(market: str, account: int, execID: str) -> bool:
+    """
+    Checks whether the execution is already in the trades table. The
+    execIDs of the market account are loaded into memory on the first call,
+    after that the database is queried only to confirm a match.
+    """
+    key = (var.database_table, market, account)
+    if not exec_ids.is_loaded(key):
+        with exec_ids.lock:
+            if not exec_ids.is_loaded(key):
+                db_writer.flush()
+                connection = read_pool.acquire()
+                try:
+                    cursor = connection.execute(
+                        "select EXECID from %s where MARKET=? and ACCOUNT=?"
+                        % var.database_table,
+                        (market, account),
+                    )
+                    exec_ids.load(key, execIDs=(row[0] for row in cursor))
+                finally:
+                    read_pool.release(connection)
+    if not exec_ids.may_contain(key, execID=execID):
+        return False
+    data = select_database(
+        "select EXECID from %s where EXECID='%s' and account=%s and market='%s'"
+        % (var.database_table, execID, account, market),
+        flush=True,
+    )
+
+    return bool(data)
+
+
 def update_database(query: list) -> Union[str, None]:
+    db_writer.flush()
     err_locked = 0
     while True:
         try:
-            var.sql_lock.acquire(True)
+            lock_sqlite()
             var.cursor_sqlite.execute(query)
             var.connect_sqlite.commit()
             var.sql_lock.release()
@@ -373,21 +426,20 @@ def set_clOrdID(emi: str = False) -> str:
 def fill_order(
     emi: str, clOrdID: str, category: str, value: dict
 ) -> Union[float, None]:
-    if emi not in var.orders:
-        var.orders[emi] = OrderedDict()
-    if clOrdID not in var.orders[emi]:
-        var.orders[emi][clOrdID] = dict()
-        var.orders[emi][clOrdID]["emi"] = emi
-        var.orders[emi][clOrdID]["leavesQty"] = value["leavesQty"]
-        var.orders[emi][clOrdID]["transactTime"] = value["transactTime"]
-        var.orders[emi][clOrdID]["price"] = value["price"]
-        var.orders[emi][clOrdID]["symbol"] = value["symbol"]
-        var.orders[emi][clOrdID]["category"] = category
-        var.orders[emi][clOrdID]["market"] = value["symbol"][1]
-        var.orders[emi][clOrdID]["side"] = value["side"]
-        var.orders[emi][clOrdID]["orderID"] = value["orderID"]
-        var.orders[emi][clOrdID]["clOrdID"] = clOrdID
-        var.orders[emi][clOrdID]["orderQty"] = value["orderQty"]
+    order = {
+        "emi": emi,
+        "leavesQty": value["leavesQty"],
+        "transactTime": value["transactTime"],
+        "price": value["price"],
+        "symbol": value["symbol"],
+        "category": category,
+        "market": value["symbol"][1],
+        "side": value["side"],
+        "orderID": value["orderID"],
+        "clOrdID": clOrdID,
+        "orderQty": value["orderQty"],
+    }
+    if var.orders.add(order):
         return value["orderQty"]
     else:
         return None
@@ -405,7 +457,13 @@ def fill_bot_position(
     ltime=None,
     bot_position_entry=None,
     entry_sumreal=None,
+    totals=None,
 ) -> None:
+    """
+    Adds the bot's position on the instrument. Volume, sumreal and commission
+    are then taken from the bot's records in the database, unless already
+    selected by the caller and passed in ``totals``.
+    """
     bot = Bots[bot_name]
     if symbol not in bot.bot_positions:
         bot.bot_positions[symbol] = {
@@ -428,6 +486,7 @@ def fill_bot_position(
             "currency": instrument.settlCurrency[0],
             "limits": instrument.minOrderQty,
             "max_position": 0,
+            "checkpoint": robo.bots_loaded,
         }
         if instrument.category == "spot":
             bot.bot_positions[symbol]["sum_pnl"] = var.DASH
@@ -435,7 +494,9 @@ def fill_bot_position(
 
     # Checks if this bot has any records in the database on this instrument.
 
-    if not var.backtest:
+    if totals is not None:
+        data = totals
+    elif not var.backtest:
         qwr = (
             "select MARKET, SYMBOL, sum(abs(QTY)) as SUM_QTY, "
             + "sum(SUMREAL) as SUM_SUMREAL, sum(COMMISS) as "
@@ -451,11 +512,45 @@ def fill_bot_position(
             + str(user_id)
             + " and SIDE <> 'Fund' order by ID desc) T;"
         )
-        data = select_database(qwr)[0]
-        if data and data["SUM_QTY"]:
-            bot.bot_positions[symbol]["volume"] = float(data["SUM_QTY"])
-            bot.bot_positions[symbol]["sumreal"] = float(data["SUM_SUMREAL"])
-            bot.bot_positions[symbol]["commiss"] = float(data["SUM_COMMISS"])
+        data = select_database(qwr, flush=True)[0]
+    else:
+        data = None
+    if data and data["SUM_QTY"]:
+        bot.bot_positions[symbol]["volume"] = float(data["SUM_QTY"])
+        bot.bot_positions[symbol]["sumreal"] = float(data["SUM_SUMREAL"])
+        bot.bot_positions[symbol]["commiss"] = float(data["SUM_COMMISS"])
+
+
+def save_history_time(market: str, ttime: Union[datetime, str]) -> None:
+    """
+    Records the time of the last loaded trading history row of the market.
+    Queued after the rows of the history page, so it is never committed
+    before them.
+    """
+    db_writer.put(
+        query="insert or replace into history (TRADES,MARKET,TTIME) VALUES (?,?,?)",
+        values=[var.database_table, market, str(ttime)[:19]],
+    )
+
+
+def save_entry(
+    emi: str, symbol: tuple, account: int, position: float, entry: float
+) -> None:
+    """
+    Checkpoints the bot's position and entry price on the instrument, so
+    that only later trades are replayed at startup. Queued after the row of
+    the last trade, whose ID the checkpoint refers to.
+    """
+    if var.backtest:
+        return
+    db_writer.put(
+        query=SQL_SAVE_ENTRY.format(
+            ENTRY=ENTRY_TABLE.format(TABLE=var.database_table),
+            TABLE=var.database_table,
+        ),
+        values=[emi, symbol[1], symbol[0], account, position, entry or 0]
+        + [emi, symbol[1], symbol[0]],
+    )
 
 
 def timeframe_seconds(timefr: str) -> int:
@@ -466,7 +561,7 @@ def timeframe_seconds(timefr: str) -> int:
     timefr_minutes = var.timeframe_human_format[timefr]
 
     if timefr_minutes:
-        return timefr_minutes * 60
+        return round(timefr_minutes * 60)
     else:
         return timefr_minutes
 
@@ -480,15 +575,6 @@ def bot_error(bot: BotData) -> str:
     return error
 
 
-def count_orders():
-    """Temporarily created function for debugging"""
-    count = 0
-    for values in var.orders.values():
-        for _ in values.keys():
-            count += 1
-    # print("___________________orders", count)
-
-
 def noll(val: str, length: int) -> str:
     r = ""
     for _ in range(length - len(val)):
@@ -949,12 +1035,26 @@ def init_bot(
     bot.backtest_data = dict()
     bot.iter = 0
     bot.bot_pnl = dict()
+    if bot.executor is None:
+        bot.executor = SerialExecutor(name=name)
     if timefr != "tick":
         bot.time = align_time(
             datetime.now(tz=timezone.utc), var.timeframe_human_format[timefr]
         )
     else:
         bot.time = datetime.now(tz=timezone.utc)
+    schedule_bot(bot)
+
+
+def schedule_bot(bot: BotData) -> None:
+    """
+    Schedules the next run of the bot at the end of its timeframe period.
+    Bots working on tick data are run by the order book updates.
+    """
+    if bot.timefr != "tick":
+        kline_timer.schedule(("bot", bot.name), bot.time.timestamp() + bot.timefr_sec)
+    else:
+        kline_timer.cancel(("bot", bot.name))
 
 
 def get_clOrdID(row: dict) -> tuple:
@@ -1045,13 +1145,15 @@ def calculate_entry_pnl() -> float:
     pass
 
 
-def align_time(utcnow: datetime, timefr_minutes: int) -> datetime:
+def align_time(utcnow: datetime, timefr_minutes: float) -> datetime:
     """
-    Aligns time according to timeframes for kline and bots.
+    Aligns time according to timeframes for kline and bots. Periods are
+    counted from the beginning of the day (utc), timeframes shorter than a
+    minute are aligned to seconds.
     """
     if not timefr_minutes:
         return utcnow
-    next_minute = int(utcnow.minute / timefr_minutes) * timefr_minutes
-    next_hour = int((utcnow.hour * 60) // timefr_minutes * timefr_minutes / 60)
+    period = round(timefr_minutes * 60)
+    tm = int(utcnow.timestamp()) // period * period
 
-    return utcnow.replace(hour=next_hour, minute=next_minute, second=0, microsecond=0)
+    return datetime.fromtimestamp(tm, tz=timezone.utc)
@@ -1,9 +1,11 @@
 import inspect
 import platform
-import time
 from collections import OrderedDict
+from concurrent.futures import CancelledError, Future
+from concurrent.futures import TimeoutError as FuturesTimeout
 from datetime import datetime, timezone
-from typing import Callable, Union
+from functools import partial
+from typing import Any, Callable, Union
 
 import functions
 import services as service
@@ -26,6 +28,18 @@ def name(stack) -> str:
     return bot_name
 
 
+def _completed(result: Any) -> Future:
+    """
+    Returns a Future that already has the result. Used in backtesting, where
+    operations are completed at once, so that the future parameter gives
+    the same return types as in live trading.
+    """
+    fut = Future()
+    fut.set_result(result)
+
+    return fut
+
+
 class Bot(BotData):
     def __init__(self) -> None:
         bot_name = name(inspect.stack())
@@ -33,30 +47,44 @@ class Bot(BotData):
         self.__dict__ = bot.__dict__
         self.logger = var.logger
 
-    def wait(self, count: int, operation: str, market: str) -> Union[str, None]:
+    def execute(
+        self, function: Callable, operation: str, market: str, future: bool = False
+    ) -> Union[Future, Any]:
         """
-        Waiting for the previous operation to complete on a specific bot.
-        Sometimes we send an order to the exchange, and the previous one is
-        still being processed. Thus, the current order depends on the result
-        of the previous operations. Since each new operation is performed in
-        a separate thread, this thread will be suspended until the previous
-        operation is completed.
+        Queues a trading operation to the bot's executor. The operations of
+        a bot are sent to the exchanges one after another in the order they
+        were called, since the current order may depend on the result of the
+        previous operations.
 
         Parameters:
         -----------
-        count: int
-            The serial number of each bot's operation.
+        function: Callable
+            Operation, called without arguments.
         operation: str
             Trading operation such as Buy, Sell, Remove, Replace.
         market: str
             Name of the exchange.
+        future: bool
+            If True, the Future of the operation is returned at once.
+            Otherwise, the result of the operation is returned when it is
+            completed.
         """
-        self.block.append(count)
-        tm = time.time()
+        try:
+            fut = self.executor.submit(function)
+        except RuntimeError:
+            # The executor is shut down, the bot has been deleted.
+            self._executor_stopped(operation=operation)
+            return
+        if future:
+            return fut
         error_count = 0
-        while self.block[0] != count:
-            time.sleep(0.05)
-            if time.time() - tm > 10:
+        while True:
+            try:
+                return fut.result(timeout=10)
+            except CancelledError:
+                self._executor_stopped(operation=operation)
+                return
+            except FuturesTimeout:
                 error_log_message = (
                     "The previous operation for the bot "
                     + self.name
@@ -75,7 +103,6 @@ class Bot(BotData):
                         "bot_log": True,
                     }
                 )
-                tm = time.time()
                 error_count += 1
                 if error_count > 5:
                     var.queue_info.put(
@@ -87,14 +114,26 @@ class Bot(BotData):
                         }
                     )
                     self.logger.error(error_log_message)
-                    exit_message = (
-                        "The current "
-                        + operation
-                        + " operation for the bot "
-                        + self.name
-                        + " was canceled because the previous operation did"
-                        + " not completed."
-                    )
+                    if fut.cancel():
+                        exit_message = (
+                            "The current "
+                            + operation
+                            + " operation for the bot "
+                            + self.name
+                            + " was canceled because the previous operation did"
+                            + " not completed."
+                        )
+                    else:
+                        # The operation is already running and cannot be
+                        # canceled, the bot does not wait for it any longer.
+                        exit_message = (
+                            "The current "
+                            + operation
+                            + " operation for the bot "
+                            + self.name
+                            + " did not complete in 60 seconds, its result is"
+                            + " ignored."
+                        )
                     var.queue_info.put(
                         {
                             "market": "",
@@ -107,9 +146,32 @@ class Bot(BotData):
                     self.logger.error(exit_message)
                     return
 
-        return "success"
+    def _executor_stopped(self, operation: str) -> None:
+        """
+        Reports an operation that was not completed because the bot's
+        executor was shut down when the bot was deleted.
+        """
+        message = (
+            "The "
+            + operation
+            + " operation for the bot "
+            + self.name
+            + " was canceled because the bot has been stopped."
+        )
+        var.queue_info.put(
+            {
+                "market": "",
+                "message": message,
+                "time": datetime.now(tz=timezone.utc),
+                "warning": "error",
+                "emi": self.name,
+            }
+        )
+        self.logger.error(message)
 
-    def remove(self, clOrdID: str = "", symbol: str = "") -> None:
+    def remove(
+        self, clOrdID: str = "", symbol: str = "", future: bool = False
+    ) -> Union[list, None]:
         """
         Removes the open order by its clOrdID or symbol.
 
@@ -122,33 +184,41 @@ class Bot(BotData):
         symbol: str
             Example: "ETH-PERPETUAL". If this parameter is omitted,
             all orders for this bot will be deleted.
+        future: bool
+            Optional. If True, the removals are queued and the list of their
+            Futures is returned without waiting. By default False.
         """
         if var.backtest:
             self._backtest_remove(clOrdID=clOrdID)
+            if future:
+                return [_completed(None)]
             return
 
         if self.state == "Active" and disp.f9 == "ON":
-            ord = var.orders[self.name]
             lst = []
             if not clOrdID:
-                for clOrdID in ord:
+                for order in var.orders.select(emi=self.name):
                     if symbol:
-                        smb = (symbol, ord[clOrdID]["market"])
-                        if smb == ord[clOrdID]["symbol"]:
-                            lst.append(clOrdID)
+                        smb = (symbol, order["market"])
+                        if smb == order["symbol"]:
+                            lst.append(order["clOrdID"])
                     else:
-                        lst.append(clOrdID)
+                        lst.append(order["clOrdID"])
             else:
                 lst.append(clOrdID)
+            futures = list()
             for clOrdID in lst:
-                if clOrdID in ord:
-                    order = ord[clOrdID]
+                order = var.orders.get(emi=self.name, clOrdID=clOrdID)
+                if order:
                     ws = Markets[order["market"]]
-                    self.count += 1
-                    r = self.wait(self.count, "Remove", order["market"])
-                    if r == "success":
-                        WS.remove_order(ws, order=ord[clOrdID])
-                    self.block.pop(0)
+                    futures.append(
+                        self.execute(
+                            partial(WS.remove_order, ws, order=order),
+                            operation="Remove",
+                            market=order["market"],
+                            future=future,
+                        )
+                    )
                 else:
                     message = "Removing. Order with clOrdID=" + clOrdID + " not found."
                     var.queue_info.put(
@@ -161,8 +231,12 @@ class Bot(BotData):
                             "bot_log": True,
                         }
                     )
+            if future:
+                return futures
 
-    def replace(self, clOrdID: str, price: float) -> Union[str, None]:
+    def replace(
+        self, clOrdID: str, price: float, future: bool = False
+    ) -> Union[str, Future, None]:
         """
         Moves an open order to a new price using its clOrdID.
 
@@ -172,24 +246,28 @@ class Bot(BotData):
             Order ID. Order ID. Example: "1348642035.Super"
         price: float
             New price to reset order to.
+        future: bool
+            Optional. If True, the operation is queued and its Future is
+            returned without waiting. By default False.
 
         Returns
         -------
-        str | None
-            On success, clOrdID is returned, otherwise an error type.
+        str | Future | None
+            On success, clOrdID is returned, otherwise an error type. If
+            future is True, the Future with this result is returned.
         """
         if var.backtest:
             self._backtest_replace(clOrdID=clOrdID, price=price)
+            if future:
+                return _completed(clOrdID)
             return clOrdID
 
         if self.state == "Active" and disp.f9 == "ON":
-            ord = var.orders[self.name]
-            if clOrdID in ord:
-                order = ord[clOrdID]
+            order = var.orders.get(emi=self.name, clOrdID=clOrdID)
+            if order:
                 ws = Markets[order["market"]]
-                self.count += 1
-                r = self.wait(self.count, "Replace", order["market"])
-                if r == "success":
+
+                def replace() -> Union[str, None]:
                     res = WS.replace_limit(
                         ws,
                         leavesQty=order["leavesQty"],
@@ -201,7 +279,10 @@ class Bot(BotData):
                     )
                     if isinstance(res, dict):
                         return clOrdID
-                self.block.pop(0)
+
+                return self.execute(
+                    replace, operation="Replace", market=order["market"], future=future
+                )
             else:
                 message = "Replacing. Order with clOrdID=" + clOrdID + " not found."
                 var.queue_info.put(
@@ -215,6 +296,130 @@ class Bot(BotData):
                     }
                 )
 
+    def remove_many(self, clOrdIDs: list, future: bool = False) -> Union[Future, None]:
+        """
+        Removes several open orders by their clOrdIDs. The orders are
+        grouped by exchange and cancelled with batch requests where the
+        exchange supports them, otherwise with parallel single requests.
+
+        Parameters
+        ----------
+        clOrdIDs: list
+            Order IDs. Example: ["1348642035.Super", "1348642036.Super"]
+        future: bool
+            Optional. If True, the operation is queued and its Future is
+            returned without waiting. By default False.
+        """
+        if var.backtest:
+            for clOrdID in clOrdIDs:
+                self._backtest_remove(clOrdID=clOrdID)
+            if future:
+                return _completed(None)
+            return
+
+        if self.state == "Active" and disp.f9 == "ON":
+            markets = dict()
+            for clOrdID in clOrdIDs:
+                order = var.orders.get(emi=self.name, clOrdID=clOrdID)
+                if order:
+                    markets.setdefault(order["market"], list()).append(order)
+                else:
+                    message = "Removing. Order with clOrdID=" + clOrdID + " not found."
+                    var.queue_info.put(
+                        {
+                            "market": "",
+                            "message": message,
+                            "time": datetime.now(tz=timezone.utc),
+                            "warning": "warning",
+                            "emi": self.name,
+                            "bot_log": True,
+                        }
+                    )
+            if markets:
+
+                def remove() -> None:
+                    for market, orders in markets.items():
+                        WS.remove_many(Markets[market], orders=orders)
+
+                return self.execute(
+                    remove,
+                    operation="Remove",
+                    market=", ".join(markets),
+                    future=future,
+                )
+
+    def replace_many(self, prices: dict, future: bool = False) -> Union[list, Future]:
+        """
+        Moves several open orders to new prices. The orders are grouped by
+        exchange and moved with batch requests where the exchange supports
+        them, otherwise with parallel single requests.
+
+        Parameters
+        ----------
+        prices: dict
+            New prices by clOrdID. Example: {"1348642035.Super": 61200.5}
+        future: bool
+            Optional. If True, the operation is queued and its Future is
+            returned without waiting. By default False.
+
+        Returns
+        -------
+        list | Future
+            clOrdIDs of the successfully moved orders. If future is True, the
+            Future with this result is returned.
+        """
+        if var.backtest:
+            for clOrdID, price in prices.items():
+                self._backtest_replace(clOrdID=clOrdID, price=price)
+            if future:
+                return _completed(list(prices))
+            return list(prices)
+
+        if self.state == "Active" and disp.f9 == "ON":
+            markets = dict()
+            for clOrdID, price in prices.items():
+                order = var.orders.get(emi=self.name, clOrdID=clOrdID)
+                if order:
+                    markets.setdefault(order["market"], list()).append(
+                        {
+                            "leavesQty": order["leavesQty"],
+                            "price": price,
+                            "orderID": order["orderID"],
+                            "symbol": order["symbol"],
+                            "orderQty": order["orderQty"],
+                            "clOrdID": clOrdID,
+                        }
+                    )
+                else:
+                    message = "Replacing. Order with clOrdID=" + clOrdID + " not found."
+                    var.queue_info.put(
+                        {
+                            "market": "",
+                            "message": message,
+                            "time": datetime.now(tz=timezone.utc),
+                            "warning": "warning",
+                            "emi": self.name,
+                            "bot_log": True,
+                        }
+                    )
+
+            def replace() -> list:
+                replaced = list()
+                for market, orders in markets.items():
+                    results = WS.replace_many(Markets[market], orders=orders)
+                    for order, res in zip(orders, results):
+                        if isinstance(res, dict):
+                            replaced.append(order["clOrdID"])
+
+                return replaced
+
+            return self.execute(
+                replace,
+                operation="Replace",
+                market=", ".join(markets),
+                future=future,
+            )
+
     def orders(
         self, side: str = "", descend=False, in_list=True, symbol: str = ""
     ) -> Union[OrderedDict, list]:
@@ -241,41 +446,20 @@ class Bot(BotData):
             Orders are sorted by ``transactTime`` in the order specified in
             the descend parameter. The OrderedDict key is the clOrdID value.
         """
-        ord = var.orders[self.name].values()
+        filtered = list()
+        for value in var.orders.select(emi=self.name, side=side, descend=descend):
+            if not symbol or (symbol, value["market"]) == value["symbol"]:
+                filtered.append(value)
         if not in_list:
-            filtered = OrderedDict()
-            if descend:
-                ord = sorted(ord, key=lambda x: x["transactTime"], reverse=True)
-            for value in ord:
-                smb = (symbol, value["market"])
-                if side:
-                    if value["side"] == side:
-                        if not symbol or smb == value["symbol"]:
-                            filtered[value["clOrdID"]] = value
-                else:
-                    if not symbol or smb == value["symbol"]:
-                        filtered[value["clOrdID"]] = value
-        else:
-            filtered = list()
-            if descend:
-                ord = sorted(ord, key=lambda x: x["transactTime"], reverse=True)
-            for value in ord:
-                smb = (symbol, value["market"])
-                if side:
-                    if value["side"] == side:
-                        if not symbol or smb == value["symbol"]:
-                            filtered.append(value)
-                else:
-                    if not symbol or smb == value["symbol"]:
-                        filtered.append(value)
+            filtered = OrderedDict((value["clOrdID"], value) for value in filtered)
 
         return filtered
 
     def _backtest_remove(self, clOrdID: str) -> None:
-        del var.orders[self.name][clOrdID]
+        var.orders.remove(emi=self.name, clOrdID=clOrdID)
 
     def _backtest_replace(self, clOrdID: str, price: float) -> None:
-        var.orders[self.name][clOrdID]["price"] = price
+        var.orders.update(emi=self.name, clOrdID=clOrdID, price=price)
 
 
 class Tool(Instrument):
@@ -302,7 +486,42 @@ class Tool(Instrument):
         bot: BotData,
         cancel: bool,
         ordType: str,
-    ):
+        future: bool,
+    ) -> Union[str, Future, None]:
+        """
+        Queues the order to the bot's executor, see Bot.execute().
+        """
+        return Bot.execute(
+            bot,
+            partial(
+                self._send,
+                price=price,
+                qty=qty,
+                side=side,
+                move=move,
+                bot=bot,
+                cancel=cancel,
+                ordType=ordType,
+            ),
+            operation=side,
+            market=self.market,
+            future=future,
+        )
+
+    def _send(
+        self,
+        price: float,
+        qty: float,
+        side: str,
+        move: bool,
+        bot: BotData,
+        cancel: bool,
+        ordType: str,
+    ) -> Union[str, None]:
+        """
+        Places a new order or moves the latest one. Runs in the bot's
+        executor.
+        """
         res = None
         if price:
             price = service.ticksize_rounding(price=price, ticksize=self.tickSize)
@@ -310,49 +529,39 @@ class Tool(Instrument):
             if qty != 0:
                 clOrdID = None
                 if move is True:
-                    clOrdID = self._get_latest_order(
-                        orders=var.orders[bot.name], side=side
-                    )
+                    clOrdID = self._get_latest_order(emi=bot.name, side=side)
                 ws = Markets[self.market]
                 if clOrdID is None:
                     clOrdID = service.set_clOrdID(emi=bot.name)
                     if side == "Sell":
                         qty = -qty
-                    bot.count += 1
-                    r = Bot.wait(bot, bot.count, side, self.market)
-                    if r == "success":
-                        res = WS.place_order(
+                    res = WS.place_order(
+                        ws,
+                        quantity=qty,
+                        price=price,
+                        clOrdID=clOrdID,
+                        symbol=self.symbol_tuple,
+                        ordType=ordType,
+                    )
+                else:
+                    order = var.orders.get(emi=bot.name, clOrdID=clOrdID)
+                    if order["price"] != price:
+                        res = WS.replace_limit(
                             ws,
-                            quantity=qty,
+                            leavesQty=order["leavesQty"],
                             price=price,
+                            orderID=order["orderID"],
+                            symbol=order["symbol"],
+                            orderQty=order["orderQty"],
                             clOrdID=clOrdID,
-                            symbol=self.symbol_tuple,
-                            ordType=ordType,
                         )
-                    bot.block.pop(0)
-                else:
-                    order = var.orders[bot.name][clOrdID]
-                    if order["price"] != price:
-                        bot.count += 1
-                        r = Bot.wait(bot, bot.count, "Replace", self.market)
-                        if r == "success":
-                            res = WS.replace_limit(
-                                ws,
-                                leavesQty=order["leavesQty"],
-                                price=price,
-                                orderID=order["orderID"],
-                                symbol=order["symbol"],
-                                orderQty=order["orderQty"],
-                                clOrdID=clOrdID,
-                            )
-                        bot.block.pop(0)
         else:
             self._empty_orderbook(qty=qty, price=price, bot_name=bot.name)
         if cancel:
             if side == "Sell":
-                self._remove_orders(orders=var.orders[bot.name], side="Buy")
+                self._remove_orders(emi=bot.name, side="Buy")
             elif side == "Buy":
-                self._remove_orders(orders=var.orders[bot.name], side="Sell")
+                self._remove_orders(emi=bot.name, side="Sell")
 
         if isinstance(res, dict):
             return clOrdID
@@ -365,7 +574,8 @@ class Tool(Instrument):
         move: bool = False,
         cancel: bool = False,
         ordType: str = "Limit",
-    ) -> Union[str, None]:
+        future: bool = False,
+    ) -> Union[str, Future, None]:
         """
         Sets a sell order.
 
@@ -389,10 +599,14 @@ class Tool(Instrument):
             this bot. By default False.
         ordType: str
             Optional. Order type. Valid options: Market, Limit. By default Limit.
+        future: bool
+            Optional. If True, the order is queued and its Future is returned
+            without waiting. The result of the Future is the same as the
+            return value below. By default False.
 
         Returns
         -------
-        str | None
+        str | Future | None
             If successful, the clOrdID of this order is returned, otherwise
             None.
         """
@@ -400,9 +614,12 @@ class Tool(Instrument):
             qty = self.minOrderQty
 
         if var.backtest:
-            return self._backtest_place(
+            clOrdID = self._backtest_place(
                 bot=bot, qty=qty, side="Sell", price=price, move=move, cancel=cancel
             )
+            if future:
+                return _completed(clOrdID)
+            return clOrdID
         if bot.state == "Active" and disp.f9 == "ON":
             if not price:
                 try:
@@ -419,6 +636,7 @@ class Tool(Instrument):
                 bot=bot,
                 cancel=cancel,
                 ordType=ordType,
+                future=future,
             )
 
     def buy(
@@ -429,7 +647,8 @@ class Tool(Instrument):
         move: bool = False,
         cancel: bool = False,
         ordType: str = "Limit",
-    ) -> Union[str, None]:
+        future: bool = False,
+    ) -> Union[str, Future, None]:
         """
         Sets a buy order.
 
@@ -453,10 +672,14 @@ class Tool(Instrument):
             this bot. By default False.
         ordType: str
             Optional. Order type. Valid options: Market, Limit. By default Limit.
+        future: bool
+            Optional. If True, the order is queued and its Future is returned
+            without waiting. The result of the Future is the same as the
+            return value below. By default False.
 
         Returns
         -------
-        str | None
+        str | Future | None
             If successful, the clOrdID of this order is returned, otherwise
             None.
         """
@@ -465,7 +688,7 @@ class Tool(Instrument):
             qty = self.minOrderQty
 
         if var.backtest:
-            return self._backtest_place(
+            clOrdID = self._backtest_place(
                 bot=bot,
                 qty=qty,
                 side="Buy",
@@ -474,6 +697,9 @@ class Tool(Instrument):
                 cancel=cancel,
                 ordType=ordType,
             )
+            if future:
+                return _completed(clOrdID)
+            return clOrdID
         if bot.state == "Active" and disp.f9 == "ON":
             if not price:
                 try:
@@ -490,8 +716,105 @@ class Tool(Instrument):
                 bot=bot,
                 cancel=cancel,
                 ordType=ordType,
+                future=future,
+            )
+
+    def place_many(
+        self,
+        bot: Bot,
+        orders: list,
+        ordType: str = "Limit",
+        future: bool = False,
+    ) -> Union[list, Future, None]:
+        """
+        Sets several orders at once, e.g. the levels of a grid. The orders
+        are sent with batch requests where the exchange supports them,
+        otherwise with parallel single requests.
+
+        Parameters
+        ----------
+        bot: Bot
+            An instance of a bot in the Bot class.
+        orders: list
+            Each element is a dict with the keys "side" (Buy or Sell), and
+            optionally "qty" and "price", which are taken as in buy() and
+            sell() if omitted.
+        ordType: str
+            Optional. Order type. Valid options: Market, Limit. By default Limit.
+        future: bool
+            Optional. If True, the orders are queued and the Future is
+            returned without waiting. By default False.
+
+        Returns
+        -------
+        list | Future | None
+            clOrdIDs in the same order as the orders, None for each order
+            that was not placed. If future is True, the Future with this
+            result is returned.
+        """
+        if var.backtest:
+            clOrdIDs = [
+                self._backtest_place(
+                    bot=bot,
+                    qty=order.get("qty") or self.minOrderQty,
+                    side=order["side"],
+                    price=order.get("price"),
+                    move=False,
+                    cancel=False,
+                    ordType=ordType,
+                )
+                for order in orders
+            ]
+            if future:
+                return _completed(clOrdIDs)
+            return clOrdIDs
+        if bot.state == "Active" and disp.f9 == "ON":
+            return Bot.execute(
+                bot,
+                partial(self._send_many, orders=orders, bot=bot, ordType=ordType),
+                operation="Place",
+                market=self.market,
+                future=future,
             )
 
+    def _send_many(self, orders: list, bot: BotData, ordType: str) -> list:
+        """
+        Places the orders of place_many(). Runs in the bot's executor.
+        """
+        clOrdIDs = [None] * len(orders)
+        nums = list()
+        parameters = list()
+        for num, order in enumerate(orders):
+            side = order["side"]
+            qty = order.get("qty") or self.minOrderQty
+            price = order.get("price")
+            if not price:
+                try:
+                    price = self.asks[0][0] if side == "Sell" else self.bids[0][0]
+                except IndexError:
+                    self._empty_orderbook(qty=qty, price=price, bot_name=bot.name)
+                    continue
+            price = service.ticksize_rounding(price=price, ticksize=self.tickSize)
+            qty = self._control_limits(side=side, qty=qty, bot_name=bot.name)
+            if qty != 0:
+                nums.append(num)
+                parameters.append(
+                    {
+                        "quantity": -qty if side == "Sell" else qty,
+                        "price": price,
+                        "clOrdID": service.set_clOrdID(emi=bot.name),
+                        "symbol": self.symbol_tuple,
+                        "ordType": ordType,
+                    }
+                )
+        if parameters:
+            results = WS.place_many(Markets[self.market], orders=parameters)
+            for num, params, res in zip(nums, parameters, results):
+                if isinstance(res, dict):
+                    clOrdIDs[num] = params["clOrdID"]
+
+        return clOrdIDs
+
     def add_kline(self, timefr: str = "") -> Callable:
         """
         Adds kline (candlestick) data to the instrument for the time interval
@@ -504,15 +827,19 @@ class Tool(Instrument):
         a specific market, the kline data is taken from the market's endpoint
         according to the klines dictionary. The initial amount of data
         loaded from the endpoint is equal to CANDLESTICK_NUMBER in
-        botinit/variables.py. Then, as the program runs, the data accumulates.
+        botinit/variables.py. Then, as the program runs, new candles are
+        added and the oldest ones are dropped, so the number of stored
+        candles never exceeds CANDLESTICK_NUMBER.
 
         Parameters
         ----------
         timefr: str
-            Possible values: "1min", "2min", "3min", "5min", "10min",
-            "15min", "20min", "30min", "1h", "2h", "3h", "4h", "6h", "12h",
-            "1D". If omited, the time frame is specified in the bot
-            parameters.
+            Possible values: "5s", "10s", "15s", "30s", "1min", "2min",
+            "3min", "5min", "10min", "15min", "20min", "30min", "1h", "2h",
+            "3h", "4h", "6h", "12h", "1D". If omited, the time frame is
+            specified in the bot parameters. Sub-minute timeframes have no
+            history on the exchanges, so they start with a single candle
+            and are built from the order book updates.
 
         Returns
         -------
@@ -525,7 +852,8 @@ class Tool(Instrument):
                 "date": int
                     date yymmdd, example 240814
                 "time": int
-                    time hhmmss, example 143200
+                    time hhmm, example 1432, or hhmmss for sub-minute
+                    timeframes, example 143205
                 "open_bid": float
                     first bid price at the beginning of the period
                 "open_ask": float
@@ -667,7 +995,7 @@ class Tool(Instrument):
             the descend parameter. The OrderedDict key is the clOrdID value.
         """
         filtered = self._filter_by_side(
-            orders=var.orders[bot.name], side=side, descend=descend, in_list=in_list
+            emi=bot.name, side=side, descend=descend, in_list=in_list
         )
 
         return filtered
@@ -681,7 +1009,8 @@ class Tool(Instrument):
         args parameter: tuple
             The line with the latest time is designated as args[0] = 0, the
             line before the latest is designated args[0] = -1, and so on. If
-            args is empty, all kline are returned in the "data" key.
+            args is empty, all kline are returned in the "data" key as a
+            KlineBuffer, which can be indexed and iterated like a list.
             If timefr is "tick", the arguments are ignored.
 
         Returns
@@ -808,7 +1137,7 @@ class Tool(Instrument):
 
     def _filter_by_side(
         self,
-        orders: OrderedDict,
+        emi: str,
         side: str = None,
         descend: bool = False,
         in_list: bool = True,
@@ -818,8 +1147,8 @@ class Tool(Instrument):
 
         Parameters
         ----------
-        orders: OrderedDict
-            Bot order dictionary, where the key is clOrdID
+        emi: str
+            Bot name.
         side: str
             Buy or Sell
         descend: bool
@@ -835,56 +1164,37 @@ class Tool(Instrument):
             Orders are sorted by ``transactTime`` in the order specified in
             the descend parameter. The OrderedDict key is the clOrdID value.
         """
-        ord = orders.values()
+        filtered = var.orders.select(
+            emi=emi, side=side, symbol=self.symbol_tuple, descend=descend
+        )
         if not in_list:
-            filtered = OrderedDict()
-            if descend:
-                ord = sorted(ord, key=lambda x: x["transactTime"], reverse=True)
-            for value in ord:
-                if value["symbol"] == self.symbol_tuple:
-                    if side:
-                        if value["side"] == side:
-                            filtered[value["clOrdID"]] = value
-                    else:
-                        filtered[value["clOrdID"]] = value
-        else:
-            filtered = list()
-            if descend:
-                ord = sorted(ord, key=lambda x: x["transactTime"], reverse=True)
-            for value in ord:
-                if value["symbol"] == self.symbol_tuple:
-                    if side:
-                        if value["side"] == side:
-                            filtered.append(value)
-                    else:
-                        filtered.append(value)
+            filtered = OrderedDict((value["clOrdID"], value) for value in filtered)
 
         return filtered
 
-    def _remove_orders(self, orders: OrderedDict, side: str) -> None:
+    def _remove_orders(self, emi: str, side: str) -> None:
         """
-        Removes group of given orders by side.
+        Removes the bot orders for the instrument by side.
 
         Parameters
         ----------
-        orders: OrderedDict
-            Dictionary where key is clOrdID.
+        emi: str
+            Bot name.
         side: str
             Buy or Sell
         """
-        orders = self._filter_by_side(orders=orders, side=side)
-        ws = Markets[self.market]
-        for order in orders:
-            WS.remove_order(ws, order=order)
+        orders = self._filter_by_side(emi=emi, side=side)
+        if orders:
+            WS.remove_many(Markets[self.market], orders=orders)
 
-    def _get_latest_order(self, orders: OrderedDict, side: str) -> Union[str, None]:
+    def _get_latest_order(self, emi: str, side: str) -> Union[str, None]:
         """
         Finds the last order on a given side.
 
         Parameters
         ----------
-        orders: OrderedDict
-            Dictionary where key is clOrdID.
+        emi: str
+            Bot name.
         side: str
             Buy or Sell
 
@@ -893,7 +1203,7 @@ class Tool(Instrument):
         str | None
             If an order is found, returns clOrdID of that order, otherwise None.
         """
-        orders = self._filter_by_side(orders=orders, side=side)
+        orders = self._filter_by_side(emi=emi, side=side)
         if orders:
             return orders[0]["clOrdID"]
 
@@ -940,7 +1250,7 @@ class Tool(Instrument):
         if qty != 0:
             price = service.ticksize_rounding(price=price, ticksize=self.tickSize)
             if move is True:
-                clOrdID = self._get_latest_order(orders=var.orders[bot.name], side=side)
+                clOrdID = self._get_latest_order(emi=bot.name, side=side)
             data = bot.backtest_data[self.symbol_tuple]
             if side == "Sell":
                 compare_2 = data[bot.iter + 1]["open_bid"]
@@ -991,18 +1301,14 @@ class Tool(Instrument):
                         value=value,
                     )
                 else:
-                    var.orders[bot.name][clOrdID]["price"] = price
+                    var.orders.update(emi=bot.name, clOrdID=clOrdID, price=price)
         if cancel:
             if side == "Sell":
-                orders = self._filter_by_side(
-                    orders=var.orders[bot.name], side="Buy", in_list=False
-                )
+                orders = self._filter_by_side(emi=bot.name, side="Buy", in_list=False)
             else:
-                orders = self._filter_by_side(
-                    orders=var.orders[bot.name], side="Sell", in_list=False
-                )
+                orders = self._filter_by_side(emi=bot.name, side="Sell", in_list=False)
             for clOrdID in orders:
-                del var.orders[bot.name][clOrdID]
+                var.orders.remove(emi=bot.name, clOrdID=clOrdID)
 
         return clOrdID
 